@@ -29,8 +29,11 @@ except Exception:
     import logging
 
 import six
+from six.moves import queue as Queue
 
 from fortiosclient._i18n import _LE, _LI
+from fortiosclient.common import deadline as deadlines
+from fortiosclient import exception
 import fortiosclient as api_client
 
 
@@ -74,12 +77,11 @@ class ApiClientBase(object):
 
     @property
     def config_gen(self):
-        # If NSX_gen_timeout is not -1 then:
-        # Maintain a timestamp along with the generation ID.  Hold onto the
-        # ID long enough to be useful and block on sequential requests but
-        # not long enough to persist when Onix db is cleared, which resets
-        # the generation ID, causing the DAL to block indefinitely with some
-        # number that's higher than the cluster's value.
+        # The checksum of the configuration of FortiOS, when it was last
+        # read. If _gen_timeout is not -1 then:
+        # Maintain a timestamp along with the checksum. Hold onto it long
+        # enough for the requests issued at once to share it, but not so
+        # long that the changes made by others go unnoticed.
         if self._gen_timeout != -1:
             ts = self._config_gen_ts
             if ts is not None:
@@ -89,9 +91,8 @@ class ApiClientBase(object):
 
     @config_gen.setter
     def config_gen(self, value):
-        if self._config_gen != value:
-            if self._gen_timeout != -1:
-                self._config_gen_ts = time.time()
+        if self._gen_timeout != -1:
+            self._config_gen_ts = time.time()
         self._config_gen = value
 
     def auth_cookie(self, conn):
@@ -132,19 +133,40 @@ class ApiClientBase(object):
             cookie = self.format_cookie(cookie)
             self._set_provider_data(conn, (data[0], cookie))
 
-    def acquire_connection(self, auto_login=True, headers=None, rid=-1):
+    def acquire_connection(self, auto_login=True, headers=None, rid=-1,
+                           deadline=None, exclude=None):
         '''Check out an available HTTPConnection instance.
 
         Blocks until a connection is available.
         :auto_login: automatically logins before returning conn
         :headers: header to pass on to login attempt
         :param rid: request id passed in from request eventlet.
+        :param deadline: a fortiosclient.common.deadline.Deadline to give up
+                         waiting for a connection and for the login at.
+        :param exclude: the (host, port, is_ssl) of an API provider, a
+                        connection to another provider is returned if one is
+                        available at once, None otherwise.
         :returns: An available HTTPConnection instance or None if no
-                 api_providers are configured.
+                 api_providers are configured or the deadline expired.
         '''
-        if self._conn_pool.empty():
-            LOG.debug("[%d] Waiting to acquire API client connection.", rid)
-        priority, conn = self._conn_pool.get()
+        if exclude is not None:
+            item = self._get_connection_excluding(exclude)
+            if item is None:
+                LOG.debug("[%d] No connection available to another API "
+                          "provider.", rid)
+                return None
+            priority, conn = item
+        else:
+            if self._conn_pool.empty():
+                LOG.debug("[%d] Waiting to acquire API client connection.",
+                          rid)
+            try:
+                priority, conn = self._conn_pool.get(
+                    timeout=deadlines.bounded(deadline))
+            except Queue.Empty:
+                LOG.info(_LI("[%d] Deadline expired waiting for an API "
+                             "client connection."), rid)
+                return None
         now = time.time()
         if getattr(conn, 'last_used', now) < now - self.CONN_IDLE_TIMEOUT:
             LOG.info(_LI("[%(rid)d] Connection %(conn)s idle for "
@@ -162,9 +184,29 @@ class ApiClientBase(object):
                   {'rid': rid, 'conn': api_client.ctrl_conn_to_str(conn),
                    'qsize': qsize})
         if auto_login and self.auth_cookie(conn) is None:
-            self._wait_for_login(conn, headers)
+            try:
+                self._wait_for_login(conn, headers, deadline)
+            except BaseException:
+                self.release_connection(conn, rid=rid)
+                raise
         return conn
 
+    def _get_connection_excluding(self, conn_params):
+        '''Return a (priority, conn) of the pool to another provider.'''
+        conn_params = self._normalize_conn_params(conn_params)
+        result = None
+        items = []
+        while not self._conn_pool.empty():
+            item = self._conn_pool.get_nowait()
+            if (result is None and
+                    self._normalize_conn_params(item[1]) != conn_params):
+                result = item
+            else:
+                items.append(item)
+        for item in items:
+            self._conn_pool.put(item)
+        return result
+
     def release_connection(self, http_conn, bad_state=False,
                            service_unavail=False, rid=-1):
         '''Mark HTTPConnection instance as available for check-out.
@@ -229,28 +271,33 @@ class ApiClientBase(object):
                   {'rid': rid, 'conn': api_client.ctrl_conn_to_str(http_conn),
                    'qsize': self._conn_pool.qsize()})
 
-    def _wait_for_login(self, conn, headers=None):
-        '''Block until a login has occurred for the current API provider.'''
+    def _wait_for_login(self, conn, headers=None, deadline=None):
+        '''Block until a login has occurred for the current API provider.
+
+        :raises: exception.RequestTimeout if deadline expires first.
+        '''
         data = self._get_provider_data(conn)
         if data is None:
             LOG.error(_LE("Login request for an invalid connection: '%s'"),
                       api_client.ctrl_conn_to_str(conn))
             return
         if self._singlethread:
-            cookie = self._login(conn, headers)
+            cookie = self._login(conn, headers, deadline)
             self.set_auth_cookie(conn, cookie)
         else:
             provider_sem = data[0]
             if provider_sem.acquire(blocking=False):
                 try:
-                    cookie = self._login(conn, headers)
+                    cookie = self._login(conn, headers, deadline)
                     self.set_auth_cookie(conn, cookie)
                 finally:
                     provider_sem.release()
             else:
                 LOG.debug("Waiting for auth to complete")
                 # Wait until we can acquire then release
-                provider_sem.acquire(blocking=True)
+                if not provider_sem.acquire(
+                        blocking=True, timeout=deadlines.bounded(deadline)):
+                    raise exception.RequestTimeout()
                 provider_sem.release()
 
     def _get_provider_data(self, conn_or_conn_params, default=None):
@@ -0,0 +1,790 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Native builders of the FortiOS API messages.
+
+Every builder returns the same {"path", "method", "body"} dictionary that
+rendering the template of the same name in templates and loading it as
+JSON does, keys in the same order, so that the serialized request sent on
+the wire is identical. Building the dictionary directly skips the render
+and the JSON parsing of the rendered text.
+
+The templates insert values into the JSON text verbatim, the builders
+only match them for values that need no JSON escaping, which is what the
+templates support anyway.
+"""
+
+try:
+    from oslo_serialization import jsonutils
+except Exception:
+    import json as jsonutils
+
+import six
+
+from fortiosclient.common import urls
+
+API_CMDB = urls.API_CMDB
+API_MONITOR = urls.API_MONITOR
+
+
+def _s(value):
+    # a value rendered in a JSON string, e.g. "{{ name }}"
+    return six.text_type(value)
+
+
+def _raw(value):
+    # a value rendered as JSON, e.g. "extport": {{ extport }}
+    return jsonutils.loads(six.text_type(value))
+
+
+def _names(values):
+    # [{"name": "{{ m }}"} for m in values[:-1]] + [values[-1]]
+    values = list(values)
+    names = [{'name': _s(v)} for v in values[:-1]]
+    names.append({'name': _s(values[-1]) if values else ''})
+    return names
+
+
+def _name_list(value):
+    # [{"name": "{{ n }}"} for n in ([v] if v is string or v is not iterable
+    #                                else v)]
+    if isinstance(value, six.string_types):
+        value = [value]
+    try:
+        return [{'name': _s(v)} for v in value]
+    except TypeError:
+        return [{'name': _s(value)}]
+
+
+def _vdom_query(message, default='root'):
+    return '?vdom=%s' % _s(message.get('vdom', default))
+
+
+def _collection(base, message, sep=''):
+    # POST to a table: base?vdom=x or base
+    if 'vdom' in message:
+        return '%s?vdom=%s' % (base, _s(message['vdom']))
+    return base + sep
+
+
+def _item(base, key, message):
+    # PUT/DELETE of an entry: base/key/?vdom=x or base/key
+    if 'vdom' in message:
+        return '%s/%s/?vdom=%s' % (base, _s(message.get(key, '')),
+                                   _s(message['vdom']))
+    return '%s/%s' % (base, _s(message.get(key, '')))
+
+
+def _query(base, key, message, item_sep='/', sep='/'):
+    # GET of an entry or of the whole table
+    if key in message:
+        if 'vdom' in message:
+            return '%s/%s/?vdom=%s' % (base, _s(message[key]),
+                                       _s(message['vdom']))
+        return '%s/%s%s' % (base, _s(message[key]), item_sep)
+    if 'vdom' in message:
+        return '%s/?vdom=%s' % (base, _s(message['vdom']))
+    return base + sep
+
+
+def _message(path, method, body=None):
+    message = {'path': path, 'method': method}
+    if body is not None:
+        message['body'] = body
+    return message
+
+
+def _options(options, message, skip_none_only=False):
+    # {% for k, v in options.items() if v is defined and v %}
+    body = {}
+    for key, param in options:
+        if param not in message:
+            continue
+        value = message[param]
+        if (value is not None) if skip_none_only else value:
+            body[key] = _s(value)
+    return body
+
+
+# Login
+def login(message):
+    return _message('/logincheck', 'POST', {
+        'username': _s(message.get('username', '')),
+        'secretkey': _s(message.get('secretkey', ''))})
+
+
+def logout(message):
+    return _message('/logout', 'POST')
+
+
+# VLAN interface
+INTERFACE = API_CMDB + '/system/interface'
+
+
+def add_vlan_interface(message):
+    body = {}
+    if 'name' in message:
+        body['name'] = _s(message['name'])
+    else:
+        body['name'] = 'os_vid_%s' % _s(message.get('vlanid', ''))
+    if 'vlanid' in message:
+        body['vlanid'] = _s(message['vlanid'])
+    body['interface'] = _s(message.get('interface', ''))
+    body['type'] = 'vlan'
+    if 'ip' in message:
+        body['ip'] = _s(message['ip'])
+        body['mode'] = 'static'
+        body['allowaccess'] = 'ping'
+    body['secondary-IP'] = 'enable'
+    if 'alias' in message:
+        body['alias'] = _s(message['alias'])
+    body['vdom'] = _s(message.get('vdom', 'root'))
+    body['ipv6'] = {'ip6-extra-addr': []}
+    return _message(INTERFACE, 'POST', {'json': body})
+
+
+def set_vlan_interface(message):
+    body = {}
+    if message.get('ip') is not None:
+        body['ip'] = _s(message['ip'])
+        body['mode'] = 'static'
+        body['allowaccess'] = 'ping'
+    if 'secondaryips' in message:
+        if message['secondaryips']:
+            body['secondary-IP'] = 'enable'
+            body['secondaryip'] = [{'ip': _s(ip), 'allowaccess': 'ping'}
+                                   for ip in message['secondaryips']]
+        else:
+            body['secondary-IP'] = 'disable'
+    if 'vlanid' in message:
+        body['vlanid'] = _s(message['vlanid'])
+    body['vdom'] = _s(message.get('vdom', 'root'))
+    return _message('%s/%s' % (INTERFACE, _s(message.get('name', ''))),
+                    'PUT', body)
+
+
+def delete_vlan_interface(message):
+    return _message(_item(INTERFACE, 'name', message), 'DELETE')
+
+
+def get_vlan_interface(message):
+    return _message(_query(INTERFACE, 'name', message), 'GET')
+
+
+# DHCP server
+DHCP_SERVER = API_CMDB + '/system.dhcp/server'
+
+
+def _dhcp_server_body(message):
+    body = {'status': 'enable'}
+    if message.get('dns_nameservers'):
+        body['dns-service'] = 'specify'
+        for i, dns in enumerate(message['dns_nameservers'][:3], 1):
+            body['dns-server%d' % i] = _s(dns)
+    else:
+        body['dns-service'] = 'default'
+    if message.get('gateway', '') is not None:
+        body['default-gateway'] = _s(message.get('gateway', ''))
+    body['netmask'] = _s(message.get('netmask', ''))
+    body['interface'] = _s(message.get('interface', ''))
+    body['ip-range'] = [{'start-ip': _s(message.get('start_ip', '')),
+                         'end-ip': _s(message.get('end_ip', ''))}]
+    return body
+
+
+def add_dhcp_server(message):
+    return _message(_collection(DHCP_SERVER, message), 'POST',
+                    _dhcp_server_body(message))
+
+
+def set_dhcp_server(message):
+    return _message(_item(DHCP_SERVER, 'id', message), 'PUT',
+                    _dhcp_server_body(message))
+
+
+def delete_dhcp_server(message):
+    return _message(_item(DHCP_SERVER, 'id', message), 'DELETE')
+
+
+def get_dhcp_server(message):
+    return _message(_query(DHCP_SERVER, 'id', message, item_sep='', sep=''),
+                    'GET')
+
+
+def set_dhcp_server_rsv_addr(message):
+    return _message(_item(DHCP_SERVER, 'id', message), 'PUT', {
+        'reserved-address': _raw(message.get('reserved_address', ''))})
+
+
+# VDOM
+VDOM = API_CMDB + '/system/vdom'
+VDOM_LINK = API_CMDB + '/system/vdom-link'
+
+
+def add_vdom(message):
+    name = _s(message.get('name', ''))
+    return _message(VDOM + '/', 'POST', {
+        'json': {'short-name': name, 'name': name}})
+
+
+def delete_vdom(message):
+    return _message('%s/%s' % (VDOM, _s(message.get('name', ''))),
+                    'DELETE')
+
+
+def get_vdom(message):
+    return _message('%s/%s' % (VDOM, _s(message.get('name', ''))), 'GET')
+
+
+def add_vdom_link(message):
+    return _message(VDOM_LINK, 'POST', {
+        'json': {'name': _s(message.get('name', ''))}})
+
+
+def delete_vdom_link(message):
+    return _message('%s/%s' % (VDOM_LINK, _s(message.get('name', ''))),
+                    'DELETE')
+
+
+def get_vdom_link(message):
+    return _message('%s/%s' % (VDOM_LINK, _s(message.get('name', ''))),
+                    'GET')
+
+
+# Static route
+ROUTER_STATIC = API_CMDB + '/router/static'
+
+
+def _router_static_body(message):
+    return {'dst': _s(message.get('dst', '')),
+            'device': _s(message.get('device', '')),
+            'gateway': _s(message.get('gateway', ''))}
+
+
+def add_router_static(message):
+    return _message(_collection(ROUTER_STATIC, message), 'POST',
+                    _router_static_body(message))
+
+
+def set_router_static(message):
+    return _message(_item(ROUTER_STATIC, 'id', message), 'PUT',
+                    _router_static_body(message))
+
+
+def delete_router_static(message):
+    return _message(_item(ROUTER_STATIC, 'id', message), 'DELETE')
+
+
+def get_router_static(message):
+    return _message(_query(ROUTER_STATIC, 'id', message), 'GET')
+
+
+# Firewall policy
+FIREWALL_POLICY = API_CMDB + '/firewall/policy'
+
+UTM_PROFILES = (
+    ('av-profile', 'av_profile'),
+    ('webfilter-profile', 'webfilter_profile'),
+    ('ips-sensor', 'ips_sensor'),
+    ('application-list', 'application_list'),
+    ('ssl-ssh-profile', 'ssl_ssh_profile')
+)
+
+
+def _utm(body, message, skip_none_only=False):
+    profiles = _options(UTM_PROFILES, message, skip_none_only)
+    if profiles:
+        body['utm-status'] = 'enable'
+        body['profile-protocol-options'] = 'default'
+        body.update(profiles)
+    else:
+        body['utm-status'] = 'disable'
+        body['profile-protocol-options'] = ''
+
+
+def _poolname(body, message):
+    if 'nat' in message:
+        body['nat'] = _s(message['nat'])
+    if 'poolname' in message:
+        if 'nat' not in message:
+            body['nat'] = 'enable'
+        body['ippool'] = 'enable'
+        body['poolname'] = _name_list(message['poolname'])
+
+
+def add_firewall_policy(message):
+    body = {
+        'srcintf': _name_list(message.get('srcintf', 'any')),
+        'dstintf': _name_list(message.get('dstintf', 'any')),
+        'srcaddr': _name_list(message.get('srcaddr', 'all')),
+        'dstaddr': _name_list(message.get('dstaddr', 'all')),
+        'action': _s(message.get('action', 'accept')),
+        'schedule': 'always'
+    }
+    _poolname(body, message)
+    body['match-vip'] = _s(message.get('match_vip', 'disable'))
+    body['status'] = _s(message.get('status', 'enable'))
+    body['service'] = _name_list(message.get('service', 'ALL'))
+    _utm(body, message)
+    body['comments'] = _s(message.get('comments', ''))
+    return _message(_collection(FIREWALL_POLICY, message), 'POST',
+                    {'json': body})
+
+
+def set_firewall_policy(message):
+    body = {}
+    for key in ('srcintf', 'dstintf', 'srcaddr', 'dstaddr'):
+        if key in message:
+            body[key] = _name_list(message[key])
+    if 'action' in message:
+        body['action'] = _s(message['action'])
+    _poolname(body, message)
+    if 'match_vip' in message:
+        body['match-vip'] = _s(message['match_vip'])
+    if 'status' in message:
+        body['status'] = _s(message['status'])
+    if 'service' in message:
+        body['service'] = _name_list(message['service'])
+    _utm(body, message, skip_none_only=True)
+    if 'comments' in message:
+        body['comments'] = _s(message['comments'])
+    body['schedule'] = 'always'
+    return _message(_item(FIREWALL_POLICY, 'id', message), 'PUT',
+                    {'json': body})
+
+
+def delete_firewall_policy(message):
+    return _message(_item(FIREWALL_POLICY, 'id', message), 'DELETE')
+
+
+def get_firewall_policy(message):
+    return _message(_query(FIREWALL_POLICY, 'id', message), 'GET')
+
+
+def move_firewall_policy(message):
+    path = '%s/%s?' % (FIREWALL_POLICY, _s(message.get('id', '')))
+    if 'vdom' in message:
+        path += 'vdom=%s&' % _s(message['vdom'])
+    if 'before' in message:
+        path += 'action=move&before=%s' % _s(message['before'])
+    else:
+        path += 'action=move&after=%s' % _s(message.get('after', ''))
+    return _message(path, 'PUT')
+
+
+# Firewall virtual IP
+FIREWALL_VIP = API_CMDB + '/firewall/vip'
+
+
+def _real_server_body(message):
+    body = {}
+    if 'ip' in message:
+        body['ip'] = _s(message['ip'])
+    if 'port' in message:
+        body['port'] = _raw(message['port'])
+    if 'max_connections' in message:
+        body['max-connections'] = _raw(message['max_connections'])
+    if 'status' in message:
+        body['status'] = _s(message['status'])
+    return {'json': body}
+
+
+def _real_server_path(message, entry=False):
+    path = '%s/%s/realservers' % (FIREWALL_VIP,
+                                  _s(message.get('virt_server_name', '')))
+    if entry:
+        # the name is rendered even if it is None, like the template does
+        path += '/' + _s(message.get('name', ''))
+    return path + _vdom_query(message)
+
+
+def set_firewall_virt_server(message):
+    body = {}
+    if 'extip' in message:
+        body['extip'] = _s(message['extip'])
+    if 'extport' in message:
+        body['extport'] = _raw(message['extport'])
+    if 'realservers' in message:
+        body['realservers'] = _raw(message['realservers'])
+    path = '%s/%s%s' % (FIREWALL_VIP, _s(message.get('name', '')),
+                        _vdom_query(message))
+    return _message(path, 'PUT', {'json': body})
+
+
+def add_firewall_real_server(message):
+    return _message(_real_server_path(message), 'POST',
+                    _real_server_body(message))
+
+
+def set_firewall_real_server(message):
+    return _message(_real_server_path(message, entry=True), 'PUT',
+                    _real_server_body(message))
+
+
+def delete_firewall_real_server(message):
+    return _message(_real_server_path(message, entry=True), 'DELETE')
+
+
+def add_firewall_vip(message):
+    return _message(_collection(FIREWALL_VIP, message), 'POST', {
+        'json': {
+            'name': _s(message.get('name', '')),
+            'extip': _s(message.get('extip', '')),
+            'extintf': _s(message.get('extintf', '')),
+            'mappedip': [{'range': _s(message.get('mappedip', ''))}]
+        }
+    })
+
+
+def delete_firewall_vip(message):
+    return _message(_item(FIREWALL_VIP, 'name', message), 'DELETE')
+
+
+def get_firewall_vip(message):
+    return _message(_query(FIREWALL_VIP, 'name', message), 'GET')
+
+
+# Firewall IP pool
+FIREWALL_IPPOOL = API_CMDB + '/firewall/ippool'
+
+
+def add_firewall_ippool(message):
+    startip = _s(message.get('startip', ''))
+    body = {'startip': startip,
+            'endip': _s(message.get('endip', startip)),
+            'type': _s(message.get('type', 'one-to-one'))}
+    if 'comments' in message:
+        body['comments'] = _s(message['comments'])
+    body['name'] = _s(message.get('name', startip))
+    return _message(_collection(FIREWALL_IPPOOL, message), 'POST',
+                    {'json': body})
+
+
+def delete_firewall_ippool(message):
+    path = _item(FIREWALL_IPPOOL, 'name', message)
+    if 'vdom' not in message:
+        path += '/'
+    return _message(path, 'DELETE')
+
+
+def get_firewall_ippool(message):
+    return _message(_query(FIREWALL_IPPOOL, 'name', message), 'GET')
+
+
+# Firewall address
+FIREWALL_ADDRESS = API_CMDB + '/firewall/address'
+
+
+def _address_body(message, subnet_required=True):
+    body = {}
+    if 'associated_interface' in message:
+        body['associated-interface'] = _s(message['associated_interface'])
+    if 'comment' in message:
+        body['comment'] = _s(message['comment'])
+    if subnet_required or 'subnet' in message:
+        body['subnet'] = _s(message.get('subnet', ''))
+    body['name'] = _s(message.get('name', ''))
+    return {'json': body}
+
+
+def add_firewall_address(message):
+    return _message(_collection(FIREWALL_ADDRESS, message), 'POST',
+                    _address_body(message))
+
+
+def set_firewall_address(message):
+    return _message(_item(FIREWALL_ADDRESS, 'name', message), 'PUT',
+                    _address_body(message, subnet_required=False))
+
+
+def delete_firewall_address(message):
+    return _message(_item(FIREWALL_ADDRESS, 'name', message), 'DELETE')
+
+
+def get_firewall_address(message):
+    return _message(_query(FIREWALL_ADDRESS, 'name', message), 'GET')
+
+
+# Firewall address group
+FIREWALL_ADDRGRP = API_CMDB + '/firewall/addrgrp'
+
+
+def add_firewall_addrgrp(message):
+    return _message(_collection(FIREWALL_ADDRGRP, message, sep='/'), 'POST', {
+        'json': {'name': _s(message.get('name', '')),
+                 'member': _names(message.get('members', ()))}})
+
+
+def set_firewall_addrgrp(message):
+    return _message(_item(FIREWALL_ADDRGRP, 'name', message), 'PUT', {
+        'member': _names(message.get('members', ()))})
+
+
+def delete_firewall_addrgrp(message):
+    return _message(_item(FIREWALL_ADDRGRP, 'name', message), 'DELETE')
+
+
+def get_firewall_addrgrp(message):
+    # the template only tests the vdom, the name is always used with it
+    if 'vdom' in message:
+        path = '%s/%s/?vdom=%s' % (FIREWALL_ADDRGRP,
+                                   _s(message.get('name', '')),
+                                   _s(message['vdom']))
+    else:
+        path = FIREWALL_ADDRGRP + '/'
+    return _message(path, 'GET')
+
+
+# Firewall custom service
+FIREWALL_SERVICE = API_CMDB + '/firewall.service/custom'
+
+
+def add_firewall_service(message):
+    body = {'protocol': _s(message.get('protocol', 'TCP/UDP/SCTP'))}
+    if 'fqdn' in message:
+        body['fqdn'] = _s(message['fqdn'])
+    if 'iprange' in message:
+        body['iprange'] = _s(message['iprange'])
+    if 'tcp_portrange' in message:
+        body['tcp-portrange'] = _s(message['tcp_portrange'])
+    if 'udp_portrange' in message:
+        body['udp-portrange'] = _s(message['udp_portrange'])
+    if 'sctp_portrange' in message:
+        # the template sends the udp port range as sctp port range
+        body['sctp-portrange'] = _s(message.get('udp_portrange', ''))
+    if 'comment' in message:
+        body['comment'] = _s(message['comment'])
+    body['name'] = _s(message.get('name', ''))
+    return _message(_collection(FIREWALL_SERVICE, message), 'POST',
+                    {'json': body})
+
+
+def set_firewall_service(message):
+    body = {}
+    if 'protocol' in message:
+        body['protocol'] = _s(message['protocol'])
+    if 'fqdn' in message:
+        body['fqdn'] = _s(message['fqdn'])
+    if 'iprange' in message:
+        body['iprange'] = _s(message['iprange'])
+    body['tcp-portrange'] = _s(message.get('tcp_portrange', ''))
+    body['udp-portrange'] = _s(message.get('udp_portrange', ''))
+    body['sctp-portrange'] = _s(message.get('sctp_portrange', ''))
+    if 'comment' in message:
+        body['comment'] = _s(message['comment'])
+    body['name'] = _s(message.get('name', ''))
+    return _message(_item(FIREWALL_SERVICE, 'name', message), 'PUT',
+                    {'json': body})
+
+
+def delete_firewall_service(message):
+    return _message(_item(FIREWALL_SERVICE, 'name', message), 'DELETE')
+
+
+def get_firewall_service(message):
+    return _message(_query(FIREWALL_SERVICE, 'name', message), 'GET')
+
+
+# User group
+USER_GROUP = API_CMDB + '/user/group'
+
+
+def get_user_group(message):
+    return _message(_query(USER_GROUP, 'name', message), 'GET')
+
+
+def set_user_group(message):
+    members = message.get('member', ())
+    name = _s(message.get('name', ''))
+    return _message(_item(USER_GROUP, 'name', message), 'PUT', {
+        'json': {'member': [{'name': _s(m), 'q_origin_key': _s(m)}
+                            for m in members],
+                 'name': name}})
+
+
+# Monitor
+def get_monitor_load_balance(message):
+    return _message('%s/firewall/load-balance?vdom=%s&count=%s' % (
+        API_MONITOR, _s(message.get('vdom', 'root')),
+        _s(message.get('count', ''))), 'GET')
+
+
+def get_config_checksum(message):
+    return _message(API_MONITOR + '/system/ha-checksums', 'GET')
+
+
+# Local user
+USER_LOCAL = API_CMDB + '/user/local'
+
+
+def _user_local_path(message, name=True):
+    path = USER_LOCAL
+    if name:
+        path += '/' + _s(message.get('name', ''))
+    return '%s?vdom=%s' % (path, _s(message.get('vdom', '')))
+
+
+def get_user_local(message):
+    return _message(_user_local_path(message, 'name' in message), 'GET')
+
+
+def add_user_local(message):
+    body = {'type': 'password',
+            'passwd': _s(message.get('password', '')),
+            'two-factor': _s(message.get('two_factor', '')),
+            'email-to': _s(message.get('email', ''))}
+    if 'mobile_number' in message:
+        body['sms-phone'] = _s(message['mobile_number'])
+    body['name'] = _s(message.get('name', ''))
+    return _message(_user_local_path(message, False), 'POST',
+                    {'json': body})
+
+
+def put_user_local(message):
+    body = _options((('passwd', 'password'),
+                     ('email-to', 'email'),
+                     ('sms-phone', 'mobile_number')), message)
+    body['name'] = _s(message.get('name', ''))
+    return _message(_user_local_path(message), 'PUT', {'json': body})
+
+
+def delete_user_local(message):
+    return _message(_user_local_path(message), 'DELETE')
+
+
+# DNS database
+DNS_DATABASE = API_CMDB + '/system/dns-database'
+
+
+def _dns_entry_path(message, entry=''):
+    return '%s/%s/dns-entry%s?vdom=%s' % (DNS_DATABASE,
+                                          _s(message.get('name', '')),
+                                          entry,
+                                          _s(message.get('vdom', '')))
+
+
+def get_dns_server(message):
+    return _message('%s/%s?vdom=%s' % (DNS_DATABASE,
+                                       _s(message.get('name', '')),
+                                       _s(message.get('vdom', ''))), 'GET')
+
+
+def add_dns_entry(message):
+    body = _options((('status', 'status'),
+                     ('ttl', 'ttl'),
+                     ('ip', 'ip'),
+                     ('canonical-name', 'canonical_name'),
+                     ('type', 'type')), message)
+    body['hostname'] = _s(message.get('hostname', ''))
+    return _message(_dns_entry_path(message), 'POST', {'json': body})
+
+
+def delete_dns_entry(message):
+    return _message(_dns_entry_path(message, '/' + _s(message.get('id', ''))),
+                    'DELETE')
+
+
+def modify_dns_entry(message):
+    body = _options((('status', 'status'),
+                     ('ttl', 'ttl'),
+                     ('type', 'type'),
+                     ('hostname', 'hostname'),
+                     ('ip', 'ip')), message)
+    return _message(_dns_entry_path(message, '/' + _s(message.get('id', ''))),
+                    'PUT', {'json': body})
+
+
+def get_dns_entry(message):
+    return _message(_dns_entry_path(message, '/'), 'GET')
+
+
+BUILDERS = {
+    'LOGIN': login,
+    'LOGOUT': logout,
+    'ADD_VLAN_INTERFACE': add_vlan_interface,
+    'SET_VLAN_INTERFACE': set_vlan_interface,
+    'DELETE_VLAN_INTERFACE': delete_vlan_interface,
+    'GET_VLAN_INTERFACE': get_vlan_interface,
+    'ADD_DHCP_SERVER': add_dhcp_server,
+    'SET_DHCP_SERVER': set_dhcp_server,
+    'DELETE_DHCP_SERVER': delete_dhcp_server,
+    'GET_DHCP_SERVER': get_dhcp_server,
+    'SET_DHCP_SERVER_RSV_ADDR': set_dhcp_server_rsv_addr,
+    'ADD_VDOM': add_vdom,
+    'DELETE_VDOM': delete_vdom,
+    'GET_VDOM': get_vdom,
+    'ADD_VDOM_LINK': add_vdom_link,
+    'DELETE_VDOM_LINK': delete_vdom_link,
+    'GET_VDOM_LINK': get_vdom_link,
+    'ADD_ROUTER_STATIC': add_router_static,
+    'SET_ROUTER_STATIC': set_router_static,
+    'DELETE_ROUTER_STATIC': delete_router_static,
+    'GET_ROUTER_STATIC': get_router_static,
+    'ADD_FIREWALL_POLICY': add_firewall_policy,
+    'SET_FIREWALL_POLICY': set_firewall_policy,
+    'DELETE_FIREWALL_POLICY': delete_firewall_policy,
+    'GET_FIREWALL_POLICY': get_firewall_policy,
+    'MOVE_FIREWALL_POLICY': move_firewall_policy,
+    'SET_FIREWALL_VIRT_SERVER': set_firewall_virt_server,
+    'ADD_FIREWALL_REAL_SERVER': add_firewall_real_server,
+    'SET_FIREWALL_REAL_SERVER': set_firewall_real_server,
+    'DELETE_FIREWALL_REAL_SERVER': delete_firewall_real_server,
+    'ADD_FIREWALL_VIP': add_firewall_vip,
+    'DELETE_FIREWALL_VIP': delete_firewall_vip,
+    'GET_FIREWALL_VIP': get_firewall_vip,
+    'ADD_FIREWALL_IPPOOL': add_firewall_ippool,
+    'DELETE_FIREWALL_IPPOOL': delete_firewall_ippool,
+    'GET_FIREWALL_IPPOOL': get_firewall_ippool,
+    'ADD_FIREWALL_ADDRESS': add_firewall_address,
+    'SET_FIREWALL_ADDRESS': set_firewall_address,
+    'DELETE_FIREWALL_ADDRESS': delete_firewall_address,
+    'GET_FIREWALL_ADDRESS': get_firewall_address,
+    'ADD_FIREWALL_ADDRGRP': add_firewall_addrgrp,
+    'SET_FIREWALL_ADDRGRP': set_firewall_addrgrp,
+    'DELETE_FIREWALL_ADDRGRP': delete_firewall_addrgrp,
+    'GET_FIREWALL_ADDRGRP': get_firewall_addrgrp,
+    'ADD_FIREWALL_SERVICE': add_firewall_service,
+    'SET_FIREWALL_SERVICE': set_firewall_service,
+    'DELETE_FIREWALL_SERVICE': delete_firewall_service,
+    'GET_FIREWALL_SERVICE': get_firewall_service,
+    'GET_USER_GROUP': get_user_group,
+    'SET_USER_GROUP': set_user_group,
+    'GET_MONITOR_LOAD_BALANCE': get_monitor_load_balance,
+    'GET_CONFIG_CHECKSUM': get_config_checksum,
+    'GET_USER_LOCAL': get_user_local,
+    'ADD_USER_LOCAL': add_user_local,
+    'PUT_USER_LOCAL': put_user_local,
+    'DELETE_USER_LOCAL': delete_user_local,
+    'GET_DNS_SERVER': get_dns_server,
+    'ADD_DNS_ENTRY': add_dns_entry,
+    'DELETE_DNS_ENTRY': delete_dns_entry,
+    'MODIFY_DNS_ENTRY': modify_dns_entry,
+    'GET_DNS_ENTRY': get_dns_entry,
+}
+
+
+def build(opt, **message):
+    """Build the API message opt, same as rendering its template.
+
+    :param opt: name of the API message defined in templates.
+    :param message: values of the params of the API message.
+    """
+    try:
+        builder = BUILDERS[opt]
+    except KeyError:
+        raise AttributeError("No builder for API message '%s'" % opt)
+    return builder(message)
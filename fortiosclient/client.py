@@ -15,6 +15,10 @@
 #    under the License.
 #
 
+import collections
+import time
+
+import eventlet
 import jinja2
 try:
     from oslo_log import log as logging
@@ -27,15 +31,94 @@ except Exception:
     import json as jsonutils
 
 from fortiosclient._i18n import _LE, _LW
+from fortiosclient import builders
+from fortiosclient.common import cache
 from fortiosclient.common import constants as csts
+from fortiosclient.common import deadline as deadlines
+from fortiosclient.common import latency
 from fortiosclient.common import singleton
+from fortiosclient.common import urls
+from fortiosclient import compiled_templates
 from fortiosclient import eventlet_client
 from fortiosclient import eventlet_request
 from fortiosclient import exception
+from fortiosclient import filters
+from fortiosclient import futures
+from fortiosclient import operations
+from fortiosclient import schema
 from fortiosclient import templates
 
 LOG = logging.getLogger(__name__)
 
+# the latencies needed to estimate the delay of the hedged requests
+HEDGE_MIN_SAMPLES = 20
+
+# the response of a coalesced GET request which was cancelled
+_CANCELLED = object()
+
+# the API message of the configuration checksum, its response is not cached
+CONFIG_CHECKSUM = 'GET_CONFIG_CHECKSUM'
+# maximum seconds the checksum is not read for after failures to read it
+CONFIG_CHECKSUM_BACKOFF_CAP = 300
+
+
+class TemplateLoader(jinja2.BaseLoader):
+    """Load the API message templates by operation name.
+
+    The ahead-of-time compiled template generated in compiled_templates is
+    used when it is up to date, otherwise the template is compiled from
+    its source in templates.
+    """
+
+    def get_source(self, environment, opt):
+        return getattr(templates, opt), None, None
+
+    def load(self, environment, opt, globals=None):
+        source = self.get_source(environment, opt)[0]
+        tmpl = compiled_templates.load(environment, opt, source, globals)
+        if tmpl is None:
+            LOG.debug("Compiling template %s from source", opt)
+            tmpl = super(TemplateLoader, self).load(environment, opt,
+                                                    globals)
+        return tmpl
+
+
+def create_template_env():
+    return jinja2.Environment(loader=TemplateLoader(),
+                              cache_size=csts.DEFAULT_TEMPLATE_CACHE_SIZE,
+                              auto_reload=False)
+
+
+# Compiled API message templates are shared by all the clients in the
+# process and keyed by the operation name, the least recently used ones
+# are dropped once the cache is full.
+TEMPLATE_ENV = create_template_env()
+
+
+def get_template(opt):
+    """Return the compiled template of the API message opt."""
+    return TEMPLATE_ENV.get_template(opt)
+
+
+# The outcome of one of the requests of request_many(), body is the decoded
+# response when ok is True, exception is the exception raised otherwise.
+RequestResult = collections.namedtuple('RequestResult',
+                                       ['ok', 'body', 'exception'])
+
+
+def retryable(opt, error):
+    """Whether a failed request of request_many() is issued again.
+
+    The requests FortiOS answered 503 were not processed. The GET requests
+    which timed out are retried as well, not the writes, they may have
+    been applied.
+    """
+    if isinstance(error, exception.ServiceUnavailable):
+        return True
+    operation = operations.OPERATIONS.get(opt)
+    return (operation is not None and operation.method == 'GET' and
+            isinstance(error, exception.RequestTimeout))
+
 
 class FortiosApiClient(eventlet_client.EventletApiClient):
     """The FortiOS API Client."""
@@ -47,61 +130,641 @@ class FortiosApiClient(eventlet_client.EventletApiClient):
                  http_timeout=csts.DEFAULT_HTTP_TIMEOUT,
                  retries=csts.DEFAULT_RETRIES,
                  redirects=csts.DEFAULT_REDIRECTS,
-                 singlethread=False):
+                 singlethread=False, native_builders=None,
+                 validate_requests=False, schema_cache_dir=None,
+                 request_pool_size=None, provider_concurrency=None,
+                 adaptive_concurrency=False, inline_requests=True,
+                 retry_policy=None, hedge_requests=False, hedge_delay=None,
+                 coalesce_gets=True, green_sockets=True,
+                 response_cache=None, revalidate_cache=False):
         '''Constructor. Adds the following:
         :param api_providers: a list of tuples of the form: (host, port,
             is_ssl)
+        :param gen_timeout: seconds the configuration checksum, see
+            config_checksum(), is reused for, it is read again for every
+            revalidation of the cached responses if -1.
         :param http_timeout: how long to wait before aborting an
             unresponsive controller (and allow for retries to another
             controller in the cluster)
         :param retries: the number of http/https request to retry.
         :param redirects: the number of concurrent connections.
+        :param native_builders: names of the API messages built by
+            fortiosclient.builders instead of rendering their templates.
+        :param validate_requests: validate the bodies of the CMDB requests
+            with the schema of the tables before they are issued.
+        :param schema_cache_dir: directory the schemas of the tables are
+            cached in, by firmware version.
+        :param request_pool_size: number of green threads processing the
+            requests, the number of connections by default.
+        :param provider_concurrency: maximum number of requests in progress
+            to one API provider, not limited by default.
+        :param adaptive_concurrency: raise and lower the maximum number of
+            requests in progress to every API provider with its latency and
+            503 responses, see concurrency_limits().
+        :param inline_requests: process the requests of request() in the
+            calling green thread, or thread, rather than spawning a green
+            thread to wait for. request_async() and request_many() always
+            spawn green threads.
+        :param retry_policy: a fortiosclient.common.retry.RetryPolicy, the
+            backoff before the failed requests are retried and the budget
+            of the retries, exponential backoff with jitter by default.
+        :param hedge_requests: send a second copy of the GET requests not
+            answered within hedge_delay to another API provider, the first
+            response is used and the other request cancelled.
+        :param hedge_delay: seconds to wait for before hedging a request,
+            by default the 95th percentile of the latency of the last GET
+            requests, once HEDGE_MIN_SAMPLES requests are complete.
+        :param coalesce_gets: the identical GET requests issued while one
+            is in flight share its response instead of being sent again.
+            The GET requests issued after a request of another method
+            completes don't share the responses of the older ones.
+        :param green_sockets: wait for FortiOS on green sockets, which
+            block only the green thread of the request instead of the
+            whole process, standard sockets are used in single thread
+            mode.
+        :param response_cache: a fortiosclient.common.cache.ResponseCache
+            the responses of the GET requests of request(), cmdb() and
+            monitor() are served from while they are fresh, it may be
+            shared by the clients of several FortiGates. The writes of
+            the client drop the cached responses they may change. No
+            response is cached by default.
+        :param revalidate_cache: stamp the cached responses of the CMDB
+            tables with the configuration checksum, once expired they are
+            served for another TTL as long as the checksum is unchanged.
         '''
         super(FortiosApiClient, self).__init__(
             api_providers, user, password,
             concurrent_connections=concurrent_connections,
             gen_timeout=gen_timeout,
             connect_timeout=connect_timeout,
-            singlethread=singlethread)
+            singlethread=singlethread,
+            request_pool_size=request_pool_size,
+            provider_concurrency=provider_concurrency,
+            adaptive_concurrency=adaptive_concurrency,
+            retry_policy=retry_policy,
+            green_sockets=green_sockets)
 
         self._request_timeout = http_timeout * retries
         self._http_timeout = http_timeout
         self._retries = retries
         self._redirects = redirects
+        self._inline_requests = inline_requests
+        self._hedge_requests = hedge_requests
+        self._hedge_delay = hedge_delay
+        self._get_latency = latency.LatencyTracker()
+        self._coalesce_gets = coalesce_gets
+        # the Event of the response of the GET requests in flight by url
+        self._gets_in_flight = {}
+        self._cache = response_cache
+        # the FortiGate the responses are cached by
+        self._cache_provider = tuple(sorted(self._api_providers))
+        self._revalidate_cache = revalidate_cache
+        self._config_checks = 0
+        self._checksum_failures = 0
+        self._checksum_retry_at = 0
+        self._write_listeners = []
         self._version = None
         self.message = {}
         self._user = user
         self._password = password
         self._token = token
         self._singlethread = singlethread
+        self._native_builders = frozenset(native_builders or ())
+        self._schemas = None
+        if validate_requests:
+            self._schemas = schema.SchemaCache(schema_cache_dir)
 
     @staticmethod
-    def _render(template, **message):
+    def _render(opt, **message):
         '''Render API message from it's template
 
-        :param template: defined API message with essential params.
+        :param opt: name of the API message defined in templates.
         :param message: It is a dictionary, included values of the params
                         for the template
         '''
         if not message:
             message = {}
-        msg = jinja2.Template(template).render(**message)
+        msg = get_template(opt).render(**message)
         return jsonutils.loads(msg)
 
-    def request(self, opt, content_type="application/json", **message):
-        '''Issues request to controller.'''
-        self.message = self._render(getattr(templates, opt), **message)
+    def request(self, opt, content_type="application/json", deadline=None,
+                **message):
+        '''Issues request to controller.
+
+        :param deadline: seconds the request may take in all, waiting for a
+                         connection, logging in, retrying and redirecting
+                         included, or a fortiosclient.common.deadline.Deadline.
+                         The request raises exception.RequestTimeout once it
+                         is over.
+
+        The GET API messages also take the params:
+        :param fields: names of the attributes returned for every entry
+        :param skip_meta: leave the meta data of the entries out of the
+                          response
+        :param filter: a fortiosclient.filters.F expression, or a FortiOS
+                       filter string, the entries are filtered by FortiOS
+        '''
+        method, url, body, expression = self._prepare(opt, message)
+        return filters.refine(expression,
+                              self._issue(method, url, body, content_type,
+                                          deadline, opt=opt))
+
+    def request_async(self, opt, content_type="application/json",
+                      deadline=None, **message):
+        '''Starts a request to controller, it takes the params of request().
+
+        :returns: a fortiosclient.futures.RequestFuture of the decoded
+                  response.
+        '''
+        method, url, body, expression = self._prepare(opt, message)
+        g = self._start(method, url, body, content_type,
+                        deadline=deadlines.Deadline.after(deadline))
+
+        def handle_response(response):
+            if method != 'GET':
+                self._written(url)
+            result = self._response(method, url, response)
+            if method != 'GET':
+                self._notify_write(method, url, body, result)
+            return filters.refine(expression, result)
+        return futures.RequestFuture(g, handle_response)
+
+    def _prepare(self, opt, message):
+        '''Builds the API message opt.
+
+        :returns: a (method, url, body, filter expression) tuple.
+        '''
+        params = []
+        expression = None
+        if operations.get(opt).method == 'GET':
+            expression = message.pop('filter', None)
+            params = self._get_params(message.pop('fields', None),
+                                      message.pop('skip_meta', False),
+                                      expression)
+        if LOG.isEnabledFor(logging.DEBUG):
+            missing = operations.missing_params(opt, message)
+            if missing:
+                # a heuristic, the templates may not need them all
+                LOG.debug("API message %(opt)s is missing params: "
+                          "%(params)s",
+                          {'opt': opt, 'params': ', '.join(sorted(missing))})
+        if opt in self._native_builders:
+            self.message = builders.build(opt, **message)
+        else:
+            self.message = self._render(opt, **message)
         method = self.message['method']
-        url = self.message['path']
+        url = urls.add_query(self.message['path'], params)
         body = self.message['body'] if 'body' in self.message else None
+        return method, url, body, expression
+
+    def request_many(self, requests, concurrency=None, retry_failed=0,
+                     content_type="application/json", deadline=None,
+                     retry_if=retryable):
+        '''Issues several requests to controller concurrently.
+
+        :param requests: a list of (opt, message) tuples, opt is the name
+                         of the API message and message the dictionary of
+                         its params.
+        :param concurrency: the maximum number of requests in progress at
+                            once, the number of connections of the pool by
+                            default.
+        :param retry_failed: the number of times the failed requests are
+                             issued again, once all the requests are done.
+        :param deadline: seconds all the requests may take.
+        :param retry_if: called with the opt and the exception of a failed
+                         request, returns whether it is issued again, see
+                         retryable().
+        :returns: a list of RequestResult, in the order of requests.
+        '''
+        requests = list(requests)
+        deadline = deadlines.Deadline.after(deadline)
+        results = [None] * len(requests)
+        pending = list(range(len(requests)))
+        if self._singlethread:
+            concurrency = 1
+        elif not concurrency:
+            concurrency = self._concurrent_connections * max(
+                len(self._api_providers), 1)
+        pool = eventlet.GreenPool(concurrency)
+        for attempt in range(retry_failed + 1):
+            if attempt:
+                LOG.debug("Retrying %d failed requests", len(pending))
+            if self._singlethread:
+                done = (self._request_result(requests[i], content_type,
+                                             deadline)
+                        for i in pending)
+            else:
+                done = pool.imap(self._request_result,
+                                 [requests[i] for i in pending],
+                                 [content_type] * len(pending),
+                                 [deadline] * len(pending))
+            for i, result in zip(pending, done):
+                results[i] = result
+            pending = [i for i in pending if not results[i].ok and
+                       retry_if(requests[i][0], results[i].exception)]
+            if not pending:
+                break
+        return results
+
+    def _request_result(self, opt_message, content_type, deadline=None):
+        opt, message = opt_message
+        try:
+            return RequestResult(True, self.request(opt, content_type,
+                                                    deadline, **message),
+                                 None)
+        except Exception as e:
+            return RequestResult(False, None, e)
+
+    @staticmethod
+    def _get_params(fields=None, skip_meta=False, expression=None):
+        if (fields and isinstance(expression, filters.Filter) and
+                not expression.exact):
+            # the attributes are needed to refine the results
+            fields = list(fields) + [f for f in expression.fields
+                                     if f not in fields]
+        return (urls.get_params(fields, skip_meta) +
+                filters.get_params(expression))
+
+    def cmdb(self, path, method='GET', mkey=None, vdom=None, params=None,
+             body=None, child=None, child_mkey=None, fields=None,
+             skip_meta=False, filter=None, content_type="application/json",
+             deadline=None, cache=True):
+        '''Issues a request to a CMDB table without rendering a template.
+
+        e.g. cmdb('firewall/addrgrp', mkey='grp1', child='member',
+        vdom='root') gets the members of the address group grp1.
+
+        :param path: path of the table under /api/v2/cmdb, e.g.
+                     firewall/address
+        :param method: the HTTP method
+        :param mkey: the key of the entry of the table
+        :param vdom: the vdom of the table
+        :param params: a dictionary of the query params
+        :param body: the request body, it is sent as it is
+        :param child: the name of the child table of the entry mkey
+        :param child_mkey: the key of the entry of the child table
+        :param fields: names of the attributes returned for every entry
+        :param skip_meta: leave the meta data of the entries out of the
+                          response
+        :param filter: a fortiosclient.filters.F expression, or a FortiOS
+                       filter string, the entries are filtered by FortiOS
+        :param deadline: seconds the request may take in all
+        :param cache: False to read the table from FortiOS even if the
+                      response cache has its response
+        '''
+        url = urls.api_url(urls.API_CMDB, path, mkey=mkey, child=child,
+                           child_mkey=child_mkey, vdom=vdom, params=params)
+        url = urls.add_query(url, self._get_params(fields, skip_meta, filter))
+        return filters.refine(filter,
+                              self._issue(method, url, body, content_type,
+                                          deadline, cache=cache))
+
+    def monitor(self, path, method='GET', vdom=None, params=None, body=None,
+                content_type="application/json", deadline=None):
+        '''Issues a request to a monitor API without rendering a template.
+
+        :param path: path of the API under /api/v2/monitor, e.g.
+                     system/status
+        :param method: the HTTP method
+        :param vdom: the vdom of the request
+        :param params: a dictionary of the query params
+        :param body: the request body, it is sent as it is
+        :param deadline: seconds the request may take in all
+        '''
+        url = urls.api_url(urls.API_MONITOR, path, vdom=vdom, params=params)
+        return self._issue(method, url, body, content_type, deadline)
+
+    def _table_schema(self, table, deadline=None):
+        '''Returns the schema of a CMDB table, None if it is unavailable.'''
+        table_schema = self._schemas.get(self._version, table)
+        if table_schema is not None:
+            return table_schema
+        url = urls.api_url(urls.API_CMDB, table, params={'action': 'schema'})
+        try:
+            response = self._issue('GET', url, None, "application/json",
+                                   deadline)
+        except exception.ApiException as e:
+            LOG.warning(_LW("Failed to get the schema of %(table)s, the "
+                            "requests to it are not validated: %(e)s"),
+                        {'table': table, 'e': e})
+            return None
+        table_schema = response.get('results') if response else None
+        if table_schema:
+            self._schemas.set(self._version, table, table_schema)
+        return table_schema
+
+    def _validate(self, method, url, body, deadline=None):
+        '''Validates the body of a CMDB request with the table schema.'''
+        if self._schemas is None or method not in ('POST', 'PUT') or not body:
+            return
+        location = schema.table_of(url)
+        if location is None:
+            return
+        table, children = location
+        table_schema = self._table_schema(table, deadline)
+        for child in children:
+            if table_schema is None:
+                break
+            table_schema = table_schema.get('children', {}).get(child)
+        if table_schema is None:
+            return
+        if isinstance(body, dict) and list(body) == ['json']:
+            body = body['json']
+        schema.validate(table_schema, body)
+
+    def _start(self, method, url, body, content_type, inline=False,
+               deadline=None, hedge_of=None):
+        '''Starts a request to controller.
+
+        :param inline: the request is processed by join() in the calling
+                       green thread instead of a green thread of its own.
+        :param deadline: the Deadline of the request, None if it has none.
+        :param hedge_of: the request this one is a hedge of, it is sent to
+                         another API provider once and not retried.
+        '''
+        self._validate(method, url, body, deadline)
+        retries = self._retries
+        exclude_provider = None
+        if hedge_of is not None:
+            retries = 0
+            exclude_provider = hedge_of.provider
         g = eventlet_request.GenericRequestEventlet(
             self, method, url, body, content_type, auto_login=True,
             http_timeout=self._http_timeout,
-            retries=self._retries, redirects=self._redirects,
-            singlethread=self._singlethread)
+            retries=retries, redirects=self._redirects,
+            singlethread=self._singlethread, inline=inline,
+            deadline=deadline, exclude_provider=exclude_provider)
         g.start()
-        response = g.join()
+        return g
+
+    def _issue(self, method, url, body, content_type, deadline=None,
+               opt=None, cache=True):
+        '''Issues a request to controller and decodes the response.
+
+        :param deadline: seconds the request may take, or a Deadline.
+        :param opt: the name of the API message of the request, if any.
+        :param cache: False not to use the response cache for a GET.
+        '''
+        deadline = deadlines.Deadline.after(deadline)
+        if method == 'GET' and body is None:
+            response = self._get(url, content_type, deadline, opt, cache)
+        else:
+            try:
+                response = self._fetch(method, url, body, content_type,
+                                       deadline)
+            finally:
+                if method != 'GET':
+                    self._written(url)
+        result = self._response(method, url, response)
+        if method != 'GET':
+            self._notify_write(method, url, body, result)
+        return result
+
+    def _get(self, url, content_type, deadline, opt=None, cache=True):
+        '''Issues a GET request, its response may be cached or shared.'''
+        response_cache = None
+        if cache and opt != CONFIG_CHECKSUM:
+            response_cache = self._cache
+        if response_cache is not None:
+            revision = self._revision(url, deadline)
+            response = response_cache.get(self._cache_provider, url,
+                                          revision)
+            if response is not None:
+                return response
+            generation = response_cache.generation
+            if revision is not None:
+                # the checksum last read is older than the response, which
+                # is revalidated against it. It is read before the request
+                # only if it is unknown.
+                checksum = self.config_gen
+                revision = checksum if checksum is not None else revision()
+        if self._coalesce_gets and not self._singlethread:
+            response = self._fetch_coalesced(url, content_type, deadline)
+        else:
+            response = self._fetch('GET', url, None, content_type, deadline)
+        if (response_cache is not None and response is not None and
+                response.status == 200):
+            response_cache.put(self._cache_provider, url, response, opt,
+                               generation, revision)
+        return response
+
+    def _revision(self, url, deadline):
+        '''Returns a function reading the configuration checksum once.
+
+        None is returned if the cached response of url is not revalidated.
+        '''
+        if not self._revalidate_cache or cache.location(url)[1] is None:
+            return None
+        checksums = []
+
+        def revision():
+            if not checksums:
+                checksums.append(self.config_checksum(deadline))
+            return checksums[0]
+        return revision
+
+    def config_checksum(self, deadline=None):
+        '''Returns the checksum of the configuration of FortiOS, or None.
+
+        It changes with any change of the configuration of any vdom, it is
+        reused for gen_timeout seconds and read again after the writes of
+        the client. After a failure to read it, None is returned without
+        reading it for a backoff doubling with every failure up to
+        CONFIG_CHECKSUM_BACKOFF_CAP seconds.
+        '''
+        if self._gen_timeout != -1 and self.config_gen is not None:
+            return self.config_gen
+        if time.time() < self._checksum_retry_at:
+            return None
+        checksum = self.config_checksums(deadline).get('all')
+        if checksum is None:
+            self._checksum_failures += 1
+            self._checksum_retry_at = time.time() + min(
+                CONFIG_CHECKSUM_BACKOFF_CAP,
+                2 ** (self._checksum_failures - 1))
+        else:
+            self._checksum_failures = 0
+        return checksum
+
+    def config_checksums(self, deadline=None):
+        '''Reads the checksums of the configuration of FortiOS.
+
+        :returns: a dictionary of the checksums of the global configuration,
+                  'global', of every vdom by name and of the whole
+                  configuration, 'all', empty if they are unavailable.
+        '''
+        self._config_checks += 1
+        try:
+            response = self.request(CONFIG_CHECKSUM, deadline=deadline)
+        except exception.ResourceNotFound:
+            LOG.warning(_LW("FortiOS has no configuration checksum, the "
+                            "cached responses are not revalidated"))
+            self._revalidate_cache = False
+            return {}
+        except exception.ApiException as e:
+            LOG.warning(_LW("Failed to read the configuration checksum: "
+                            "%s"), e)
+            return {}
+        checksums = self._config_checksums(response)
+        self.config_gen = checksums.get('all')
+        return checksums
+
+    @staticmethod
+    def _config_checksums(response):
+        results = response.get('results') if isinstance(response,
+                                                        dict) else None
+        if isinstance(results, dict):
+            results = [results]
+        # the checksums of the primary unit of a cluster first
+        members = sorted((m for m in results or () if isinstance(m, dict)),
+                         key=lambda m: not m.get('is_root_master'))
+        for member in members:
+            checksums = member.get('checksum')
+            if isinstance(checksums, dict) and checksums.get('all'):
+                return checksums
+        return {}
+
+    def add_write_listener(self, listener):
+        '''Calls listener(method, url, body, response) after every write.
+
+        The listeners are called with the decoded response of every
+        request of another method than GET the client issued successfully,
+        their exceptions are logged and ignored.
+        '''
+        self._write_listeners.append(listener)
+
+    def _notify_write(self, method, url, body, response):
+        for listener in self._write_listeners:
+            try:
+                listener(method, url, body, response)
+            except Exception:
+                LOG.exception(_LE("Exception in the write listener %s"),
+                              listener)
+
+    def cache_stats(self):
+        '''Returns the statistics of the response cache, or None.
+
+        The hits, misses, revalidated responses, entries and bytes of the
+        cache, which may be shared with other clients, and the number of
+        times this client read the configuration checksum, config_checks.
+        '''
+        if self._cache is None:
+            return None
+        stats = self._cache.stats()
+        stats['config_checks'] = self._config_checks
+        return stats
+
+    def _written(self, url):
+        '''Drops the GET responses a write to url may have changed.'''
+        # the GET requests in flight may not see the change, the next ones
+        # don't share their responses
+        self._gets_in_flight.clear()
+        if self._cache is not None:
+            self._cache.invalidate(self._cache_provider, url)
+        # the configuration changed
+        self.config_gen = None
+
+    def _fetch(self, method, url, body, content_type, deadline):
+        '''Issues a request to controller, returns its HTTP response.'''
+        if (self._hedge_requests and method == 'GET' and
+                not self._singlethread and len(self._api_providers) > 1):
+            return self._issue_hedged(method, url, body, content_type,
+                                      deadline)
+        g = self._start(method, url, body, content_type,
+                        inline=self._inline_requests, deadline=deadline)
+        return g.join()
+
+    def _fetch_coalesced(self, url, content_type, deadline):
+        '''Issues a GET request, or waits for the same one in flight.
+
+        The HTTP response of a GET request is shared by the identical GET
+        requests issued while it is in flight, every caller decodes it.
+        '''
+        key = (url, content_type)
+        while True:
+            flight = self._gets_in_flight.get(key)
+            if flight is None:
+                break
+            with eventlet.Timeout(deadlines.bounded(deadline), False):
+                response = flight.wait()
+                if response is not _CANCELLED:
+                    return response
+                continue
+            return None
+        flight = eventlet.event.Event()
+        self._gets_in_flight[key] = flight
+        try:
+            response = self._fetch('GET', url, None, content_type, deadline)
+        except Exception as e:
+            flight.send_exception(e)
+            raise
+        except BaseException:
+            # cancelled, the waiting requests are issued again
+            flight.send(_CANCELLED)
+            raise
+        finally:
+            if self._gets_in_flight.get(key) is flight:
+                del self._gets_in_flight[key]
+        flight.send(response)
+        return response
+
+    def hedge_delay(self):
+        '''Return the seconds a GET request is hedged after, or None.'''
+        if self._hedge_delay is not None:
+            return self._hedge_delay
+        if len(self._get_latency) < HEDGE_MIN_SAMPLES:
+            return None
+        return self._get_latency.percentile(95)
+
+    @staticmethod
+    def _join(request):
+        try:
+            return request.join()
+        except Exception as e:
+            LOG.debug("Hedged request failed: %s", e)
+            return None
+
+    def _issue_hedged(self, method, url, body, content_type, deadline):
+        '''Issues a GET request, hedged if it is not answered in time.'''
+        start = time.time()
+        first = self._start(method, url, body, content_type,
+                            deadline=deadline)
+        delay = self.hedge_delay()
+        if (delay is not None and deadline is not None and
+                delay >= deadline.remaining()):
+            # a hedge would be issued as the deadline expires
+            delay = None
+        # without a delay the first request is waited for, its latency
+        # is a sample of the delay of the next ones
+        with eventlet.Timeout(delay, False):
+            response = first.join()
+            self._get_latency.add(time.time() - start)
+            return response
+        if first.provider is None:
+            # still waiting for a connection, a hedge would wait as well
+            return first.join()
+        second = self._start(method, url, body, content_type,
+                             deadline=deadline, hedge_of=first)
+        done = eventlet.queue.LightQueue()
+        first.link(done.put)
+        second.link(done.put)
+        winner = done.get()
+        response = self._join(winner)
+        if response is None:
+            # the first to complete failed, wait for the other one
+            winner = done.get()
+            response = self._join(winner)
+        # the other request completes in the background, its response is
+        # dropped: killed in the middle of the request it would close the
+        # connections to its provider and lower its concurrency limit
+        # the latency of the first request is at least this long
+        self._get_latency.add(time.time() - start)
+        LOG.debug("Hedged GET %(url)s answered by %(provider)s",
+                  {'url': url, 'provider': winner.provider})
+        return response
 
+    def _response(self, method, url, response):
+        '''Decodes the response of a request to controller.'''
         # response is a modified HTTPResponse object or None.
         # response.read() will not work on response as the underlying library
         # request_eventlet.ApiRequestEventlet has already called this
@@ -141,17 +804,24 @@ class FortiosApiClient(eventlet_client.EventletApiClient):
                        'status': response.status, 'body': response.body})
             return None
 
-        if url == jsonutils.loads(templates.LOGOUT)['path']:
+        if url == operations.LOGOUT_PATH:
             return response.body
         else:
             try:
-                return jsonutils.loads(response.body)
+                result = jsonutils.loads(response.body)
             except UnicodeDecodeError:
                 LOG.debug("The following strings cannot be decoded with "
                           "'utf-8, trying 'ISO-8859-1' instead. %(body)s",
                           {'body': response.body})
-                return jsonutils.loads(response.body, encoding='ISO-8859-1')
+                result = jsonutils.loads(response.body, encoding='ISO-8859-1')
             except Exception as e:
                 LOG.error(_LE("Decode error, the response.body %(body)s"),
                           {'body': response.body})
                 raise e
+            version = schema.firmware_version(result)
+            if version and version != self._version:
+                if self._version is None and self._schemas is not None:
+                    # the schemas fetched so far are of this version
+                    self._schemas.adopt(version)
+                self._version = version
+            return result
@@ -0,0 +1,220 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Cache of the responses of the GET requests.
+
+The responses are kept for the TTL of their API message and dropped, the
+least recently used first, once the cache holds more than max_entries
+responses or max_bytes bytes of response bodies. A write to a CMDB table
+drops the cached responses of the table in the vdom written to, any other
+write drops every cached response of the FortiGate.
+
+The responses of the CMDB tables may be stamped with the checksum of the
+configuration of FortiOS read before they were requested. Once expired,
+such a response is served again for another TTL if the configuration
+checksum has not changed since, which takes one small request instead of
+fetching the table again.
+"""
+
+import collections
+import threading
+import time
+
+import six.moves.urllib.parse as urlparse
+
+from fortiosclient import schema
+
+DEFAULT_TTL = 5
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+CacheEntry = collections.namedtuple(
+    'CacheEntry', ['provider', 'vdom', 'table', 'ttl', 'expires', 'size',
+                   'revision', 'response'])
+
+
+def _vdom(query):
+    for name, value in urlparse.parse_qsl(query):
+        if name == 'vdom':
+            return value
+    return None
+
+
+def location(url):
+    """Return the (vdom, table) of the url of a request.
+
+    table is the CMDB table of the url, e.g. firewall/address, or None if
+    the url is not a CMDB table.
+    """
+    parts = urlparse.urlsplit(url)
+    table = schema.table_of(parts.path)
+    return _vdom(parts.query), table[0] if table else None
+
+
+def _size(response):
+    body = getattr(response, 'body', None)
+    return len(body) if body else 0
+
+
+class ResponseCache(object):
+    """The HTTP responses of GET requests by FortiGate, vdom and url.
+
+    A cache may be shared by several clients, the responses are kept by
+    the API providers of the client.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, ttls=None,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        '''Constructor.
+
+        :param ttl: seconds the responses are kept for.
+        :param ttls: a dictionary of the seconds the responses of the API
+                     messages are kept for by name, e.g. {'GET_VDOM': 60},
+                     the responses of the messages whose TTL is 0 are not
+                     cached.
+        :param max_entries: maximum number of responses in the cache.
+        :param max_bytes: maximum size of the response bodies in the cache.
+        '''
+        self._ttl = ttl
+        self._ttls = dict(ttls or {})
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        # incremented by every invalidation, the responses of the requests
+        # issued before one are not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # expired responses served again after a configuration check
+        self.revalidated = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        '''The size of the response bodies in the cache.'''
+        return self._bytes
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def ttl(self, opt=None):
+        '''Return the seconds the responses of API message opt are kept.'''
+        return self._ttls.get(opt, self._ttl)
+
+    def stats(self):
+        '''Return the statistics of the cache, a dictionary.'''
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'revalidated': self.revalidated,
+                    'entries': len(self._entries), 'bytes': self._bytes}
+
+    def get(self, provider, url, revision=None):
+        '''Return the cached response of GET url, or None.
+
+        :param revision: called without arguments to get the current
+                         configuration checksum when the cached response
+                         is expired but was stamped with a checksum, the
+                         response is served for another TTL if they match.
+        '''
+        key = (provider, url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > time.time():
+                self._move_to_end(key)
+                self.hits += 1
+                return entry.response
+        current = None
+        if entry is not None and entry.revision is not None and revision:
+            current = revision()
+        with self._lock:
+            if entry is None or self._entries.get(key) is not entry:
+                self.misses += 1
+                return None
+            if current is None or current != entry.revision:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries[key] = entry._replace(
+                expires=time.time() + entry.ttl)
+            self._move_to_end(key)
+            self.hits += 1
+            self.revalidated += 1
+            return entry.response
+
+    def put(self, provider, url, response, opt=None, generation=None,
+            revision=None):
+        '''Cache the response of GET url.
+
+        :param opt: the name of the API message of the request.
+        :param generation: the generation of the cache when the request
+                           was issued, the response is not cached if an
+                           invalidation happened since.
+        :param revision: the configuration checksum read before the
+                         request was issued.
+        '''
+        ttl = self.ttl(opt)
+        size = _size(response)
+        if not ttl or size > self._max_bytes:
+            return
+        vdom, table = location(url)
+        key = (provider, url)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = CacheEntry(provider, vdom, table, ttl,
+                                            time.time() + ttl, size,
+                                            revision, response)
+            self._bytes += size
+            while (len(self._entries) > self._max_entries or
+                   self._bytes > self._max_bytes):
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, provider, url=None):
+        '''Drop the cached responses a write to url may have changed.
+
+        The responses of the CMDB table of url are dropped, in the vdom of
+        url or in every vdom if the vdom is not given, every response of
+        provider if url is not a CMDB table or None.
+        '''
+        vdom, table = location(url) if url else (None, None)
+        with self._lock:
+            self._generation += 1
+            for key, entry in list(self._entries.items()):
+                if entry.provider != provider:
+                    continue
+                if (table is None or entry.table == table and
+                        (vdom is None or entry.vdom in (None, vdom))):
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key).size
+
+    def _move_to_end(self, key):
+        self._entries[key] = self._entries.pop(key)
@@ -24,6 +24,7 @@ DEFAULT_RETRIES = 3
 DEFAULT_REDIRECTS = 2
 DEFAULT_API_REQUEST_POOL_SIZE = 1
 DEFAULT_MAXIMUM_REQUEST_ID = 4294967295
+DEFAULT_TEMPLATE_CACHE_SIZE = 100
 DOWNLOAD_TIMEOUT = 180
 USER_AGENT = "Neutron eventlet client/2.0"
 
@@ -0,0 +1,65 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""The time the API calls give up at, shared by all the steps of a call."""
+
+import time
+
+
+class Deadline(object):
+    """The point in time a call gives up at.
+
+    The connection acquisition, the login, every attempt and redirect of a
+    request only get the time remaining before the deadline.
+    """
+
+    def __init__(self, seconds):
+        self.expires_at = time.time() + seconds
+
+    @classmethod
+    def after(cls, seconds):
+        '''Return the Deadline in seconds, None if seconds is None.
+
+        seconds may already be a Deadline, it is returned as it is.
+        '''
+        if seconds is None or isinstance(seconds, Deadline):
+            return seconds
+        return cls(seconds)
+
+    def remaining(self):
+        '''Return the seconds remaining before the deadline, at least 0.'''
+        return max(0.0, self.expires_at - time.time())
+
+    def expired(self):
+        return time.time() >= self.expires_at
+
+    def timeout(self, timeout=None):
+        '''Return timeout, bounded by the seconds remaining.
+
+        :param timeout: seconds a step may take, unbounded if None.
+        '''
+        remaining = self.remaining()
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+
+def bounded(deadline, timeout=None):
+    """Return timeout bounded by deadline, which may be None."""
+    if deadline is None:
+        return timeout
+    return deadline.timeout(timeout)
@@ -0,0 +1,42 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Statistics of the latency of the requests."""
+
+import collections
+import math
+
+
+class LatencyTracker(object):
+    """The latencies of the last size requests."""
+
+    def __init__(self, size=200):
+        self._samples = collections.deque(maxlen=size)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, percent):
+        '''Return the percent-th percentile of the latencies, or None.'''
+        if not self._samples:
+            return None
+        samples = sorted(self._samples)
+        index = int(math.ceil(percent / 100.0 * len(samples))) - 1
+        return samples[min(max(index, 0), len(samples) - 1)]
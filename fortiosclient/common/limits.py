@@ -0,0 +1,186 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Limits of the requests in progress to an API provider."""
+
+import collections
+import time
+
+import eventlet
+
+
+class ConcurrencyLimit(object):
+    """A fixed limit of the requests in progress."""
+
+    def __init__(self, limit):
+        self._limit = limit
+        self._in_flight = 0
+        self._waiters = collections.deque()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def _wake(self):
+        while self._waiters and self._in_flight < self.limit:
+            self._in_flight += 1
+            self._waiters.popleft().send()
+
+    def try_acquire(self):
+        '''Acquires the limit if a request can be issued right away.
+
+        :returns: False if the limit is reached.
+        '''
+        if not self._waiters and self._in_flight < self.limit:
+            self._in_flight += 1
+            return True
+        return False
+
+    def acquire(self, timeout=None):
+        '''Blocks until a request can be issued.
+
+        :param timeout: seconds to wait for at most, forever if None.
+        :returns: False if timeout expired first.
+        '''
+        if self.try_acquire():
+            return True
+        waiter = eventlet.event.Event()
+        self._waiters.append(waiter)
+        try:
+            with eventlet.Timeout(timeout, False):
+                waiter.wait()
+        except BaseException:
+            # killed while waiting, give the slot back if it was granted
+            if waiter.ready():
+                self._in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        if not waiter.ready():
+            self._waiters.remove(waiter)
+            return False
+        return True
+
+    def release(self, latency=None, status=None, kind=None):
+        '''Marks a request as complete.
+
+        :param latency: seconds the request took, None if unknown.
+        :param status: the HTTP status of the response, None if the request
+                       failed.
+        :param kind: the kind of the request, the latencies of the requests
+                     of different kinds are not compared.
+        '''
+        self._in_flight -= 1
+        self._wake()
+
+    def cancel(self):
+        '''Gives back the limit acquired for a request that was not issued.'''
+        self._in_flight -= 1
+        self._wake()
+
+
+class _IdleLatency(object):
+    """The lowest latency of the last window requests of a kind."""
+
+    def __init__(self, window):
+        self._window = window
+        self._samples = 0
+        self._window_latency = None
+        self.idle = None
+
+    def sample(self, latency):
+        if self._window_latency is None or latency < self._window_latency:
+            self._window_latency = latency
+        if self.idle is None or latency < self.idle:
+            self.idle = latency
+        self._samples += 1
+        if self._samples >= self._window:
+            # forget the lowest latencies of the past windows so that the
+            # idle latency follows the changes of FortiOS and the network
+            self.idle = self._window_latency
+            self._window_latency = None
+            self._samples = 0
+        return self.idle
+
+
+class AdaptiveConcurrencyLimit(ConcurrencyLimit):
+    """A limit of the requests in progress following the load of FortiOS.
+
+    The limit is raised by one every limit successful requests (additive
+    increase) as long as it is used and the latency stays close to the
+    latency of an idle FortiOS, it is multiplied by backoff (multiplicative
+    decrease) when FortiOS answers 503, a request fails or the latency goes
+    over tolerance times the idle latency.
+
+    The idle latency is the lowest latency of the last window requests of
+    the same kind: the writes or the reads of whole tables take longer than
+    the reads of single entries even on an idle FortiOS.
+    """
+
+    def __init__(self, limit, min_limit=1, max_limit=None, backoff=0.5,
+                 tolerance=2.0, window=100):
+        super(AdaptiveConcurrencyLimit, self).__init__(limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._backoff = backoff
+        self._tolerance = tolerance
+        self._window = window
+        self._latencies = {}
+        self._decreased_at = 0
+
+    def idle_latency(self, kind=None):
+        latency = self._latencies.get(kind)
+        return latency.idle if latency is not None else None
+
+    def _sample(self, latency, kind):
+        if kind not in self._latencies:
+            self._latencies[kind] = _IdleLatency(self._window)
+        return self._latencies[kind].sample(latency)
+
+    def _decrease(self, latency):
+        now = time.time()
+        # the requests issued before the last decrease were issued under
+        # the previous limit, they don't count
+        if latency is not None and now - latency < self._decreased_at:
+            return
+        self._decreased_at = now
+        self._limit = max(self._min_limit, self._limit * self._backoff)
+
+    def _increase(self, in_flight):
+        # only raise a limit in use, an idle client tells nothing of FortiOS
+        if in_flight * 2 < self._limit:
+            return
+        self._limit += 1.0 / self._limit
+        if self._max_limit is not None:
+            self._limit = min(self._limit, self._max_limit)
+
+    def release(self, latency=None, status=None, kind=None):
+        in_flight = self._in_flight
+        if status is None or status == 503:
+            self._decrease(latency)
+        elif latency is not None:
+            idle_latency = self._sample(latency, kind)
+            if latency > idle_latency * self._tolerance:
+                self._decrease(latency)
+            else:
+                self._increase(in_flight)
+        super(AdaptiveConcurrencyLimit, self).release(latency, status, kind)
@@ -0,0 +1,165 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""When and how long to wait before a failed request is issued again."""
+
+import email.utils
+import random
+import threading
+import time
+
+import six
+
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30
+# statuses FortiOS answers when the session cookie is not valid, the
+# request is issued again at once after a new login. It may answer 400 as
+# well, those are retried only if the request marked the response as
+# session_expired.
+REAUTH_STATUSES = (401, 403)
+BACKOFF_STATUSES = (503,)
+
+
+def retry_after(response):
+    """Return the seconds to wait for of the Retry-After header, or None."""
+    try:
+        value = response.getheader('Retry-After')
+    except Exception:
+        return None
+    if not isinstance(value, six.string_types):
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(date) - time.time())
+
+
+class RetryBudget(object):
+    """Limits the retries to a ratio of the requests.
+
+    Every request adds ratio to the budget, every retry takes one from it,
+    and min_per_second is added every second so that the retries of a
+    client issuing few requests are not starved. The budget is at most
+    capacity, its initial value.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, capacity=10.0):
+        self._ratio = ratio
+        self._min_per_second = min_per_second
+        self._capacity = capacity
+        self._balance = capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount):
+        now = time.time()
+        amount += (now - self._updated) * self._min_per_second
+        self._updated = now
+        self._balance = min(self._capacity, self._balance + amount)
+
+    @property
+    def balance(self):
+        with self._lock:
+            self._refill(0)
+            return self._balance
+
+    def deposit(self):
+        '''Called for every request.'''
+        with self._lock:
+            self._refill(self._ratio)
+
+    def withdraw(self):
+        '''Called before a retry, returns False if it is over budget.'''
+        with self._lock:
+            self._refill(0)
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class RetryPolicy(object):
+    """Exponential backoff with full jitter.
+
+    The n-th retry waits for a random time between 0 and
+    min(cap, base * 2 ** (n - 1)) seconds, or for the time of the
+    Retry-After header of the response when there is one.
+    """
+
+    def __init__(self, base=BACKOFF_BASE, cap=BACKOFF_CAP,
+                 reauth_statuses=REAUTH_STATUSES,
+                 backoff_statuses=BACKOFF_STATUSES,
+                 budget_ratio=0.2, budget_min_per_second=1.0,
+                 budget_capacity=10.0):
+        '''Constructor.
+
+        :param base: seconds to wait for, at most, before the first retry.
+        :param cap: maximum seconds to wait for before a retry, a request
+                    whose Retry-After is longer is not retried.
+        :param reauth_statuses: statuses retried at once.
+        :param backoff_statuses: statuses retried after a backoff, the
+                                 failed requests are retried after a
+                                 backoff as well.
+        :param budget_ratio: ratio of the requests of a client retried, see
+                             RetryBudget.
+        '''
+        self.base = base
+        self.cap = cap
+        self.reauth_statuses = frozenset(reauth_statuses)
+        self.backoff_statuses = frozenset(backoff_statuses)
+        self._budget = (budget_ratio, budget_min_per_second, budget_capacity)
+
+    def backoff(self, attempt):
+        '''Return the seconds to wait for before retrying attempt.'''
+        return random.uniform(0, min(self.cap,
+                                     self.base * 2 ** (attempt - 1)))
+
+    def reauth(self, response):
+        '''Whether response is retried at once after a new login.
+
+        Those retries are not taken from the RetryBudget, they don't add
+        load to a struggling FortiOS.
+        '''
+        return (response is not None and
+                (response.status in self.reauth_statuses or
+                 getattr(response, 'session_expired', False) is True))
+
+    def delay(self, attempt, response=None):
+        '''Return the seconds to wait for before the next attempt.
+
+        :param attempt: the number of the attempt which failed, from 1.
+        :param response: the HTTPResponse of the attempt, None if the
+                         request failed.
+        :returns: None if the request is not to be retried.
+        '''
+        if response is None:
+            return self.backoff(attempt)
+        if self.reauth(response):
+            return 0
+        if response.status not in self.backoff_statuses:
+            return None
+        seconds = retry_after(response)
+        if seconds is None:
+            return self.backoff(attempt)
+        return seconds if seconds <= self.cap else None
+
+    def new_budget(self):
+        '''Return a RetryBudget for a client.'''
+        return RetryBudget(*self._budget)
@@ -0,0 +1,125 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Build the urls of the FortiOS REST API."""
+
+import six
+import six.moves.urllib.parse as urlparse
+
+API_CMDB = '/api/v2/cmdb'
+API_MONITOR = '/api/v2/monitor'
+
+
+def quote(value):
+    """Quote value to be used as a path segment or a query param."""
+    if not isinstance(value, six.string_types):
+        value = six.text_type(value)
+    if isinstance(value, six.text_type):
+        value = value.encode('utf-8')
+    return urlparse.quote(value, safe='')
+
+
+def _query_value(value):
+    if value is True:
+        return '1'
+    if value is False:
+        return '0'
+    return quote(value)
+
+
+def query_string(params=None, vdom=None):
+    """Return the query string of params, including the leading '?'.
+
+    :param params: a dictionary or a list of (name, value) pairs, params
+                   whose value is None are left out and the params with a
+                   list value are repeated for every item of the list.
+    :param vdom: the vdom the request is sent to.
+    """
+    if params is None:
+        params = []
+    elif isinstance(params, dict):
+        params = sorted(params.items())
+    if vdom is not None:
+        params = [('vdom', vdom)] + [p for p in params if p[0] != 'vdom']
+    query = []
+    for name, value in params:
+        if value is None:
+            continue
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        query.extend('%s=%s' % (quote(name), _query_value(v))
+                     for v in value)
+    return '?' + '&'.join(query) if query else ''
+
+
+def api_path(base, path, mkey=None, child=None, child_mkey=None):
+    """Return the path of a table, an entry or a child table of an entry.
+
+    e.g. api_path(API_CMDB, 'firewall/addrgrp', 'grp1', 'member') is
+    /api/v2/cmdb/firewall/addrgrp/grp1/member
+
+    :param base: API_CMDB or API_MONITOR
+    :param path: the path of the table, e.g. firewall/address
+    :param mkey: the key of the entry of the table
+    :param child: the name of the child table of the entry
+    :param child_mkey: the key of the entry of the child table
+    """
+    segments = [base.rstrip('/'), path.strip('/')]
+    if child is not None and mkey is None:
+        raise ValueError("The mkey is required to address child table "
+                         "%s" % child)
+    if child_mkey is not None and child is None:
+        raise ValueError("The child table is required to address child "
+                         "entry %s" % child_mkey)
+    if mkey is not None:
+        segments.append(quote(mkey))
+    if child is not None:
+        segments.append(child.strip('/'))
+    if child_mkey is not None:
+        segments.append(quote(child_mkey))
+    return '/'.join(segments)
+
+
+def api_url(base, path, mkey=None, child=None, child_mkey=None, vdom=None,
+            params=None):
+    """Return the path and the query string of an API request."""
+    return (api_path(base, path, mkey, child, child_mkey) +
+            query_string(params, vdom))
+
+
+def add_query(url, params):
+    """Return url with the query params of params appended."""
+    query = query_string(params)
+    if not query:
+        return url
+    return url + ('&' if '?' in url else '?') + query[1:]
+
+
+def get_params(fields=None, skip_meta=False):
+    """Return the query params of a GET request.
+
+    :param fields: names of the attributes returned for every entry,
+                   FortiOS format= param
+    :param skip_meta: leave the meta data of the entries out of the
+                      response, FortiOS skip= param
+    """
+    params = []
+    if fields:
+        params.append(('format', '|'.join(fields)))
+    if skip_meta:
+        params.append(('skip', True))
+    return params
@@ -0,0 +1,113 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Ahead-of-time compiled API message templates.
+
+Every template in fortiosclient.templates is compiled by
+tools/compile_templates.py into a module named tmpl_<operation>, e.g.
+tmpl_add_firewall_policy. The modules are imported lazily, one per
+operation, the first time the operation is requested. A module is only
+used if it was compiled from the current template source with the
+installed jinja2 version, otherwise the template is compiled from source.
+
+The modules are not kept in the source tree, they are generated where the
+package is built or installed, for the jinja2 version installed there,
+before the package is built:
+
+    python tools/compile_templates.py
+"""
+
+import hashlib
+import importlib
+import sys
+
+import jinja2
+try:
+    from oslo_log import log as logging
+except Exception:
+    import logging
+
+from fortiosclient._i18n import _LI
+
+LOG = logging.getLogger(__name__)
+
+MODULE_PREFIX = 'tmpl_'
+
+HEADER = """# Generated by tools/compile_templates.py from
+# fortiosclient/templates.py, do not edit.
+JINJA_VERSION = %(version)r
+SOURCE_CHECKSUM = %(checksum)r
+"""
+
+# whether the compiled modules skipped for their jinja2 version were logged
+_version_logged = False
+
+
+def module_name(opt):
+    return MODULE_PREFIX + opt.lower()
+
+
+def checksum(source):
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+def compile_module(environment, opt, source):
+    """Return the source of the compiled module of the API message opt."""
+    code = environment.compile(source, opt, None, raw=True, defer_init=True)
+    return '%s%s\n' % (HEADER % {'version': jinja2.__version__,
+                                  'checksum': checksum(source)}, code)
+
+
+def load(environment, opt, source, globals=None):
+    """Load the compiled template of the API message opt.
+
+    :param environment: jinja2 environment the template is bound to.
+    :param opt: name of the API message defined in templates.
+    :param source: current source of the template.
+    :param globals: template globals.
+    :returns: a jinja2 Template or None if no up to date compiled module
+              was generated for the operation.
+    """
+    name = '%s.%s' % (__name__, module_name(opt))
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        return None
+    # the environment is stored in the module namespace when the template
+    # is created, do not share the module between environments.
+    sys.modules.pop(name, None)
+    version = getattr(module, 'JINJA_VERSION', None)
+    if version != jinja2.__version__:
+        _log_version(version)
+        return None
+    if getattr(module, 'SOURCE_CHECKSUM', None) != checksum(source):
+        return None
+    return environment.template_class.from_module_dict(
+        environment, module.__dict__, globals or {})
+
+
+def _log_version(version):
+    global _version_logged
+    if _version_logged:
+        return
+    _version_logged = True
+    LOG.info(_LI("The API message templates were compiled with jinja2 "
+                 "%(compiled)s, jinja2 %(installed)s is installed, they are "
+                 "compiled at runtime instead. Run "
+                 "tools/compile_templates.py to compile them ahead of "
+                 "time."),
+             {'compiled': version, 'installed': jinja2.__version__})
@@ -18,7 +18,6 @@
 import time
 
 import eventlet
-eventlet.monkey_patch(thread=False, socket=False)
 
 try:
     import Queue
@@ -32,6 +31,9 @@ except Exception:
 
 from fortiosclient import base
 from fortiosclient.common import constants as csts
+from fortiosclient.common import limits
+from fortiosclient.common import retry
+from fortiosclient import eventlet_http
 from fortiosclient import eventlet_request
 
 LOG = logging.getLogger(__name__)
@@ -44,7 +46,9 @@ class EventletApiClient(base.ApiClientBase):
                  concurrent_connections=csts.DEFAULT_CONCURRENT_CONNECTIONS,
                  gen_timeout=csts.GENERATION_ID_TIMEOUT,
                  connect_timeout=csts.DEFAULT_CONNECT_TIMEOUT,
-                 singlethread=False):
+                 singlethread=False, request_pool_size=None,
+                 provider_concurrency=None, adaptive_concurrency=False,
+                 retry_policy=None, green_sockets=True):
         '''Constructor
 
         :param api_providers: a list of tuples of the form: (host, port,
@@ -55,12 +59,26 @@ class EventletApiClient(base.ApiClientBase):
         :param connect_timeout: connection timeout in seconds.
         :param gen_timeout controls how long the generation id is kept
             if set to -1 the generation id is never timed out
+        :param request_pool_size: number of green threads processing the
+            requests of the client, the number of connections by default.
+        :param provider_concurrency: maximum number of requests in progress
+            to one API provider, not limited by default.
+        :param adaptive_concurrency: adapt the maximum number of requests in
+            progress to every API provider to its latency and 503 responses,
+            from provider_concurrency, concurrent_connections by default,
+            up to concurrent_connections.
+        :param retry_policy: a fortiosclient.common.retry.RetryPolicy, when
+            and how long to wait before the failed requests are retried.
+        :param green_sockets: the connections use green sockets, which only
+            block the green thread waiting for the network, in single
+            thread mode the connections always use standard sockets.
         '''
         if not api_providers:
             api_providers = []
         self._api_providers = set([tuple(p) for p in api_providers])
         self._api_provider_data = {}  # tuple(semaphore, session_cookie)
         self._singlethread = singlethread
+        self._green_sockets = green_sockets and not singlethread
         for p in self._api_providers:
             self._set_provider_data(p, self.get_default_data())
         self._user = user
@@ -71,6 +89,19 @@ class EventletApiClient(base.ApiClientBase):
         self._config_gen = None
         self._config_gen_ts = None
         self._gen_timeout = gen_timeout
+        self._provider_concurrency = provider_concurrency
+        self._adaptive_concurrency = adaptive_concurrency
+        self._provider_limits = {}
+        self._retry_policy = retry_policy or retry.RetryPolicy()
+        # The retries of all the requests of the client are budgeted.
+        self._retry_budget = self._retry_policy.new_budget()
+
+        # Pool of the green threads processing the requests of this client.
+        self._request_pool = None
+        if not self._singlethread:
+            self._request_pool = eventlet.GreenPool(
+                request_pool_size or
+                max(concurrent_connections * len(self._api_providers), 1))
 
         # Connection pool is a list of queues.
         if self._singlethread:
@@ -85,6 +116,57 @@ class EventletApiClient(base.ApiClientBase):
                 self._conn_pool.put((self._next_conn_priority, conn))
                 self._next_conn_priority += 1
 
+    def _create_connection(self, host, port, is_ssl):
+        if not self._green_sockets:
+            return super(EventletApiClient, self)._create_connection(
+                host, port, is_ssl)
+        return eventlet_http.create_connection(host, port, is_ssl,
+                                               self._connect_timeout)
+
+    @property
+    def request_pool(self):
+        return self._request_pool
+
+    @property
+    def retry_policy(self):
+        return self._retry_policy
+
+    @property
+    def retry_budget(self):
+        return self._retry_budget
+
+    def provider_limit(self, conn):
+        '''Return the ConcurrencyLimit of the API provider of conn.
+
+        None is returned if the requests to the provider are not limited.
+        '''
+        if self._singlethread or not (self._provider_concurrency or
+                                      self._adaptive_concurrency):
+            return None
+        conn_params = self._normalize_conn_params(conn)
+        limit = self._provider_limits.get(conn_params)
+        if limit is None:
+            if self._adaptive_concurrency:
+                initial = (self._provider_concurrency or
+                           self._concurrent_connections)
+                limit = limits.AdaptiveConcurrencyLimit(
+                    initial,
+                    max_limit=max(initial, self._concurrent_connections))
+            else:
+                limit = limits.ConcurrencyLimit(self._provider_concurrency)
+            self._provider_limits[conn_params] = limit
+        return limit
+
+    def concurrency_limits(self):
+        '''Return the current limit of the requests in progress by provider.
+
+        :returns: a dictionary of the limits by (host, port, is_ssl), only
+                  the providers with a limit which received requests are
+                  included.
+        '''
+        return dict((conn_params, limit.limit)
+                    for conn_params, limit in self._provider_limits.items())
+
     def get_default_data(self):
         if self._singlethread:
             return None, None
@@ -92,7 +174,7 @@ class EventletApiClient(base.ApiClientBase):
             return eventlet.semaphore.Semaphore(1), None
 
     def acquire_redirect_connection(self, conn_params, auto_login=True,
-                                    headers=None):
+                                    headers=None, deadline=None):
         """Check out or create connection to redirected NSX API server.
 
         Args:
@@ -100,6 +182,7 @@ class EventletApiClient(base.ApiClientBase):
                 self._conn_params()
             auto_login: returned connection should have valid session cookie
             headers: headers to pass on if auto_login
+            deadline: Deadline of the login if auto_login
 
         Returns: An available HTTPConnection instance corresponding to the
                  specified conn_params. If a connection did not previously
@@ -150,16 +233,17 @@ class EventletApiClient(base.ApiClientBase):
         if result_conn:
             result_conn.last_used = time.time()
             if auto_login and self.auth_cookie(conn) is None:
-                self._wait_for_login(result_conn, headers)
+                self._wait_for_login(result_conn, headers, deadline)
         return result_conn
 
-    def _login(self, conn=None, headers=None):
+    def _login(self, conn=None, headers=None, deadline=None):
         if self._token:
             return self._token
         '''Issue login request and update authentication cookie.'''
         cookie = None
         g = eventlet_request.LoginRequestEventlet(
-            self, self._user, self._password, conn, headers)
+            self, self._user, self._password, conn, headers,
+            deadline=deadline)
         g.start()
         ret = g.join()
         if ret:
@@ -0,0 +1,86 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""HTTP(S) connections on green sockets.
+
+The connections of the standard library block the eventlet hub while they
+wait for the network, these ones only block their green thread, without
+monkey patching the process. They are subclasses of the standard ones so
+the responses are standard HTTPResponse.
+"""
+
+import socket
+import ssl
+
+from eventlet.green import socket as green_socket
+from eventlet.green import ssl as green_ssl
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+
+
+def _unverified_context():
+    # the certificates of the FortiGates are not verified, as by
+    # ApiClientBase._create_connection()
+    context = green_ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def _connect(conn):
+    sock = green_socket.create_connection((conn.host, conn.port),
+                                          conn.timeout, conn.source_address)
+    sock.setsockopt(green_socket.IPPROTO_TCP, green_socket.TCP_NODELAY, 1)
+    return sock
+
+
+class HTTPConnection(httplib.HTTPConnection):
+    """An HTTPConnection on a green socket."""
+
+    def connect(self):
+        self.sock = _connect(self)
+        if self._tunnel_host:
+            self._tunnel()
+
+
+class HTTPSConnection(httplib.HTTPSConnection):
+    """An HTTPSConnection on a green SSL socket."""
+
+    def __init__(self, host, port=None,
+                 timeout=socket._GLOBAL_DEFAULT_TIMEOUT, context=None):
+        super(HTTPSConnection, self).__init__(
+            host, port, timeout=timeout,
+            context=context or _unverified_context())
+
+    def connect(self):
+        self.sock = _connect(self)
+        if self._tunnel_host:
+            self._tunnel()
+            server_hostname = self._tunnel_host
+        else:
+            server_hostname = self.host
+        self.sock = self._context.wrap_socket(self.sock,
+                                              server_hostname=server_hostname)
+
+
+def create_connection(host, port, is_ssl, timeout):
+    """Return a green HTTP(S) connection to host:port."""
+    if is_ssl:
+        return HTTPSConnection(host, port, timeout=timeout)
+    return HTTPConnection(host, port, timeout=timeout)
@@ -32,8 +32,9 @@ except Exception:
 
 from fortiosclient._i18n import _LI, _LW
 from fortiosclient.common import constants as csts
+from fortiosclient.common import deadline as deadlines
+from fortiosclient.common import retry
 from fortiosclient import request
-from fortiosclient import templates
 
 LOG = logging.getLogger(__name__)
 
@@ -47,7 +48,8 @@ class EventletApiRequest(request.ApiRequest):
     # Maximum number of green threads present in the system at one time.
     API_REQUEST_POOL_SIZE = csts.DEFAULT_API_REQUEST_POOL_SIZE
 
-    # Pool of green threads. One green thread is allocated per incoming
+    # Pool of green threads used for the requests of the clients without a
+    # request pool of their own. One green thread is allocated per incoming
     # request. Incoming requests will block when the pool is empty.
     API_REQUEST_POOL = eventlet.GreenPool(API_REQUEST_POOL_SIZE)
 
@@ -58,14 +60,27 @@ class EventletApiRequest(request.ApiRequest):
     # The request id for the next incoming request.
     CURRENT_REQUEST_ID = 0
 
+    DEFAULT_RETRY_POLICY = retry.RetryPolicy()
+
     def __init__(self, client_obj, url, method="GET", body=None,
                  headers=None,
                  retries=csts.DEFAULT_RETRIES,
                  auto_login=True,
                  redirects=csts.DEFAULT_REDIRECTS,
                  http_timeout=csts.DEFAULT_HTTP_TIMEOUT, client_conn=None,
-                 singlethread=False):
-        '''Constructor.'''
+                 singlethread=False, inline=False, deadline=None,
+                 exclude_provider=None):
+        '''Constructor.
+
+        :param inline: process the request in the green thread, or thread,
+                       calling join() instead of a green thread of its own.
+        :param deadline: a fortiosclient.common.deadline.Deadline the request
+                         gives up at, including the wait for a connection,
+                         the login, the retries and the redirects.
+        :param exclude_provider: the (host, port, is_ssl) of an API provider
+                                 the request is not sent to, it fails if no
+                                 connection to another provider is free.
+        '''
         self._api_client = client_obj
         self._url = url
         self._method = method
@@ -77,10 +92,15 @@ class EventletApiRequest(request.ApiRequest):
         self._redirects = redirects
         self._http_timeout = http_timeout
         self._client_conn = client_conn
+        self._deadline = deadline
+        self._exclude_provider = exclude_provider
+        self._provider = None
         self._abort = False
 
         self._request_error = None
         self._singlethread = singlethread
+        # In single thread mode the requests are always processed inline.
+        self._inline = singlethread or inline
 
         if "User-Agent" not in self._headers:
             self._headers["User-Agent"] = csts.USER_AGENT
@@ -100,12 +120,18 @@ class EventletApiRequest(request.ApiRequest):
         return cls.API_REQUEST_POOL.spawn(func, *args, **kwargs)
 
     def spawn(self, func, *args, **kwargs):
-        '''Spawn a new green thread with the supplied function and args.'''
+        '''Spawn a new green thread with the supplied function and args.
+
+        The green thread is allocated from the request pool of the client.
+        '''
+        pool = getattr(self._api_client, 'request_pool', None)
+        if isinstance(pool, eventlet.GreenPool):
+            return pool.spawn(func, *args, **kwargs)
         return self.__class__._spawn(func, *args, **kwargs)
 
     def join(self):
         '''Wait for instance green thread to complete.'''
-        if self._singlethread:
+        if self._inline:
             return self._run()
         if self._green_thread is not None:
             return self._green_thread.wait()
@@ -113,14 +139,32 @@ class EventletApiRequest(request.ApiRequest):
 
     def start(self):
         '''Start request processing.'''
-        if not self._singlethread:
+        if not self._inline:
             self._green_thread = self.spawn(self._run)
 
+    def kill(self):
+        '''Stop request processing if it is not complete.'''
+        if self._green_thread is not None:
+            self._green_thread.kill()
+
+    def link(self, func):
+        '''Call func(self) once request processing is complete.
+
+        func is called right away if the request is processed by join().
+        '''
+        if self._green_thread is None:
+            func(self)
+        else:
+            self._green_thread.link(lambda gt: func(self))
+
     def _run(self):
         '''Method executed within green thread.'''
-        if self._request_timeout:
-            # No timeout exception escapes the with block.
-            with eventlet.timeout.Timeout(self._request_timeout, False):
+        request_timeout = deadlines.bounded(self._deadline,
+                                            self._request_timeout or None)
+        if request_timeout is not None:
+            # No timeout exception escapes the with block. In single thread
+            # mode the socket timeouts bound by the deadline enforce it.
+            with eventlet.timeout.Timeout(request_timeout, False):
                 return self._handle_request()
 
             LOG.info(_LI('[%d] Request timeout.'), self._rid())
@@ -129,28 +173,55 @@ class EventletApiRequest(request.ApiRequest):
         else:
             return self._handle_request()
 
+    def _retry_policy(self):
+        '''Return the retry policy and the retry budget of the client.
+
+        The clients without a policy of their own use the default policy
+        and don't budget the retries.
+        '''
+        policy = getattr(self._api_client, 'retry_policy', None)
+        if not isinstance(policy, retry.RetryPolicy):
+            return self.DEFAULT_RETRY_POLICY, None
+        return policy, self._api_client.retry_budget
+
+    def _retry_delay(self, policy, budget, attempt, response=None):
+        '''Return the seconds to wait for before retrying, None not to.'''
+        delay = policy.delay(attempt, response)
+        if delay is None:
+            return None
+        if (self._deadline is not None and
+                delay >= self._deadline.remaining()):
+            LOG.info(_LI("[%d] Deadline expired, the request is not "
+                         "retried"), self._rid())
+            return None
+        if (budget is not None and not policy.reauth(response) and
+                not budget.withdraw()):
+            LOG.warning(_LW("[%d] Retry budget exhausted, the request is "
+                            "not retried"), self._rid())
+            return None
+        return delay
+
     def _handle_request(self):
         '''First level request handling.'''
+        policy, budget = self._retry_policy()
+        if budget is not None:
+            budget.deposit()
         attempt = 0
-        timeout = 0
+        delay = 0
         response = None
         while response is None and attempt <= self._retries:
-            eventlet.greenthread.sleep(timeout)
+            eventlet.greenthread.sleep(delay)
             attempt += 1
             req = self._issue_request()
             # automatically raises any exceptions returned.
             if isinstance(req, httplib.HTTPResponse):
-                timeout = 0
                 if attempt <= self._retries and not self._abort:
-                    # currently there is a bug in fortios, it return 401 and
-                    # 400 when a cookie is invalid, the change is to tolerant
-                    # the bug to handle return 400 situation.
-                    # when fortios fix the bug, here should use
-                    # 'req.status in (401, 403)' instead
-                    if req.status in (400, 401, 403):
-                        continue
-                    elif req.status == 503:
-                        timeout = 0.5
+                    # some fortios firmware return 400 instead of 401 when
+                    # the cookie is invalid, _issue_request() marks those
+                    # responses session_expired and the policy retries them
+                    # at once after a new login, the other 400 are final.
+                    delay = self._retry_delay(policy, budget, attempt, req)
+                    if delay is not None:
                         continue
                     # else fall through to return the error code
 
@@ -165,6 +236,11 @@ class EventletApiRequest(request.ApiRequest):
                          {'rid': self._rid(), 'req': req})
                 self._request_error = req
                 response = None
+                if attempt > self._retries:
+                    break
+                delay = self._retry_delay(policy, budget, attempt)
+                if delay is None:
+                    break
         return response
 
 
@@ -172,17 +248,17 @@ class LoginRequestEventlet(EventletApiRequest):
     '''Process a login request.'''
 
     def __init__(self, client_obj, user, password, client_conn=None,
-                 headers=None):
+                 headers=None, deadline=None):
         if headers is None:
             headers = {}
         headers.update({"Content-Type": "application/x-www-form-urlencoded"})
-        message = client_obj._render(templates.LOGIN,
+        message = client_obj._render('LOGIN',
                                      username=user,
                                      secretkey=password)
         body = message['body']
         super(LoginRequestEventlet, self).__init__(
             client_obj, message['path'], message['method'], body, headers,
-            auto_login=True, client_conn=client_conn)
+            auto_login=True, client_conn=client_conn, deadline=deadline)
 
     def session_cookie(self):
         if self.successful():
@@ -234,13 +310,16 @@ class GenericRequestEventlet(EventletApiRequest):
                  http_timeout=csts.DEFAULT_HTTP_TIMEOUT,
                  retries=csts.DEFAULT_RETRIES,
                  redirects=csts.DEFAULT_REDIRECTS,
-                 singlethread=False):
+                 singlethread=False, inline=False, deadline=None,
+                 exclude_provider=None):
         headers = {"Content-Type": content_type}
         super(GenericRequestEventlet, self).__init__(
             client_obj, url, method, body, headers,
             retries=retries,
             auto_login=auto_login, redirects=redirects,
-            http_timeout=http_timeout, singlethread=singlethread)
+            http_timeout=http_timeout, singlethread=singlethread,
+            inline=inline, deadline=deadline,
+            exclude_provider=exclude_provider)
 
     def session_cookie(self):
         if self.successful():
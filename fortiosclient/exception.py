@@ -75,17 +75,32 @@ class RequestTimeout(ApiException):
     message = _("The request has timed out.")
 
 
+class RequestCancelled(ApiException):
+    message = _("The request has been cancelled.")
+
+
 class BadRequest(ApiException):
     message = _("The server is unable to fulfill the request due "
                 "to a bad syntax")
 
 
+class InvalidRequest(BadRequest):
+    message = _("Invalid request attribute %(path)s: %(reason)s")
+
+
 class InvalidSecurityCertificate(BadRequest):
     message = _("The backend received an invalid security certificate.")
 
 
+def _body(response):
+    body = response.body or ''
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', 'replace')
+    return body
+
+
 def fourZeroZero(response=None):
-    if response and "Invalid Certificate" in response.body:
+    if response and "Invalid Certificate" in _body(response):
         raise InvalidSecurityCertificate()
     raise BadRequest()
 
@@ -107,7 +122,7 @@ def fiveZeroThree(response=None):
 
 
 def fourZeroThree(response=None):
-    if 'read-only' in response.body:
+    if 'read-only' in _body(response):
         raise ReadOnlyMode()
     else:
         raise Forbidden()
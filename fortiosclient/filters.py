@@ -0,0 +1,222 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Filter expressions of the GET requests, compiled to FortiOS filter=.
+
+    >>> f = (F('subnet') == '10.0.0.0 255.255.255.0') & (
+    ...     F('name').startswith('os_') | F('name').contains('tenant'))
+    >>> f.params()
+    ['subnet==10.0.0.0 255.255.255.0', 'name=@os_,name=@tenant']
+
+Every filter= param of a request must match an entry, the conditions of a
+param are alternatives, so the expressions are kept in conjunctive normal
+form. FortiOS has no "starts with" operator: startswith() is sent as
+"contains" and the results are refined by the client with match().
+"""
+
+import six
+
+EQ = '=='
+NE = '!='
+LT = '<'
+LE = '<='
+GT = '>'
+GE = '>='
+CONTAINS = '=@'
+NOT_CONTAINS = '!@'
+
+
+def _text(value):
+    return six.text_type(value)
+
+
+def _escape(value):
+    # "," separates the alternatives of a filter= param
+    return _text(value).replace('\\', '\\\\').replace(',', '\\,')
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compare(op, left, right):
+    a, b = _number(left), _number(right)
+    if a is None or b is None:
+        a, b = _text(left), _text(right)
+    if op == LT:
+        return a < b
+    if op == LE:
+        return a <= b
+    if op == GT:
+        return a > b
+    return a >= b
+
+
+def _values(entry, field):
+    # a table attribute, e.g. srcintf, matches by the names of its entries
+    value = entry.get(field)
+    if isinstance(value, list):
+        return [v.get('name', v.get('q_origin_key')) if isinstance(v, dict)
+                else v for v in value]
+    return [value]
+
+
+class Condition(object):
+    """A condition on one attribute of the entries."""
+
+    def __init__(self, field, op, value, prefix=False):
+        self.field = field
+        self.op = op
+        self.value = value
+        # the server only checks that the attribute contains the value
+        self.prefix = prefix
+
+    def __str__(self):
+        return '%s%s%s' % (self.field, self.op, _escape(self.value))
+
+    def _match(self, value):
+        if value is None:
+            return self.op in (NE, NOT_CONTAINS)
+        if self.prefix:
+            return _text(value).startswith(_text(self.value))
+        if self.op == EQ:
+            return _text(value) == _text(self.value)
+        if self.op == NE:
+            return _text(value) != _text(self.value)
+        if self.op == CONTAINS:
+            return _text(self.value).lower() in _text(value).lower()
+        if self.op == NOT_CONTAINS:
+            return _text(self.value).lower() not in _text(value).lower()
+        return _compare(self.op, value, self.value)
+
+    def match(self, entry):
+        values = _values(entry, self.field)
+        if self.op in (NE, NOT_CONTAINS):
+            return all(self._match(v) for v in values)
+        return any(self._match(v) for v in values)
+
+
+class Filter(object):
+    """A conjunction of clauses, every clause a disjunction of conditions."""
+
+    def __init__(self, clauses):
+        self.clauses = clauses
+
+    def __and__(self, other):
+        return Filter(self.clauses + other.clauses)
+
+    def __or__(self, other):
+        return Filter([a + b for a in self.clauses for b in other.clauses])
+
+    def __repr__(self):
+        return '<Filter %s>' % ' & '.join(
+            '(%s)' % ' | '.join(str(c) for c in clause)
+            for clause in self.clauses)
+
+    @property
+    def exact(self):
+        """Whether FortiOS returns exactly the entries matching the filter,
+        otherwise the entries have to be refined with match().
+        """
+        return not any(c.prefix for clause in self.clauses for c in clause)
+
+    @property
+    def fields(self):
+        """The names of the attributes the filter tests."""
+        return sorted(set(c.field for clause in self.clauses
+                          for c in clause))
+
+    def params(self):
+        """Return the values of the filter= params of the filter."""
+        return [','.join(str(c) for c in clause) for clause in self.clauses]
+
+    def match(self, entry):
+        """Whether the entry, a dictionary, matches the filter."""
+        return all(any(c.match(entry) for c in clause)
+                   for clause in self.clauses)
+
+
+class F(object):
+    """An attribute of the entries, e.g. F('name') == 'os_vid_4093'."""
+
+    def __init__(self, field):
+        self.field = field
+
+    def _filter(self, op, value, prefix=False):
+        return Filter([[Condition(self.field, op, value, prefix)]])
+
+    def __eq__(self, value):
+        return self._filter(EQ, value)
+
+    def __ne__(self, value):
+        return self._filter(NE, value)
+
+    def __lt__(self, value):
+        return self._filter(LT, value)
+
+    def __le__(self, value):
+        return self._filter(LE, value)
+
+    def __gt__(self, value):
+        return self._filter(GT, value)
+
+    def __ge__(self, value):
+        return self._filter(GE, value)
+
+    __hash__ = object.__hash__
+
+    def contains(self, value):
+        return self._filter(CONTAINS, value)
+
+    def not_contains(self, value):
+        return self._filter(NOT_CONTAINS, value)
+
+    def startswith(self, prefix):
+        return self._filter(CONTAINS, prefix, prefix=True)
+
+    def in_(self, values):
+        """The attribute is one of values."""
+        return Filter([[Condition(self.field, EQ, v) for v in values]])
+
+
+def get_params(expression):
+    """Return the filter= query params of expression.
+
+    :param expression: a Filter, or a FortiOS filter string
+    """
+    if expression is None:
+        return []
+    if isinstance(expression, Filter):
+        return [('filter', p) for p in expression.params()]
+    return [('filter', expression)]
+
+
+def refine(expression, response):
+    """Drop the results of response which do not match expression.
+
+    Only needed when the filter is not exact, see Filter.exact.
+    """
+    if (not isinstance(expression, Filter) or expression.exact or
+            not isinstance(response, dict) or
+            not isinstance(response.get('results'), list)):
+        return response
+    response['results'] = [e for e in response['results']
+                           if isinstance(e, dict) and expression.match(e)]
+    return response
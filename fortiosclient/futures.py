@@ -0,0 +1,121 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import eventlet
+try:
+    from oslo_log import log as logging
+except Exception:
+    import logging
+
+from fortiosclient._i18n import _LE
+from fortiosclient import exception
+
+LOG = logging.getLogger(__name__)
+
+
+class RequestFuture(object):
+    """The result of a request processed in its own green thread.
+
+    It follows the interface of concurrent.futures.Future.
+    """
+
+    def __init__(self, request, handler):
+        '''Constructor.
+
+        :param request: a started EventletApiRequest.
+        :param handler: called with the response of the request, it returns
+                        the result of the future or raises its exception.
+        '''
+        self._request = request
+        self._handler = handler
+        self._event = eventlet.event.Event()
+        self._callbacks = []
+        self._cancelled = False
+        self._result = None
+        self._exception = None
+        request.link(self._complete)
+
+    def _complete(self, request):
+        if self._event.ready():
+            return
+        if self._cancelled:
+            self._exception = exception.RequestCancelled()
+        else:
+            try:
+                self._result = self._handler(request.join())
+            except Exception as e:
+                self._exception = e
+        self._event.send()
+        for func in self._callbacks:
+            self._call(func)
+        self._callbacks = []
+
+    def _call(self, func):
+        try:
+            func(self)
+        except Exception:
+            LOG.exception(_LE("Exception in the callback %s of a request"),
+                          func)
+
+    def cancel(self):
+        '''Cancels the request unless it is complete.
+
+        The connection used by the request, if any, is released.
+        :returns: False if the request is already complete.
+        '''
+        if self.done():
+            return False
+        self._cancelled = True
+        self._request.kill()
+        self._complete(self._request)
+        return True
+
+    def cancelled(self):
+        return self._cancelled
+
+    def running(self):
+        return not self.done()
+
+    def done(self):
+        return self._event.ready()
+
+    def result(self, timeout=None):
+        '''Waits for the response of the request.
+
+        :param timeout: seconds to wait for, forever if None.
+        :raises: exception.RequestTimeout if the request is not complete
+                 after timeout seconds, the request goes on, or the
+                 exception raised by the request.
+        '''
+        self.exception(timeout)
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout=None):
+        '''Waits for the request, returns its exception, None if any.'''
+        if not self._event.ready():
+            with eventlet.Timeout(timeout, exception.RequestTimeout()):
+                self._event.wait()
+        return self._exception
+
+    def add_done_callback(self, func):
+        '''Calls func(future) once the request is complete or cancelled.'''
+        if self.done():
+            self._call(func)
+        else:
+            self._callbacks.append(func)
@@ -0,0 +1,161 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Registry of the API messages defined in templates.
+
+The registry is built once when the module is imported from the syntax
+trees of the templates, which are parsed with jinja2 but not compiled.
+For every API message it holds:
+
+    name:     the name of the template, e.g. ADD_FIREWALL_ADDRESS
+    method:   the HTTP method
+    path:     the path pattern of the message, e.g.
+              /api/v2/cmdb/firewall/address/{name}
+    paths:    every path pattern the template can render, without query
+    required: params rendered by the template whichever branches of its if
+              statements are taken
+    optional: the other params, e.g. the params the template tests before
+              using them
+    vdom:     VDOM_QUERY if the vdom is sent as the vdom= query param,
+              VDOM_BODY if it is sent in the body, None otherwise
+"""
+
+import collections
+import re
+
+import jinja2
+from jinja2 import meta
+from jinja2 import nodes
+
+from fortiosclient import templates
+
+VDOM_QUERY = 'query'
+VDOM_BODY = 'body'
+
+Operation = collections.namedtuple(
+    'Operation', ['name', 'method', 'path', 'paths', 'required', 'optional',
+                  'vdom'])
+
+_METHOD = re.compile(r'"method"\s*:\s*"(\w+)"')
+_PATH = re.compile(r'"path"\s*:\s*"([^"?]*)')
+_VAR = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+# the params of a template are found in its syntax tree, the templates are
+# not compiled
+_ENV = jinja2.Environment()
+# the tests telling whether a param is given
+_DEFINED_TESTS = frozenset(['defined', 'undefined', 'none'])
+
+
+def _loaded(node):
+    names = [node] if isinstance(node, nodes.Name) else []
+    names.extend(node.find_all(nodes.Name))
+    return set(name.name for name in names if name.ctx == 'load')
+
+
+def _rendered(body):
+    """Return the names the nodes of body read whichever branch is taken.
+
+    The names of the body of a for loop are left out, the loop may not be
+    run, so are the names of the values of set statements, which may be
+    undefined.
+    """
+    names = set()
+    for node in body:
+        if isinstance(node, nodes.If):
+            names.update(_loaded(node.test))
+            if node.else_:
+                branches = [node.body, node.else_]
+                branches.extend(n.body for n in getattr(node, 'elif_', ()))
+                names.update(set.intersection(*[_rendered(b)
+                                                for b in branches]))
+        elif isinstance(node, nodes.For):
+            names.update(_loaded(node.iter))
+        elif isinstance(node, nodes.Output):
+            names.update(_loaded(node))
+    return names
+
+
+def _tested(tree):
+    """Return the names tested before they are used, e.g. x is defined."""
+    names = set()
+    for test in tree.find_all(nodes.Test):
+        if (test.name in _DEFINED_TESTS and
+                isinstance(test.node, nodes.Name)):
+            names.add(test.node.name)
+    for compare in tree.find_all(nodes.Compare):
+        if isinstance(compare.expr, nodes.Name) and any(
+                isinstance(op.expr, nodes.Const) and op.expr.value is None
+                for op in compare.ops):
+            names.add(compare.expr.name)
+    return names
+
+
+def _scan(source):
+    tree = _ENV.parse(source)
+    names = meta.find_undeclared_variables(tree)
+    required = _rendered(tree.body) - _tested(tree)
+    return names, names - required
+
+
+def _operation(name, source):
+    names, optional = _scan(source)
+    paths = []
+    for path in _PATH.findall(source):
+        path = _VAR.sub(r'{\1}', path).rstrip('/') or '/'
+        if path not in paths:
+            paths.append(path)
+    if 'vdom' not in names:
+        vdom = None
+    elif '"vdom"' in source:
+        vdom = VDOM_BODY
+    else:
+        vdom = VDOM_QUERY
+    return Operation(name=name,
+                     method=_METHOD.search(source).group(1),
+                     path=paths[0],
+                     paths=tuple(paths),
+                     required=frozenset(names - optional),
+                     optional=frozenset(optional),
+                     vdom=vdom)
+
+
+def _build():
+    operations = {}
+    for name, source in vars(templates).items():
+        if name.isupper() and _METHOD.search(source):
+            operations[name] = _operation(name, source)
+    return operations
+
+
+OPERATIONS = _build()
+
+LOGIN_PATH = OPERATIONS['LOGIN'].path
+LOGOUT_PATH = OPERATIONS['LOGOUT'].path
+
+
+def get(opt):
+    """Return the Operation of the API message opt."""
+    try:
+        return OPERATIONS[opt]
+    except KeyError:
+        raise AttributeError("Unknown API message '%s'" % opt)
+
+
+def missing_params(opt, message):
+    """Return the required params of opt which are not in message."""
+    return get(opt).required.difference(message)
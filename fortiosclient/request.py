@@ -39,6 +39,9 @@ import six.moves.urllib.parse as urlparse
 
 from fortiosclient._i18n import _LI, _LW
 import fortiosclient as api_client
+from fortiosclient.common import deadline as deadlines
+from fortiosclient import exception
+from fortiosclient import operations
 from fortiosclient import templates
 
 LOG = logging.getLogger(__name__)
@@ -78,14 +81,65 @@ class ApiRequest(object):
 
     def get_conn(self):
         conn = self._client_conn or \
-               self._api_client.acquire_connection(True,
-                                                   copy.copy(self._headers),
-                                                   rid=self._rid())
+               self._api_client.acquire_connection(
+                   True, copy.copy(self._headers), rid=self._rid(),
+                   deadline=self._deadline, exclude=self._exclude_provider)
+        if conn is not None:
+            self._provider = self._api_client._normalize_conn_params(conn)
         return conn
 
+    def _timeout(self, timeout):
+        '''Return timeout bounded by the deadline of the request.'''
+        timeout = deadlines.bounded(self._deadline, timeout)
+        if timeout is not None and timeout <= 0:
+            raise exception.RequestTimeout()
+        return timeout
+
+    def _connect(self, conn):
+        '''Connect conn within the deadline of the request.'''
+        if self._deadline is None:
+            conn.connect()
+            return
+        connect_timeout = conn.timeout
+        conn.timeout = self._timeout(connect_timeout)
+        try:
+            conn.connect()
+        finally:
+            conn.timeout = connect_timeout
+
+    def _acquire(self):
+        '''Return a connection and the limit of its provider acquired.
+
+        The limit is acquired before holding a connection of the pool: while
+        the provider is busy, the connection is given back to the pool for
+        the requests to the other providers.
+        '''
+        conn = self.get_conn()
+        while conn is not None:
+            limit = self._api_client.provider_limit(conn)
+            if limit is None or limit.try_acquire():
+                return conn, limit
+            if self._client_conn is None:
+                self._api_client.release_connection(conn, rid=self._rid())
+            if not limit.acquire(self._timeout(None)):
+                raise exception.RequestTimeout()
+            if self._client_conn is not None:
+                return conn, limit
+            try:
+                conn = self.get_conn()
+            except BaseException:
+                limit.cancel()
+                raise
+            if (conn is not None and
+                    self._api_client.provider_limit(conn) is limit):
+                return conn, limit
+            # the provider changed while waiting, try the limit of the new one
+            limit.cancel()
+        return None, None
+
     def _issue_request(self):
         '''Issue a request to a provider.'''
-        conn = self.get_conn()
+        conn, limit = self._acquire()
         if conn is None:
             error = Exception("No API connections available")
             self._request_error = error
@@ -99,28 +153,32 @@ class ApiRequest(object):
         is_conn_error = False
         is_conn_service_unavail = False
         response = None
+        status = None
+        timed_out = False
         try:
             redirects = 0
             while redirects <= self._redirects:
                 # Update connection with user specified request timeout,
                 # the connect timeout is usually smaller so we only set
                 # the request timeout after a connection is established
+                http_timeout = self._timeout(self._http_timeout)
                 if conn.sock is None:
-                    conn.connect()
-                    conn.sock.settimeout(self._http_timeout)
-                elif conn.sock.gettimeout() != self._http_timeout:
-                    conn.sock.settimeout(self._http_timeout)
+                    self._connect(conn)
+                    conn.sock.settimeout(http_timeout)
+                elif conn.sock.gettimeout() != http_timeout:
+                    conn.sock.settimeout(http_timeout)
 
                 headers = copy.copy(self._headers)
                 if templates.RELOGIN in url:
-                    url = jsonutils.loads(templates.LOGIN)['path']
-                    conn.connect()
-                    self._api_client._wait_for_login(conn, headers)
+                    url = operations.LOGIN_PATH
+                    self._connect(conn)
+                    self._api_client._wait_for_login(conn, headers,
+                                                     self._deadline)
                     url = self._url
 
                 cookie = self._api_client.auth_cookie(conn)
 
-                if (self._url != jsonutils.loads(templates.LOGIN)['path'] and
+                if (self._url != operations.LOGIN_PATH and
                     cookie):
                     if 'Cookie' in cookie:
                         headers['Cookie'] = cookie['Cookie']
@@ -131,7 +189,7 @@ class ApiRequest(object):
                 try:
                     if self._body:
                         if (self._url ==
-                                jsonutils.loads(templates.LOGIN)['path']):
+                                operations.LOGIN_PATH):
                             body = urlparse.urlencode(self._body)
                         else:
                             body = jsonutils.dumps(self._body)
@@ -151,6 +209,7 @@ class ApiRequest(object):
 
                 response = conn.getresponse()
                 response.body = response.read()
+                status = response.status
                 if six.PY2:
                     response.headers = response.getheaders()
                 elapsed_time = time.time() - issued_time
@@ -168,7 +227,7 @@ class ApiRequest(object):
 
                 if response.status in (401, 302):
                     if (cookie is None and
-                       self._url != jsonutils.loads(templates.LOGIN)['path']):
+                       self._url != operations.LOGIN_PATH):
                         # The connection still has no valid cookie despite
                         # attempts to authenticate and the request has failed
                         # with unauthorized status code. If this isn't a
@@ -180,6 +239,14 @@ class ApiRequest(object):
                     # to the same provider triggers re-authentication.
                     self._api_client.set_auth_cookie(conn, None)
 
+                elif 400 == response.status:
+                    response.session_expired = self._session_expired(
+                        response, headers)
+                    if response.session_expired:
+                        LOG.info(_LI("[%d] Session expired, logging in "
+                                     "again"), self._rid())
+                        self._api_client.set_auth_cookie(conn, None)
+
                 elif 503 == response.status:
                     is_conn_service_unavail = True
 
@@ -214,6 +281,12 @@ class ApiRequest(object):
                 raise Exception('Server error return: %s', response.status)
             return response
 
+        except exception.RequestTimeout:
+            # The deadline expired before the request was sent, the
+            # connection is still good.
+            timed_out = True
+            raise
+
         except Exception as e:
             if isinstance(e, httpclient.BadStatusLine):
                 msg = ("Invalid server response")
@@ -230,7 +303,18 @@ class ApiRequest(object):
             is_conn_error = True
             return e
 
+        except BaseException:
+            # The request is cancelled or timed out, the connection may
+            # be left in the middle of the request.
+            is_conn_error = True
+            raise
+
         finally:
+            if limit is not None and timed_out:
+                limit.cancel()
+            elif limit is not None:
+                limit.release(time.time() - issued_time, status,
+                              self._kind())
             # Make sure we release the original connection provided by the
             # acquire_connection() call above.
             if self._client_conn is None:
@@ -238,6 +322,23 @@ class ApiRequest(object):
                                                     is_conn_service_unavail,
                                                     rid=self._rid())
 
+    def _session_expired(self, response, headers):
+        '''Whether a 400 response is the answer to an expired session.
+
+        Some firmware answer 400 instead of 401 to the requests with an
+        invalid session cookie, before the request is parsed, so the body
+        is not an API error with a FortiOS error code. The other 400
+        responses, and all of them with token authentication, are genuine.
+        '''
+        if self._url == operations.LOGIN_PATH or 'Cookie' not in headers:
+            return False
+        try:
+            body = jsonutils.loads(response.body)
+        except (TypeError, ValueError):
+            return True
+        return not (isinstance(body, dict) and
+                    isinstance(body.get('error'), six.integer_types))
+
     def _redirect_params(self, conn, headers, allow_release_conn=False):
         """Process redirect response, create new connection if necessary.
 
@@ -286,8 +387,8 @@ class ApiRequest(object):
         if allow_release_conn:
             self._api_client.release_connection(conn)
         conn_params = (result.hostname, result.port, result.scheme == "https")
-        conn = self._api_client.acquire_redirect_connection(conn_params, True,
-                                                            self._headers)
+        conn = self._api_client.acquire_redirect_connection(
+            conn_params, True, self._headers, deadline=self._deadline)
         if result.query:
             url = "%s?%s" % (result.path, result.query)
         else:
@@ -298,11 +399,28 @@ class ApiRequest(object):
         '''Return current request id.'''
         return self._request_id
 
+    @property
+    def provider(self):
+        '''The (host, port, is_ssl) of the last API provider requested.'''
+        return self._provider
+
     @property
     def request_error(self):
         '''Return any errors associated with this instance.'''
         return self._request_error
 
+    def _kind(self):
+        '''Return the kind of the request to compare its latency with.
+
+        The requests of a method to the same table with or without the key
+        of an entry are of the same kind, e.g.
+        ('GET', '/api/v2/cmdb/firewall/address', True).
+        '''
+        path = urlparse.urlparse(self._url).path
+        segments = [segment for segment in path.split('/') if segment]
+        return (self._method, '/' + '/'.join(segments[:5]),
+                len(segments) > 5)
+
     def _request_str(self, conn, url):
         '''Return string representation of connection.'''
         return "%s %s%s" % (self._method, api_client.ctrl_conn_to_str(conn),
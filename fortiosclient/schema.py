@@ -0,0 +1,207 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Validate the request bodies with the CMDB schema of FortiOS.
+
+The schema of a CMDB table is returned by FortiOS for
+GET /api/v2/cmdb/<table>?action=schema, it only changes with the firmware,
+so the schemas are cached by firmware version in memory and, optionally,
+on disk in one JSON file per firmware version.
+"""
+
+import os
+import re
+import tempfile
+import threading
+
+try:
+    from oslo_log import log as logging
+except Exception:
+    import logging
+
+try:
+    from oslo_serialization import jsonutils
+except Exception:
+    import json as jsonutils
+import six
+import six.moves.urllib.parse as urlparse
+
+from fortiosclient._i18n import _LW
+from fortiosclient.common import urls
+from fortiosclient import exception
+
+LOG = logging.getLogger(__name__)
+
+# attributes accepted in the entries of every table
+COMMON_ATTRIBUTES = frozenset(['q_origin_key'])
+
+
+def firmware_version(response):
+    """Return the firmware version of a decoded API response, or None."""
+    if isinstance(response, dict) and response.get('version'):
+        if response.get('build') is not None:
+            return '%s-%s' % (response['version'], response['build'])
+        return six.text_type(response['version'])
+    return None
+
+
+def table_of(url):
+    """Return the (table, children) addressed by the url of a CMDB request.
+
+    e.g. /api/v2/cmdb/firewall/addrgrp/grp1/member?vdom=root is the child
+    table member of the table firewall/addrgrp, ('firewall/addrgrp',
+    ['member']). None is returned if url is not a CMDB table.
+    """
+    path = urlparse.urlsplit(url).path
+    prefix = urls.API_CMDB + '/'
+    if not path.startswith(prefix):
+        return None
+    segments = [s for s in path[len(prefix):].split('/') if s]
+    if len(segments) < 2:
+        return None
+    return '/'.join(segments[:2]), segments[3::2]
+
+
+class SchemaCache(object):
+    """The CMDB table schemas by firmware version.
+
+    The schemas of an unknown firmware version, None, are only cached in
+    memory.
+    """
+
+    def __init__(self, cache_dir=None):
+        self._cache_dir = cache_dir
+        self._schemas = {}
+        self._lock = threading.Lock()
+
+    def _path(self, version):
+        return os.path.join(self._cache_dir,
+                            re.sub(r'[^\w.-]', '_', version) + '.json')
+
+    def _load(self, version):
+        if version in self._schemas:
+            return self._schemas[version]
+        schemas = {}
+        if self._cache_dir and version is not None:
+            try:
+                with open(self._path(version)) as f:
+                    schemas = jsonutils.loads(f.read())
+            except (IOError, OSError):
+                pass
+            except ValueError:
+                LOG.warning(_LW("Ignoring the corrupted schema cache %s"),
+                            self._path(version))
+        self._schemas[version] = schemas
+        return schemas
+
+    def _save(self, version):
+        if not self._cache_dir or version is None:
+            return
+        try:
+            if not os.path.isdir(self._cache_dir):
+                os.makedirs(self._cache_dir)
+            fd, tmp = tempfile.mkstemp(dir=self._cache_dir)
+            with os.fdopen(fd, 'w') as f:
+                f.write(jsonutils.dumps(self._schemas[version]))
+            os.rename(tmp, self._path(version))
+        except (IOError, OSError) as e:
+            LOG.warning(_LW("Failed to save the schema cache %(path)s: "
+                            "%(e)s"), {'path': self._path(version), 'e': e})
+
+    def get(self, version, table):
+        """Return the cached schema of table, or None."""
+        with self._lock:
+            return self._load(version).get(table)
+
+    def set(self, version, table, schema):
+        with self._lock:
+            self._load(version)[table] = schema
+            self._save(version)
+
+    def adopt(self, version):
+        """Move the schemas of the unknown firmware version to version.
+
+        Called once the firmware version the schemas were fetched from is
+        known.
+        """
+        if version is None:
+            return
+        with self._lock:
+            unknown = self._schemas.pop(None, None)
+            if not unknown:
+                return
+            schemas = self._load(version)
+            for table, schema in unknown.items():
+                schemas.setdefault(table, schema)
+            self._save(version)
+
+
+def _invalid(path, reason):
+    raise exception.InvalidRequest(path=path, reason=reason)
+
+
+def _check_value(field, value, path):
+    kind = field.get('type')
+    if field.get('category') == 'table' or 'children' in field:
+        if not isinstance(value, (list, tuple)):
+            _invalid(path, "a list of entries is expected")
+        for i, entry in enumerate(value):
+            validate(field, entry, '%s[%d]' % (path, i))
+    elif kind == 'option':
+        options = [o.get('name') for o in field.get('options', ())]
+        values = [value]
+        if field.get('multiple_values') and isinstance(value,
+                                                       six.string_types):
+            # e.g. allowaccess 'ping https'
+            values = value.split()
+        for v in values:
+            if options and v not in options:
+                _invalid(path, "%r is not one of %s" % (v,
+                                                        ', '.join(options)))
+    elif kind == 'integer':
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            _invalid(path, "%r is not an integer" % (value,))
+        if ('min-value' in field and number < field['min-value'] or
+                'max-value' in field and number > field['max-value']):
+            _invalid(path, "%s is not in the range [%s, %s]" % (
+                number, field.get('min-value'), field.get('max-value')))
+    elif kind in ('string', 'var-string', 'password'):
+        size = field.get('size')
+        if size and len(six.text_type(value)) > size:
+            _invalid(path, "longer than %s characters" % size)
+
+
+def validate(schema, body, path=''):
+    """Validate body against the schema of a table.
+
+    :param schema: the schema of the table, as returned by FortiOS.
+    :param body: an entry of the table.
+    :param path: the name of body used in the error message.
+    :raises: exception.InvalidRequest
+    """
+    if not isinstance(body, dict):
+        _invalid(path or '/', "an object is expected")
+    fields = schema.get('children') or {}
+    for name, value in body.items():
+        if name in COMMON_ATTRIBUTES:
+            continue
+        name_path = '%s.%s' % (path, name) if path else name
+        if name not in fields:
+            _invalid(name_path, "unknown attribute")
+        _check_value(fields[name], value, name_path)
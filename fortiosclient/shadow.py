@@ -0,0 +1,391 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""In-memory copies of CMDB tables, indexed by some of their attributes.
+
+    >>> store = ShadowStore(api_client, ['firewall/address'])
+    >>> store.lookup('firewall/address', 'subnet',
+    ...              '10.0.0.0 255.255.255.0', vdom='osvdm1')
+
+A table is loaded once per vdom, by its first lookup, and updated from the
+writes of the client. refresh() reads the configuration checksums of
+FortiOS and loads again only the tables of the vdoms whose configuration
+changed, the global tables if the global configuration changed. The
+entries of the child tables written by the client, e.g. the members of an
+address group, are loaded again by the next lookup of their table.
+
+With a snapshot file, the loaded tables are saved in an SQLite file and
+warm_start() serves the tables saved by a previous process from it after a
+single read of the configuration checksums, only the tables whose
+configuration changed since they were saved are loaded from FortiOS.
+
+The values of the attributes are compared as FortiOS formats them, e.g.
+the subnet of an address is '10.0.0.0 255.255.255.0', the table attributes
+like the members of an address group by the names of their entries.
+"""
+
+import collections
+import threading
+
+try:
+    from oslo_log import log as logging
+except Exception:
+    import logging
+
+import six
+import six.moves.urllib.parse as urlparse
+
+from fortiosclient.common import urls
+from fortiosclient import exception
+from fortiosclient import filters
+from fortiosclient import snapshot
+
+LOG = logging.getLogger(__name__)
+
+# scope of the configuration of a table
+GLOBAL = 'global'
+VDOM = 'vdom'
+
+# key: the attribute identifying the entries, the mkey of the table
+# indexes: the attributes the entries are looked up by
+# scope: GLOBAL or VDOM
+Table = collections.namedtuple('Table', ['key', 'indexes', 'scope'])
+
+TABLES = {
+    'firewall/address': Table('name', ('subnet',), VDOM),
+    'firewall/addrgrp': Table('name', ('member',), VDOM),
+    'firewall/policy': Table('policyid', ('name', 'comments', 'srcintf',
+                                          'dstintf'), VDOM),
+    'firewall/vip': Table('name', ('extip', 'extintf'), VDOM),
+    'firewall/ippool': Table('name', ('startip',), VDOM),
+    'router/static': Table('seq-num', ('dst', 'device'), VDOM),
+    'system/interface': Table('name', ('vdom', 'ip', 'vlanid'), GLOBAL),
+    'system/vdom': Table('name', (), GLOBAL),
+}
+
+
+def _text(value):
+    return six.text_type(value)
+
+
+def _unwrap(body):
+    if isinstance(body, dict) and list(body) == ['json']:
+        return body['json']
+    return body
+
+
+def parse_url(url):
+    """Return the (table, vdom, mkey, children, query) of a CMDB url.
+
+    None is returned if url is not a CMDB table.
+    """
+    parts = urlparse.urlsplit(url)
+    prefix = urls.API_CMDB + '/'
+    if not parts.path.startswith(prefix):
+        return None
+    segments = [s for s in parts.path[len(prefix):].split('/') if s]
+    if len(segments) < 2:
+        return None
+    query = dict(urlparse.parse_qsl(parts.query))
+    mkey = urlparse.unquote(segments[2]) if len(segments) > 2 else None
+    return ('/'.join(segments[:2]), query.pop('vdom', None), mkey,
+            segments[3:], query)
+
+
+class TableShadow(object):
+    """The entries of a table in a vdom and their indexes."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.entries = {}
+        self.indexes = dict((field, {}) for field in spec.indexes)
+        # the keys of the entries to load again
+        self.stale = set()
+        # the configuration checksum read before the table was loaded
+        self.revision = None
+
+    def load(self, entries, revision=None):
+        self.entries = {}
+        self.indexes = dict((field, {}) for field in self.spec.indexes)
+        self.stale = set()
+        self.revision = revision
+        for entry in entries:
+            self.put(entry)
+
+    def key(self, entry):
+        value = entry.get(self.spec.key)
+        return None if value is None else _text(value)
+
+    def put(self, entry):
+        key = self.key(entry)
+        if key is None:
+            return
+        self.remove(key)
+        self.entries[key] = entry
+        for field, index in self.indexes.items():
+            for value in filters._values(entry, field):
+                if value is not None:
+                    index.setdefault(_text(value), set()).add(key)
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for field, index in self.indexes.items():
+            for value in filters._values(entry, field):
+                keys = index.get(_text(value)) if value is not None else None
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[_text(value)]
+
+    def get(self, key):
+        return self.entries.get(_text(key))
+
+    def lookup(self, field, value):
+        if field not in self.indexes:
+            raise ValueError("The entries are not indexed by %s" % field)
+        keys = self.indexes[field].get(_text(value), ())
+        return [self.entries[k] for k in sorted(keys)]
+
+
+class ShadowStore(object):
+    """In-memory copies of CMDB tables of the FortiGate of a client."""
+
+    def __init__(self, api_client, tables=None, snapshot_file=None):
+        '''Constructor.
+
+        :param api_client: the FortiosApiClient of the FortiGate, the
+                           tables are updated from its writes.
+        :param tables: the names of the tables of TABLES to shadow, or a
+                       dictionary of the Table of every table by name, all
+                       of TABLES by default.
+        :param snapshot_file: path of the SQLite file the tables loaded from
+                              FortiOS are saved to, one per FortiGate.
+        '''
+        if tables is None:
+            tables = TABLES
+        elif not isinstance(tables, dict):
+            tables = dict((name, TABLES[name]) for name in tables)
+        self._client = api_client
+        self._snapshot = None
+        if snapshot_file:
+            self._snapshot = snapshot.SnapshotFile(snapshot_file)
+        self._specs = dict(tables)
+        # the TableShadow by (table, vdom), the vdom is None for the
+        # global tables
+        self._tables = {}
+        # the lists the writes of the client to every (table, vdom) are
+        # recorded in while it is loaded
+        self._loading = {}
+        # held while the tables are updated, never while waiting for FortiOS
+        self._lock = threading.Lock()
+        api_client.add_write_listener(self.observe)
+
+    def _vdom(self, table, vdom):
+        if self._specs[table].scope == GLOBAL:
+            return None
+        return vdom or 'root'
+
+    @staticmethod
+    def _revision(checksums, spec, vdom):
+        return checksums.get(GLOBAL if spec.scope == GLOBAL else vdom)
+
+    def _spec(self, table):
+        spec = self._specs.get(table)
+        if spec is None:
+            raise ValueError("The table %s is not shadowed" % table)
+        return spec
+
+    def _load(self, table, vdom, checksums=None):
+        spec = self._spec(table)
+        if checksums is None:
+            checksums = self._client.config_checksums()
+        revision = self._revision(checksums, spec, vdom)
+        # the response cache may have a response older than the revision
+        response = self._client.cmdb(table, vdom=vdom, skip_meta=True,
+                                     cache=False)
+        entries = response.get('results') or []
+        shadow = TableShadow(spec)
+        shadow.load(entries, revision)
+        LOG.debug("Loaded %(count)d entries of %(table)s in vdom %(vdom)s",
+                  {'count': len(shadow.entries), 'table': table,
+                   'vdom': vdom})
+        if self._snapshot is not None:
+            self._snapshot.save(table, vdom, revision, entries)
+        return shadow
+
+    def _load_entry(self, shadow, table, vdom, key):
+        try:
+            response = self._client.cmdb(table, mkey=key, vdom=vdom,
+                                         skip_meta=True, cache=False)
+        except exception.ResourceNotFound:
+            entries = []
+        else:
+            entries = response.get('results') or []
+        with self._lock:
+            shadow.remove(key)
+            for entry in entries:
+                shadow.put(entry)
+
+    def _install(self, table, vdom, checksums=None):
+        # the writes of the client while the table is loaded may be missing
+        # from the response, they are applied to the loaded table
+        key = (table, vdom)
+        writes = []
+        shadow = None
+        with self._lock:
+            self._loading.setdefault(key, []).append(writes)
+        try:
+            shadow = self._load(table, vdom, checksums)
+        finally:
+            with self._lock:
+                loading = [w for w in self._loading.pop(key)
+                           if w is not writes]
+                if loading:
+                    self._loading[key] = loading
+                if shadow is not None:
+                    for write in writes:
+                        self._replay(shadow, *write)
+                    self._tables[key] = shadow
+        return shadow
+
+    def warm_start(self):
+        '''Loads the tables saved in the snapshot file.
+
+        The configuration checksums are read once, the saved tables whose
+        configuration is unchanged are used as they are, the others are
+        loaded from FortiOS.
+        :returns: the (table, vdom) loaded from FortiOS.
+        '''
+        if self._snapshot is None:
+            return []
+        saved = self._snapshot.load()
+        checksums = self._client.config_checksums()
+        reloaded = []
+        for (table, vdom), (revision, entries) in saved.items():
+            spec = self._specs.get(table)
+            if spec is None or self._vdom(table, vdom) != vdom:
+                continue
+            if revision == self._revision(checksums, spec, vdom):
+                shadow = TableShadow(spec)
+                shadow.load(entries, revision)
+                with self._lock:
+                    self._tables.setdefault((table, vdom), shadow)
+                continue
+            self._install(table, vdom, checksums)
+            reloaded.append((table, vdom))
+        LOG.debug("Warm start: %(saved)d tables saved, %(count)d loaded "
+                  "again", {'saved': len(saved), 'count': len(reloaded)})
+        return reloaded
+
+    def table(self, table, vdom='root'):
+        '''Return the TableShadow of table in vdom, loaded if needed.'''
+        self._spec(table)
+        vdom = self._vdom(table, vdom)
+        shadow = self._tables.get((table, vdom))
+        if shadow is None:
+            shadow = self._install(table, vdom)
+        while shadow.stale:
+            self._load_entry(shadow, table, vdom, shadow.stale.pop())
+        return shadow
+
+    def get(self, table, key, vdom='root'):
+        '''Return the entry key of table, or None.'''
+        return self.table(table, vdom).get(key)
+
+    def lookup(self, table, field, value, vdom='root'):
+        '''Return the entries of table whose attribute field is value.
+
+        :raises: ValueError if the table is not indexed by field.
+        '''
+        return self.table(table, vdom).lookup(field, value)
+
+    def refresh(self):
+        '''Loads again the tables whose configuration changed.
+
+        :returns: the (table, vdom) loaded again.
+        '''
+        checksums = self._client.config_checksums()
+        reloaded = []
+        for (table, vdom), shadow in list(self._tables.items()):
+            revision = self._revision(checksums, shadow.spec, vdom)
+            if revision is not None and revision == shadow.revision:
+                continue
+            self._install(table, vdom, checksums)
+            reloaded.append((table, vdom))
+        return reloaded
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+    def observe(self, method, url, body, response):
+        '''Updates the shadow tables with a write of the client.'''
+        location = parse_url(url)
+        if location is None:
+            return
+        table, vdom, mkey, children, query = location
+        if table not in self._specs:
+            return
+        key = (table, self._vdom(table, vdom))
+        with self._lock:
+            for writes in self._loading.get(key, ()):
+                writes.append((method, _unwrap(body), response, mkey,
+                               children, query))
+            shadow = self._tables.get(key)
+            if shadow is not None:
+                self._apply(shadow, method, _unwrap(body), response, mkey,
+                            children, query)
+
+    @classmethod
+    def _replay(cls, shadow, method, body, response, mkey, children, query):
+        # the entry written is loaded again, the response of the table may
+        # or may not include the write
+        if (mkey is None and method == 'POST' and
+                isinstance(response, dict) and response.get('mkey')):
+            mkey = response['mkey']
+        if mkey is None or 'action' in query:
+            cls._apply(shadow, method, body, response, mkey, children, query)
+        else:
+            shadow.stale.add(_text(mkey))
+
+    @staticmethod
+    def _apply(shadow, method, body, response, mkey, children, query):
+        if 'action' in query:
+            # e.g. a policy moved, no attribute changed
+            return
+        if mkey is None:
+            if method == 'POST' and isinstance(body, dict):
+                entry = dict(body)
+                if isinstance(response, dict) and response.get('mkey'):
+                    entry[shadow.spec.key] = response['mkey']
+                shadow.put(entry)
+            elif method == 'DELETE':
+                shadow.load([], shadow.revision)
+            return
+        mkey = _text(mkey)
+        if children or not isinstance(body, dict) and method != 'DELETE':
+            shadow.stale.add(mkey)
+        elif method == 'DELETE':
+            shadow.remove(mkey)
+        elif method == 'PUT' and mkey in shadow.entries:
+            entry = dict(shadow.entries[mkey], **body)
+            shadow.remove(mkey)
+            shadow.put(entry)
+        else:
+            shadow.stale.add(mkey)
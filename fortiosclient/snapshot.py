@@ -0,0 +1,134 @@
+# Copyright 2015 Fortinet, Inc.
+#
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Snapshots of CMDB tables in an SQLite file, to start warm.
+
+Every table is saved with the configuration checksum read before it was
+loaded from FortiOS, see shadow.ShadowStore.warm_start(). One file holds
+the tables of one FortiGate, it may be shared by several processes.
+"""
+
+import contextlib
+import sqlite3
+import time
+
+try:
+    from oslo_log import log as logging
+except Exception:
+    import logging
+
+try:
+    from oslo_serialization import jsonutils
+except Exception:
+    import json as jsonutils
+
+from fortiosclient._i18n import _LW
+
+LOG = logging.getLogger(__name__)
+
+# seconds to wait for the other processes writing to the file
+SQLITE_TIMEOUT = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cmdb_tables (
+    name TEXT NOT NULL,
+    vdom TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    entries TEXT NOT NULL,
+    saved REAL NOT NULL,
+    PRIMARY KEY (name, vdom)
+)
+"""
+
+
+def _vdom(vdom):
+    # the global tables have no vdom, NULL is not a usable key
+    return vdom or ''
+
+
+class SnapshotFile(object):
+    """The CMDB tables saved in an SQLite file by (table, vdom)."""
+
+    def __init__(self, path):
+        self._path = path
+        self._ready = False
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self._path, timeout=SQLITE_TIMEOUT)
+        try:
+            if not self._ready:
+                conn.execute(_SCHEMA)
+                self._ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self):
+        '''Return the saved tables.
+
+        :returns: a dictionary of the (revision, entries) of the tables by
+                  (table, vdom), the vdom is None for the global tables.
+                  It is empty if the file is unreadable.
+        '''
+        tables = {}
+        try:
+            with self._connect() as conn:
+                rows = conn.execute('SELECT name, vdom, revision, entries '
+                                    'FROM cmdb_tables').fetchall()
+        except sqlite3.Error as e:
+            LOG.warning(_LW("Ignoring the unreadable snapshot %(path)s: "
+                            "%(e)s"), {'path': self._path, 'e': e})
+            return tables
+        for name, vdom, revision, entries in rows:
+            try:
+                tables[(name, vdom or None)] = (revision,
+                                                jsonutils.loads(entries))
+            except ValueError:
+                LOG.warning(_LW("Ignoring the corrupted snapshot of "
+                                "%(table)s in %(path)s"),
+                            {'table': name, 'path': self._path})
+        return tables
+
+    def save(self, table, vdom, revision, entries):
+        '''Save the entries of table loaded at configuration revision.'''
+        if revision is None:
+            # it could not be validated at the next start
+            self.delete(table, vdom)
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute('INSERT OR REPLACE INTO cmdb_tables (name, '
+                             'vdom, revision, entries, saved) VALUES '
+                             '(?, ?, ?, ?, ?)',
+                             (table, _vdom(vdom), revision,
+                              jsonutils.dumps(entries), time.time()))
+        except sqlite3.Error as e:
+            LOG.warning(_LW("Failed to save %(table)s to the snapshot "
+                            "%(path)s: %(e)s"),
+                        {'table': table, 'path': self._path, 'e': e})
+
+    def delete(self, table, vdom):
+        try:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM cmdb_tables WHERE name = ? AND '
+                             'vdom = ?', (table, _vdom(vdom)))
+        except sqlite3.Error as e:
+            LOG.warning(_LW("Failed to delete %(table)s from the snapshot "
+                            "%(path)s: %(e)s"),
+                        {'table': table, 'path': self._path, 'e': e})
@@ -398,40 +398,40 @@ ADD_FIREWALL_POLICY = """
     "body": {
         "json": {
             "srcintf": [
-                {
-                    {% if srcintf is defined %}
-                        "name": "{{ srcintf }}"
-                    {% else %}
-                        "name": "any"
-                    {% endif %}
-                }
+                {% if srcintf is defined %}
+                    {% for name in ([srcintf] if srcintf is string or srcintf is not iterable else srcintf) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
+                {% else %}
+                    {"name": "any"}
+                {% endif %}
             ],
             "dstintf": [
-                {
-                    {% if dstintf is defined %}
-                        "name": "{{ dstintf }}"
-                    {% else %}
-                        "name": "any"
-                    {% endif %}
-                }
+                {% if dstintf is defined %}
+                    {% for name in ([dstintf] if dstintf is string or dstintf is not iterable else dstintf) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
+                {% else %}
+                    {"name": "any"}
+                {% endif %}
             ],
-            "srcaddr":  [
-                {
-                    {% if srcaddr is defined %}
-                        "name": "{{ srcaddr }}"
-                    {% else %}
-                        "name": "all"
-                    {% endif %}
-                }
+            "srcaddr": [
+                {% if srcaddr is defined %}
+                    {% for name in ([srcaddr] if srcaddr is string or srcaddr is not iterable else srcaddr) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
+                {% else %}
+                    {"name": "all"}
+                {% endif %}
             ],
-            "dstaddr":  [
-                {
-                    {% if dstaddr is defined %}
-                        "name": "{{ dstaddr }}"
-                    {% else %}
-                        "name": "all"
-                    {% endif %}
-                }
+            "dstaddr": [
+                {% if dstaddr is defined %}
+                    {% for name in ([dstaddr] if dstaddr is string or dstaddr is not iterable else dstaddr) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
+                {% else %}
+                    {"name": "all"}
+                {% endif %}
             ],
             {% if action is defined %}
                 "action": "{{ action }}",
@@ -447,9 +447,11 @@ ADD_FIREWALL_POLICY = """
                     "nat": "enable",
                 {% endif %}
                 "ippool": "enable",
-                "poolname":[{
-                    "name": "{{ poolname }}"
-                }],
+                "poolname": [
+                    {% for name in ([poolname] if poolname is string or poolname is not iterable else poolname) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
+                ],
             {% endif %}
             {% if match_vip is defined %}
                 "match-vip": "{{ match_vip }}",
@@ -461,13 +463,15 @@ ADD_FIREWALL_POLICY = """
             {% else %}
                 "status": "enable",
             {% endif %}
-            "service":  [{
+            "service": [
                 {% if service is defined %}
-                    "name": "{{ service }}"
+                    {% for name in ([service] if service is string or service is not iterable else service) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
                 {% else %}
-                    "name": "ALL"
+                    {"name": "ALL"}
                 {% endif %}
-            }],
+            ],
             {% set profiles = {
                 'av-profile': av_profile,
                 'webfilter-profile': webfilter_profile,
@@ -509,30 +513,30 @@ SET_FIREWALL_POLICY = """
         "json": {
             {% if srcintf is defined %}
                 "srcintf": [
-                    {
-                        "name": "{{ srcintf }}"
-                    }
+                    {% for name in ([srcintf] if srcintf is string or srcintf is not iterable else srcintf) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
                 ],
             {% endif %}
             {% if dstintf is defined %}
                 "dstintf": [
-                    {
-                        "name": "{{ dstintf }}"
-                    }
+                    {% for name in ([dstintf] if dstintf is string or dstintf is not iterable else dstintf) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
                 ],
             {% endif %}
             {% if srcaddr is defined %}
-                "srcaddr":  [
-                    {
-                        "name": "{{ srcaddr }}"
-                    }
+                "srcaddr": [
+                    {% for name in ([srcaddr] if srcaddr is string or srcaddr is not iterable else srcaddr) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
                 ],
             {% endif %}
             {% if dstaddr is defined %}
-                "dstaddr":  [
-                    {
-                        "name": "{{ dstaddr }}"
-                    }
+                "dstaddr": [
+                    {% for name in ([dstaddr] if dstaddr is string or dstaddr is not iterable else dstaddr) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
                 ],
             {% endif %}
             {% if action is defined %}
@@ -546,9 +550,11 @@ SET_FIREWALL_POLICY = """
                     "nat": "enable",
                 {% endif %}
                 "ippool": "enable",
-                "poolname":[{
-                    "name":"{{ poolname }}"
-                }],
+                "poolname": [
+                    {% for name in ([poolname] if poolname is string or poolname is not iterable else poolname) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
+                ],
             {% endif %}
             {% if match_vip is defined %}
                 "match-vip":"{{ match_vip }}",
@@ -557,9 +563,11 @@ SET_FIREWALL_POLICY = """
                 "status":"{{ status }}",
             {% endif %}
             {% if service is defined %}
-                "service":  [{
-                    "name": "{{ service }}"
-                }],
+                "service": [
+                    {% for name in ([service] if service is string or service is not iterable else service) %}
+                        {"name": "{{ name }}"}{{ "," if not loop.last }}
+                    {% endfor %}
+                ],
             {% endif %}
             {% set profiles = {
                 'av-profile': av_profile,
@@ -1184,6 +1192,14 @@ GET_MONITOR_LOAD_BALANCE = """
 }
 """
 
+# Checksums of the configuration, of every vdom and of the whole box
+GET_CONFIG_CHECKSUM = """
+{
+    "path": "/api/v2/monitor/system/ha-checksums",
+    "method": "GET"
+}
+"""
+
 GET_USER_LOCAL = """
 {
     {% if name is defined %}
@@ -0,0 +1,84 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+
+from fortiosclient import eventlet_request as request
+
+
+def response(body='{}', status=200):
+    return mock.Mock(status=status, body=body)
+
+
+class FakeRequest(object):
+    """A request of the client answered by a fake FortiGate.
+
+    The requests are recorded in created. A request is sent to the first
+    API provider of latencies it doesn't exclude and answered after its
+    latency, the subclasses override delay() and answer() to change when
+    and how the requests are answered.
+    """
+
+    created = []
+    # seconds the requests to every API provider take
+    latencies = {}
+
+    def __init__(self, client_obj, method, url, body, content_type,
+                 exclude_provider=None, **kwargs):
+        self.method = method
+        self.url = url
+        self.body = body
+        self.exclude_provider = exclude_provider
+        self.provider = None
+        self.killed = False
+        self._green_thread = None
+        self.created.append(self)
+
+    @classmethod
+    def patch(cls, test):
+        '''Makes the clients of test issue their requests with cls.'''
+        cls.created = []
+        patcher = mock.patch.object(request, 'GenericRequestEventlet', cls)
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+    def delay(self):
+        providers = [p for p in sorted(self.latencies)
+                     if p != self.exclude_provider]
+        if not providers:
+            return 0
+        self.provider = providers[0]
+        return self.latencies[self.provider]
+
+    def answer(self):
+        return response('{"url": "%s"}' % self.url)
+
+    def _run(self):
+        eventlet.sleep(self.delay())
+        return self.answer()
+
+    def start(self):
+        self._green_thread = eventlet.spawn(self._run)
+
+    def join(self):
+        return self._green_thread.wait()
+
+    def link(self, func):
+        self._green_thread.link(lambda gt: func(self))
+
+    def kill(self):
+        self.killed = True
+        self._green_thread.kill()
@@ -27,6 +27,7 @@ import six.moves.urllib as urllib
 import unittest2
 
 from fortiosclient import client as fortiosclient
+from fortiosclient.common import retry
 from fortiosclient import eventlet_client as client
 from fortiosclient import eventlet_request as request
 
@@ -48,12 +49,20 @@ class ApiRequestEventletTestCase(unittest2.TestCase):
     def setUp(self):
 
         super(ApiRequestEventletTestCase, self).setUp()
+        # retry at once, the mocked responses are mostly failures
+        policy = retry.RetryPolicy(base=0)
+        patcher = mock.patch.object(request.EventletApiRequest,
+                                    'DEFAULT_RETRY_POLICY', policy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.client = client.EventletApiClient(
-            [("127.0.0.1", 80, False)], "admin", "admin")
+            [("127.0.0.1", 80, False)], "admin", "admin",
+            retry_policy=policy)
         self.url = "/abc"
         self.req = request.EventletApiRequest(self.client, self.url)
         self.fortiosclient = fortiosclient.FortiosApiClient(
-            [("127.0.0.1", 80, False)], "admin", "admin")
+            [("127.0.0.1", 80, False)], "admin", "admin",
+            retry_policy=policy)
 
     def tearDown(self):
         self.client = None
@@ -72,6 +81,57 @@ class ApiRequestEventletTestCase(unittest2.TestCase):
         for i in range(10):
             request.EventletApiRequest._spawn(x, i)
 
+    def test_request_pool_per_client(self):
+        other = client.EventletApiClient(
+            [("127.0.0.2", 80, False), ("127.0.0.3", 80, False)],
+            "admin", "admin", concurrent_connections=3)
+        self.assertIsNot(self.client.request_pool, other.request_pool)
+        self.assertEqual(1, self.client.request_pool.size)
+        self.assertEqual(6, other.request_pool.size)
+        req = request.EventletApiRequest(other, self.url)
+        req._handle_request = mock.Mock()
+        req.start()
+        self.assertEqual(1, other.request_pool.running())
+        self.assertEqual(0, self.client.request_pool.running())
+        req.join()
+        self.assertTrue(req._handle_request.called)
+
+    def test_issue_request_provider_limit(self):
+        self.client._provider_concurrency = 2
+        (mysock, myresponse, myconn) = self.prep_issue_request()
+        myresponse.status = 200
+        limit = self.client.provider_limit(("127.0.0.1", 80, False))
+        self.assertIs(limit, self.client.provider_limit(
+            ("127.0.0.1", None, False)))
+        self.assertEqual(2, limit.limit)
+        in_flight = []
+        myconn.getresponse.side_effect = (
+            lambda: in_flight.append(limit.in_flight) or myresponse)
+        # myconn is not an HTTPConnection of the provider
+        self.client.provider_limit = mock.Mock(return_value=limit)
+        self.req._issue_request()
+        self.assertEqual([1], in_flight)
+        self.assertEqual(0, limit.in_flight)
+
+    def test_inline_request(self):
+        req = request.EventletApiRequest(self.client, self.url, inline=True)
+        req._handle_request = mock.Mock(
+            side_effect=lambda: eventlet.getcurrent())
+        req.spawn = mock.Mock()
+        req.start()
+        self.assertFalse(req.spawn.called)
+        # processed in the green thread calling join()
+        self.assertIs(eventlet.getcurrent(), req.join())
+
+    def test_inline_request_timeout(self):
+        req = request.EventletApiRequest(self.client, self.url, inline=True,
+                                         http_timeout=0.01, retries=1)
+        req._handle_request = mock.Mock(
+            side_effect=lambda: eventlet.sleep(1))
+        req.start()
+        self.assertIsNone(req.join())
+        self.assertIsNotNone(req.request_error)
+
     def test_join_with_handle_request(self):
         self.req._handle_request = mock.Mock()
         self.req.start()
@@ -186,6 +246,18 @@ class ApiRequestEventletTestCase(unittest2.TestCase):
                 continue
             self.assertEqual(args[3]["Cookie"], 'ck')
 
+    def test_issue_request_killed_releases_connection(self):
+        (mysock, myresponse, myconn) = self.prep_issue_request()
+        myconn.getresponse.side_effect = lambda: eventlet.sleep(10)
+        self.req.start()
+        self.addCleanup(self.req.kill)
+        with eventlet.Timeout(REQUEST_TIMEOUT * 5):
+            while not myconn.request.called:
+                eventlet.sleep(0.01)
+        self.req.kill()
+        self.client.release_connection.assert_called_once_with(
+            myconn, True, False, rid=self.req._rid())
+
     #TODO(jerryz): something didn't run
     def noop_test_issue_request_ok(self):
         (mysock, myresponse, myconn) = self.prep_issue_request(
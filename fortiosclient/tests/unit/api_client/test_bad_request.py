@@ -0,0 +1,129 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import threading
+
+from six.moves import BaseHTTPServer
+import unittest2
+
+from fortiosclient import client
+from fortiosclient.common import retry
+from fortiosclient import exception
+
+
+class FakeFortiGate(BaseHTTPServer.HTTPServer):
+    """A FortiGate answering 400 to the requests of expired sessions."""
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+                                           FakeHandler)
+        self.requests = []
+        self.sessions = 0
+        # the sessions the requests are answered 400 to, without an error
+        # code as FortiOS does before it parses the request
+        self.expired = set()
+
+
+class FakeHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body, headers=None):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        cookie = self.headers.get('Cookie', '')
+        server.requests.append((self.command, self.path, cookie))
+        if self.path == '/logincheck':
+            server.sessions += 1
+            self._reply(200, '1', {
+                'Set-Cookie': 'ccsrftoken=tk%d; APSCOOKIE_1=session%d' % (
+                    server.sessions, server.sessions)})
+        elif any(s in cookie + self.headers.get('Authorization', '')
+                 for s in server.expired):
+            self._reply(400, '<html><body>Bad Request</body></html>')
+        elif body is not None and b'bad' in body:
+            self._reply(400, json.dumps({'status': 'error', 'error': -5,
+                                         'http_status': 400}))
+        else:
+            self._reply(200, json.dumps({'status': 'success',
+                                         'results': []}))
+
+    do_GET = do_POST = do_PUT = _handle
+
+
+class BadRequestTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(BadRequestTestCase, self).setUp()
+        self.server = FakeFortiGate()
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  kwargs={'poll_interval': 0.01})
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = client.FortiosApiClient(
+            [('127.0.0.1', self.server.server_address[1], False)],
+            'admin', 'secret', singlethread=True, retries=3,
+            retry_policy=retry.RetryPolicy(base=0))
+
+    def _api_requests(self):
+        return [r for r in self.server.requests if r[1] != '/logincheck']
+
+    def test_genuine_bad_request_not_retried(self):
+        with self.assertRaises(exception.BadRequest):
+            self.client.request('ADD_FIREWALL_ADDRESS', vdom='root',
+                                name='bad', subnet='10.0.0.0 255.0.0.0')
+        self.assertEqual(1, len(self._api_requests()))
+
+    def test_expired_session_retried(self):
+        self.client.request('GET_VDOM', name='root')
+        self.server.expired.add('APSCOOKIE_1=session1')
+        self.assertEqual({'status': 'success', 'results': []},
+                         self.client.request('GET_VDOM', name='root'))
+        api_requests = self._api_requests()
+        self.assertEqual(3, len(api_requests))
+        # issued again once logged in again
+        self.assertEqual(2, self.server.sessions)
+        self.assertIn('APSCOOKIE_1=session2', api_requests[-1][2])
+
+    def test_always_expired_session(self):
+        self.client.request('GET_VDOM', name='root')
+        self.server.expired.add('APSCOOKIE_1=session')
+        with self.assertRaises(exception.BadRequest):
+            self.client.request('GET_VDOM', name='root')
+        # the first attempt and the retries
+        self.assertEqual(1 + 4, len(self._api_requests()))
+
+    def test_token_bad_request_not_retried(self):
+        api_client = client.FortiosApiClient(
+            [('127.0.0.1', self.server.server_address[1], False)],
+            'admin', '', token='0' * 30, singlethread=True)
+        self.server.expired.add('0' * 30)
+        with self.assertRaises(exception.BadRequest):
+            api_client.request('GET_VDOM', name='root')
+        self.assertEqual(1, len(self._api_requests()))
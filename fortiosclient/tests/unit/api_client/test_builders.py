@@ -0,0 +1,236 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import itertools
+
+import jinja2
+try:
+    from oslo_serialization import jsonutils
+except Exception:
+    import json as jsonutils
+import unittest2
+
+from fortiosclient import builders
+from fortiosclient import client
+from fortiosclient import operations
+
+# Every param of the API messages, the builders are checked against the
+# templates with these messages and every message with one or two of the
+# params left out.
+MESSAGES = {
+    'LOGIN': {'username': 'admin', 'secretkey': 'secret'},
+    'LOGOUT': {},
+    'ADD_VLAN_INTERFACE': {
+        'name': 'os_vid_4093', 'vlanid': 4093, 'interface': 'port1',
+        'ip': '192.168.30.254 255.255.255.0', 'alias': 'ext',
+        'vdom': 'osvdm1'},
+    'SET_VLAN_INTERFACE': {
+        'name': 'os_vid_4093', 'ip': '192.168.30.254 255.255.255.0',
+        'secondaryips': ['10.0.0.1 255.255.255.0', '10.0.1.1 255.255.255.0'],
+        'vlanid': 4093, 'vdom': 'osvdm1'},
+    'DELETE_VLAN_INTERFACE': {'name': 'os_vid_4093', 'vdom': 'osvdm1'},
+    'GET_VLAN_INTERFACE': {'name': 'os_vid_4093', 'vdom': 'osvdm1'},
+    'ADD_DHCP_SERVER': {
+        'vdom': 'osvdm1',
+        'dns_nameservers': ['8.8.8.8', '8.8.4.4', '1.1.1.1', '9.9.9.9'],
+        'gateway': '10.0.0.1', 'netmask': '255.255.255.0',
+        'interface': 'os_vid_4093', 'start_ip': '10.0.0.2',
+        'end_ip': '10.0.0.254'},
+    'SET_DHCP_SERVER': {
+        'id': 1, 'vdom': 'osvdm1', 'dns_nameservers': ['8.8.8.8'],
+        'gateway': '10.0.0.1', 'netmask': '255.255.255.0',
+        'interface': 'os_vid_4093', 'start_ip': '10.0.0.2',
+        'end_ip': '10.0.0.254'},
+    'DELETE_DHCP_SERVER': {'id': 1, 'vdom': 'osvdm1'},
+    'GET_DHCP_SERVER': {'id': 1, 'vdom': 'osvdm1'},
+    'SET_DHCP_SERVER_RSV_ADDR': {
+        'id': 1, 'vdom': 'osvdm1',
+        'reserved_address': '[{"id": 1, "ip": "10.0.0.5", '
+                            '"mac": "00:01:02:03:04:05"}]'},
+    'ADD_VDOM': {'name': 'osvdm1'},
+    'DELETE_VDOM': {'name': 'osvdm1'},
+    'GET_VDOM': {'name': 'osvdm1'},
+    'ADD_VDOM_LINK': {'name': 'osvdm1_'},
+    'DELETE_VDOM_LINK': {'name': 'osvdm1_'},
+    'GET_VDOM_LINK': {'name': 'osvdm1_'},
+    'ADD_ROUTER_STATIC': {
+        'vdom': 'osvdm1', 'dst': '0.0.0.0 0.0.0.0', 'device': 'port1',
+        'gateway': '10.0.0.1'},
+    'SET_ROUTER_STATIC': {
+        'id': 2, 'vdom': 'osvdm1', 'dst': '0.0.0.0 0.0.0.0',
+        'device': 'port1', 'gateway': '10.0.0.1'},
+    'DELETE_ROUTER_STATIC': {'id': 2, 'vdom': 'osvdm1'},
+    'GET_ROUTER_STATIC': {'id': 2, 'vdom': 'osvdm1'},
+    'ADD_FIREWALL_POLICY': {
+        'vdom': 'osvdm1', 'srcintf': 'port1', 'dstintf': 'port2',
+        'srcaddr': 'src_1', 'dstaddr': 'dst_1', 'action': 'deny',
+        'nat': 'disable', 'poolname': '172.16.1.1', 'match_vip': 'enable',
+        'status': 'disable', 'service': 'HTTP', 'av_profile': 'default',
+        'webfilter_profile': 'default', 'ips_sensor': 'default',
+        'application_list': 'default', 'ssl_ssh_profile': 'deep',
+        'comments': 'tenant 1'},
+    'SET_FIREWALL_POLICY': {
+        'id': 3, 'vdom': 'osvdm1', 'srcintf': 'port1', 'dstintf': 'port2',
+        'srcaddr': 'src_1', 'dstaddr': 'dst_1', 'action': 'deny',
+        'nat': 'disable', 'poolname': '172.16.1.1', 'match_vip': 'enable',
+        'status': 'disable', 'service': 'HTTP', 'av_profile': 'default',
+        'webfilter_profile': '', 'ips_sensor': None,
+        'application_list': 'default', 'ssl_ssh_profile': 'deep',
+        'comments': 'tenant 1'},
+    'DELETE_FIREWALL_POLICY': {'id': 3, 'vdom': 'osvdm1'},
+    'GET_FIREWALL_POLICY': {'id': 3, 'vdom': 'osvdm1'},
+    'MOVE_FIREWALL_POLICY': {
+        'id': 3, 'vdom': 'osvdm1', 'before': 1, 'after': 2},
+    'SET_FIREWALL_VIRT_SERVER': {
+        'name': 'vip1', 'vdom': 'osvdm1', 'extip': '172.16.1.10',
+        'extport': 8080,
+        'realservers': '[{"id": 1, "ip": "10.0.0.5", "port": 80}]'},
+    'ADD_FIREWALL_REAL_SERVER': {
+        'virt_server_name': 'vip1', 'vdom': 'osvdm1', 'ip': '10.0.0.5',
+        'port': 80, 'max_connections': 100, 'status': 'active'},
+    'SET_FIREWALL_REAL_SERVER': {
+        'virt_server_name': 'vip1', 'name': 1, 'vdom': 'osvdm1',
+        'ip': '10.0.0.5', 'port': 80, 'max_connections': 100,
+        'status': 'active'},
+    'DELETE_FIREWALL_REAL_SERVER': {
+        'virt_server_name': 'vip1', 'name': 1, 'vdom': 'osvdm1'},
+    'ADD_FIREWALL_VIP': {
+        'vdom': 'osvdm1', 'name': 'vip1', 'extip': '172.16.1.10',
+        'extintf': 'port1', 'mappedip': '10.0.0.5'},
+    'DELETE_FIREWALL_VIP': {'name': 'vip1', 'vdom': 'osvdm1'},
+    'GET_FIREWALL_VIP': {'name': 'vip1', 'vdom': 'osvdm1'},
+    'ADD_FIREWALL_IPPOOL': {
+        'vdom': 'osvdm1', 'startip': '172.16.1.1', 'endip': '172.16.1.9',
+        'type': 'overload', 'comments': 'snat', 'name': 'pool1'},
+    'DELETE_FIREWALL_IPPOOL': {'name': 'pool1', 'vdom': 'osvdm1'},
+    'GET_FIREWALL_IPPOOL': {'name': 'pool1', 'vdom': 'osvdm1'},
+    'ADD_FIREWALL_ADDRESS': {
+        'vdom': 'osvdm1', 'associated_interface': 'port1',
+        'comment': 'subnet 1', 'subnet': '10.0.0.0 255.255.255.0',
+        'name': 'addr1'},
+    'SET_FIREWALL_ADDRESS': {
+        'vdom': 'osvdm1', 'associated_interface': 'port1',
+        'comment': 'subnet 1', 'subnet': '10.0.0.0 255.255.255.0',
+        'name': 'addr1'},
+    'DELETE_FIREWALL_ADDRESS': {'name': 'addr1', 'vdom': 'osvdm1'},
+    'GET_FIREWALL_ADDRESS': {'name': 'addr1', 'vdom': 'osvdm1'},
+    'ADD_FIREWALL_ADDRGRP': {
+        'vdom': 'osvdm1', 'name': 'addrgrp_1',
+        'members': ['addr%d' % i for i in range(5)]},
+    'SET_FIREWALL_ADDRGRP': {
+        'vdom': 'osvdm1', 'name': 'addrgrp_1',
+        'members': ['addr%d' % i for i in range(5)]},
+    'DELETE_FIREWALL_ADDRGRP': {'name': 'addrgrp_1', 'vdom': 'osvdm1'},
+    'GET_FIREWALL_ADDRGRP': {'name': 'addrgrp_1', 'vdom': 'osvdm1'},
+    'ADD_FIREWALL_SERVICE': {
+        'vdom': 'osvdm1', 'protocol': 'TCP/UDP/SCTP', 'fqdn': 'a.example',
+        'iprange': '10.0.0.1-10.0.0.9', 'tcp_portrange': '100-200:300-400',
+        'udp_portrange': '53', 'sctp_portrange': '900', 'comment': 'svc',
+        'name': 'svc1'},
+    'SET_FIREWALL_SERVICE': {
+        'vdom': 'osvdm1', 'protocol': 'ICMP', 'fqdn': 'a.example',
+        'iprange': '10.0.0.1-10.0.0.9', 'tcp_portrange': '100-200:300-400',
+        'udp_portrange': '53', 'sctp_portrange': '900', 'comment': 'svc',
+        'name': 'svc1'},
+    'DELETE_FIREWALL_SERVICE': {'name': 'svc1', 'vdom': 'osvdm1'},
+    'GET_FIREWALL_SERVICE': {'name': 'svc1', 'vdom': 'osvdm1'},
+    'GET_USER_GROUP': {'name': 'grp1', 'vdom': 'root'},
+    'SET_USER_GROUP': {
+        'name': 'grp1', 'vdom': 'root', 'member': ['user1', 'user2']},
+    'GET_MONITOR_LOAD_BALANCE': {'vdom': 'osvdm1', 'count': 10},
+    'GET_CONFIG_CHECKSUM': {},
+    'GET_USER_LOCAL': {'name': 'user1', 'vdom': 'root'},
+    'ADD_USER_LOCAL': {
+        'vdom': 'root', 'password': 'secret', 'two_factor': 'email',
+        'email': 'user1@example.com', 'mobile_number': '5551234',
+        'name': 'user1'},
+    'PUT_USER_LOCAL': {
+        'name': 'user1', 'vdom': 'root', 'password': 'secret',
+        'email': 'user1@example.com', 'mobile_number': ''},
+    'DELETE_USER_LOCAL': {'name': 'user1', 'vdom': 'root'},
+    'GET_DNS_SERVER': {'name': 'example', 'vdom': 'root'},
+    'ADD_DNS_ENTRY': {
+        'name': 'example', 'vdom': 'root', 'status': 'enable', 'ttl': 300,
+        'ip': '10.0.0.5', 'canonical_name': '', 'type': 'A',
+        'hostname': 'www'},
+    'DELETE_DNS_ENTRY': {'name': 'example', 'vdom': 'root', 'id': 4},
+    'MODIFY_DNS_ENTRY': {
+        'name': 'example', 'vdom': 'root', 'id': 4, 'status': 'enable',
+        'ttl': 300, 'type': 'A', 'hostname': 'www', 'ip': '10.0.0.5'},
+    'GET_DNS_ENTRY': {'name': 'example', 'vdom': 'root'},
+}
+
+# params also checked with the value None, the templates render it as None
+NONE_PARAMS = {
+    'SET_FIREWALL_REAL_SERVER': ['name'],
+    'DELETE_FIREWALL_REAL_SERVER': ['name'],
+}
+
+
+def variants(message, none_params=()):
+    yield message
+    for count in (1, 2):
+        for keys in itertools.combinations(sorted(message), count):
+            yield dict((k, v) for k, v in message.items() if k not in keys)
+    for key in none_params:
+        yield dict(message, **{key: None})
+
+
+def render(opt, message):
+    try:
+        return client.FortiosApiClient._render(opt, **message)
+    except (ValueError, jinja2.UndefinedError):
+        # the template does not support leaving out these params
+        return None
+
+
+class BuildersTestCase(unittest2.TestCase):
+
+    def test_builder_for_every_template(self):
+        self.assertEqual(sorted(operations.OPERATIONS),
+                         sorted(builders.BUILDERS))
+        self.assertEqual(sorted(operations.OPERATIONS), sorted(MESSAGES))
+
+    def test_builders_match_templates(self):
+        for opt in sorted(operations.OPERATIONS):
+            rendered = 0
+            for message in variants(MESSAGES[opt], NONE_PARAMS.get(opt, ())):
+                expected = render(opt, message)
+                if expected is None:
+                    continue
+                rendered += 1
+                built = builders.build(opt, **message)
+                self.assertEqual(jsonutils.dumps(expected),
+                                 jsonutils.dumps(built),
+                                 '%s %s' % (opt, message))
+            self.assertGreater(rendered, 0, opt)
+
+    def test_policy_member_lists(self):
+        members = {'srcintf': ['port1', 'port3'], 'dstintf': ('port2',),
+                   'srcaddr': ['src_1', 'src_2', 'src_3'],
+                   'dstaddr': ['dst_1'], 'service': ['HTTP', 'HTTPS'],
+                   'poolname': ['172.16.1.1', '172.16.1.2']}
+        for opt in ('ADD_FIREWALL_POLICY', 'SET_FIREWALL_POLICY'):
+            message = dict(MESSAGES[opt], **members)
+            expected = render(opt, message)
+            for key, names in members.items():
+                self.assertEqual([{'name': n} for n in names],
+                                 expected['body']['json'][key])
+            self.assertEqual(jsonutils.dumps(expected),
+                             jsonutils.dumps(builders.build(opt, **message)))
+
+    def test_build_unknown_opt(self):
+        with self.assertRaises(AttributeError):
+            builders.build('UNKNOWN_OPT')
@@ -0,0 +1,307 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import unittest2
+
+from fortiosclient import client
+from fortiosclient.common import cache
+from fortiosclient import exception
+from fortiosclient.tests.unit.api_client import fakes
+
+PROVIDER = (('127.0.0.1', 80, False),)
+ADDRESSES = '/api/v2/cmdb/firewall/address?vdom=root'
+
+
+response = fakes.response
+
+
+class ResponseCacheTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(ResponseCacheTestCase, self).setUp()
+        self.now = 1000.0
+        patcher = mock.patch.object(cache.time, 'time',
+                                    side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_location(self):
+        self.assertEqual(('root', 'firewall/addrgrp'),
+                         cache.location('/api/v2/cmdb/firewall/addrgrp/'
+                                        'grp1/member?vdom=root'))
+        self.assertEqual((None, None),
+                         cache.location('/api/v2/monitor/system/status'))
+
+    def test_ttl(self):
+        responses = cache.ResponseCache(ttl=5, ttls={'GET_VDOM': 60,
+                                                     'GET_STATUS': 0})
+        url = '/api/v2/cmdb/system/vdom/osvdm1'
+        responses.put(PROVIDER, url, response(), 'GET_VDOM')
+        responses.put(PROVIDER, ADDRESSES, response())
+        responses.put(PROVIDER, '/status', response(), 'GET_STATUS')
+        self.assertEqual(2, len(responses))
+        self.now += 10
+        self.assertIsNotNone(responses.get(PROVIDER, url))
+        self.assertIsNone(responses.get(PROVIDER, ADDRESSES))
+        self.assertEqual(1, len(responses))
+        self.assertEqual((1, 1), (responses.hits, responses.misses))
+
+    def test_lru_eviction(self):
+        responses = cache.ResponseCache(max_entries=2)
+        for name in ('a', 'b'):
+            responses.put(PROVIDER, name, response())
+        responses.get(PROVIDER, 'a')
+        responses.put(PROVIDER, 'c', response())
+        self.assertIsNone(responses.get(PROVIDER, 'b'))
+        self.assertIsNotNone(responses.get(PROVIDER, 'a'))
+        self.assertIsNotNone(responses.get(PROVIDER, 'c'))
+
+    def test_memory_bound(self):
+        responses = cache.ResponseCache(max_bytes=10)
+        responses.put(PROVIDER, 'a', response('x' * 6))
+        responses.put(PROVIDER, 'b', response('x' * 4))
+        self.assertEqual(10, responses.size)
+        responses.put(PROVIDER, 'c', response('x' * 3))
+        self.assertIsNone(responses.get(PROVIDER, 'a'))
+        self.assertEqual(7, responses.size)
+        responses.put(PROVIDER, 'd', response('x' * 11))
+        self.assertIsNone(responses.get(PROVIDER, 'd'))
+        self.assertEqual(2, len(responses))
+
+    def test_invalidate_table(self):
+        responses = cache.ResponseCache()
+        other = (('10.0.0.1', 443, True),)
+        urls = [ADDRESSES,
+                '/api/v2/cmdb/firewall/address/addr1?vdom=root',
+                '/api/v2/cmdb/firewall/address',
+                '/api/v2/cmdb/firewall/address?vdom=osvdm1',
+                '/api/v2/cmdb/firewall/addrgrp?vdom=root']
+        for url in urls:
+            responses.put(PROVIDER, url, response())
+        responses.put(other, ADDRESSES, response())
+        responses.invalidate(PROVIDER,
+                             '/api/v2/cmdb/firewall/address/addr2?vdom=root')
+        self.assertEqual([None, None, None],
+                         [responses.get(PROVIDER, url) for url in urls[:3]])
+        self.assertIsNotNone(responses.get(PROVIDER, urls[3]))
+        self.assertIsNotNone(responses.get(PROVIDER, urls[4]))
+        self.assertIsNotNone(responses.get(other, ADDRESSES))
+
+    def test_invalidate_other_write(self):
+        responses = cache.ResponseCache()
+        responses.put(PROVIDER, ADDRESSES, response())
+        responses.invalidate(PROVIDER, '/api/v2/monitor/system/config/'
+                                       'restore')
+        self.assertEqual(0, len(responses))
+
+    def test_revalidate(self):
+        responses = cache.ResponseCache(ttl=5)
+        revision = mock.Mock(return_value='c1')
+        responses.put(PROVIDER, ADDRESSES, response(), revision='c1')
+        self.assertIsNotNone(responses.get(PROVIDER, ADDRESSES, revision))
+        self.assertFalse(revision.called)
+        self.now += 10
+        self.assertIsNotNone(responses.get(PROVIDER, ADDRESSES, revision))
+        self.now += 4
+        self.assertIsNotNone(responses.get(PROVIDER, ADDRESSES, revision))
+        self.assertEqual(1, revision.call_count)
+        self.now += 10
+        revision.return_value = 'c2'
+        self.assertIsNone(responses.get(PROVIDER, ADDRESSES, revision))
+        self.assertEqual({'hits': 3, 'misses': 1, 'revalidated': 1,
+                          'entries': 0, 'bytes': 0}, responses.stats())
+
+    def test_expired_without_revision(self):
+        responses = cache.ResponseCache(ttl=5)
+        revision = mock.Mock(return_value=None)
+        responses.put(PROVIDER, ADDRESSES, response(), revision='c1')
+        responses.put(PROVIDER, 'a', response())
+        self.now += 10
+        self.assertIsNone(responses.get(PROVIDER, 'a', revision))
+        self.assertIsNone(responses.get(PROVIDER, ADDRESSES, revision))
+        self.assertEqual(1, revision.call_count)
+        self.assertEqual(0, len(responses))
+
+    def test_stale_response_not_cached(self):
+        responses = cache.ResponseCache()
+        generation = responses.generation
+        responses.invalidate(PROVIDER, ADDRESSES)
+        responses.put(PROVIDER, ADDRESSES, response(), generation=generation)
+        self.assertEqual(0, len(responses))
+
+
+class FakeRequest(fakes.FakeRequest):
+    """A request to a FortiGate whose configuration checksum is checksum."""
+
+    def answer(self):
+        if self.url.endswith('/ha-checksums'):
+            return response('{"results": [{"is_root_master": 0, '
+                            '"checksum": {"all": "backup"}}, '
+                            '{"is_root_master": 1, '
+                            '"checksum": {"all": "%s"}}]}' % self.checksum,
+                            self.checksum_status)
+        return response('{"results": [{"name": "%s"}]}' % self.url)
+
+
+class ClientCacheTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(ClientCacheTestCase, self).setUp()
+        FakeRequest.patch(self)
+        FakeRequest.checksum = 'c1'
+        FakeRequest.checksum_status = 200
+        self.cache = cache.ResponseCache(ttls={'GET_VDOM': 60})
+        self.client = client.FortiosApiClient(
+            [("127.0.0.1", 80, False)], "admin", "",
+            response_cache=self.cache)
+
+    def test_get_served_from_cache(self):
+        first = self.client.request('GET_VDOM', name='osvdm1')
+        second = self.client.request('GET_VDOM', name='osvdm1')
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        self.assertEqual(1, len(FakeRequest.created))
+        self.assertEqual(60, self.cache.ttl('GET_VDOM'))
+
+    def test_write_invalidates(self):
+        self.client.request('GET_FIREWALL_ADDRESS', vdom='root')
+        self.client.request('GET_FIREWALL_ADDRGRP', vdom='root')
+        self.client.request('DELETE_FIREWALL_ADDRESS', vdom='root',
+                            name='addr1')
+        self.client.request('GET_FIREWALL_ADDRESS', vdom='root')
+        self.client.request('GET_FIREWALL_ADDRGRP', vdom='root')
+        self.assertEqual(['GET', 'GET', 'DELETE', 'GET'],
+                         [r.method for r in FakeRequest.created])
+
+    def test_failed_write_invalidates(self):
+        self.client.cmdb('firewall/address', vdom='root')
+        with mock.patch.object(FakeRequest, 'join', side_effect=IOError):
+            self.assertRaises(IOError, self.client.cmdb, 'firewall/address',
+                              method='POST', vdom='root', body={})
+        self.assertEqual(0, len(self.cache))
+
+    def test_error_not_cached(self):
+        with mock.patch.object(FakeRequest, 'join',
+                               return_value=response(status=500)):
+            self.assertRaises(exception.ApiException, self.client.monitor,
+                              'system/status')
+        self.assertEqual(0, len(self.cache))
+
+    def test_no_cache_by_default(self):
+        api_client = client.FortiosApiClient(
+            [("127.0.0.1", 80, False)], "admin", "")
+        api_client.request('GET_VDOM', name='osvdm1')
+        api_client.request('GET_VDOM', name='osvdm1')
+        self.assertEqual(2, len(FakeRequest.created))
+
+
+class RevalidationTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(RevalidationTestCase, self).setUp()
+        FakeRequest.patch(self)
+        FakeRequest.checksum = 'c1'
+        FakeRequest.checksum_status = 200
+        self.now = 1000.0
+        patcher = mock.patch.object(cache.time, 'time',
+                                    side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = cache.ResponseCache(ttl=5)
+        self.client = client.FortiosApiClient(
+            [("127.0.0.1", 80, False)], "admin", "",
+            response_cache=self.cache, revalidate_cache=True)
+
+    def _get_addresses(self):
+        return self.client.request('GET_FIREWALL_ADDRESS', vdom='root')
+
+    def _sent(self):
+        return [r.url.split('?')[0].rstrip('/').rsplit('/', 1)[1]
+                for r in FakeRequest.created]
+
+    def test_config_checksum(self):
+        self.assertEqual('c1', self.client.config_checksum())
+        self.assertEqual('c1', self.client.config_gen)
+
+    def test_unchanged_configuration(self):
+        self._get_addresses()
+        self.now += 10
+        self._get_addresses()
+        self.now += 10
+        self._get_addresses()
+        self.assertEqual(['ha-checksums', 'address', 'ha-checksums',
+                          'ha-checksums'], self._sent())
+        stats = self.client.cache_stats()
+        self.assertEqual((2, 1, 2, 3),
+                         (stats['hits'], stats['misses'],
+                          stats['revalidated'], stats['config_checks']))
+
+    def test_changed_configuration(self):
+        self._get_addresses()
+        self.now += 10
+        FakeRequest.checksum = 'c2'
+        self._get_addresses()
+        self.assertEqual(['ha-checksums', 'address', 'ha-checksums',
+                          'address'], self._sent())
+
+    def test_miss_stamped_with_last_checksum(self):
+        self._get_addresses()
+        self.client.request('GET_FIREWALL_ADDRGRP', vdom='root')
+        self.assertEqual(['ha-checksums', 'address', 'addrgrp'],
+                         self._sent())
+        self.now += 10
+        self.client.request('GET_FIREWALL_ADDRGRP', vdom='root')
+        self.assertEqual(['ha-checksums', 'address', 'addrgrp',
+                          'ha-checksums'], self._sent())
+        self.assertEqual(1, self.client.cache_stats()['revalidated'])
+
+    def test_checksum_failures_back_off(self):
+        FakeRequest.checksum_status = 500
+        self._get_addresses()
+        self._get_addresses()
+        self.client.request('GET_FIREWALL_ADDRGRP', vdom='root')
+        self.assertEqual(['ha-checksums', 'address', 'addrgrp'],
+                         self._sent())
+        self.now += 1
+        self.client.cmdb('firewall/vip', vdom='root')
+        self.now += 1
+        self.client.cmdb('firewall/ippool', vdom='root')
+        self.assertEqual(['ha-checksums', 'address', 'addrgrp',
+                          'ha-checksums', 'vip', 'ippool'], self._sent())
+        FakeRequest.checksum_status = 200
+        self.now += 1
+        self.assertEqual('c1', self.client.config_checksum())
+
+    def test_monitor_not_revalidated(self):
+        self.client.monitor('system/status')
+        self.now += 10
+        self.client.monitor('system/status')
+        self.assertEqual(['status', 'status'], self._sent())
+
+    def test_checksum_reused(self):
+        self.client._gen_timeout = 60
+        self._get_addresses()
+        self.client.request('GET_FIREWALL_ADDRGRP', vdom='root')
+        self.assertEqual(['ha-checksums', 'address', 'addrgrp'],
+                         self._sent())
+        self.client.request('DELETE_FIREWALL_VIP', vdom='root', name='vip1')
+        self.assertIsNone(self.client.config_gen)
+
+    def test_no_checksum(self):
+        with mock.patch.object(FakeRequest, 'join',
+                               return_value=response(status=404)):
+            self.assertIsNone(self.client.config_checksum())
+        self.assertFalse(self.client._revalidate_cache)
@@ -13,12 +13,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
+import shutil
+import tempfile
+
+import jinja2
 import mock
 import unittest2
 
 from fortiosclient import client
+from fortiosclient import compiled_templates
 from fortiosclient import eventlet_request as request
 from fortiosclient import exception
+from fortiosclient import templates
 
 E_R_CLS = request.GenericRequestEventlet.__name__
 
@@ -80,3 +87,221 @@ class ClientTestCase(unittest2.TestCase):
             instance.join.return_value.body = '{"Bad Request": ""}'
             with self.assertRaises(exception.BadRequest):
                 self.client.request('ADD_VLAN_INTERFACE', **self.message)
+
+    def test_render_template_cached(self):
+        tmpl = client.get_template('ADD_VLAN_INTERFACE')
+        self.assertIs(tmpl, client.get_template('ADD_VLAN_INTERFACE'))
+        message = client.FortiosApiClient._render('ADD_VLAN_INTERFACE',
+                                                  **self.message)
+        self.assertEqual('/api/v2/cmdb/system/interface', message['path'])
+        self.assertEqual('ext_4093', message['body']['json']['name'])
+
+    def _compile_templates(self, *opts):
+        # the modules are generated in a directory of the package
+        target = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, target)
+        env = client.create_template_env()
+        for opt in opts:
+            path = os.path.join(target,
+                                compiled_templates.module_name(opt) + '.py')
+            with open(path, 'w') as f:
+                f.write(compiled_templates.compile_module(
+                    env, opt, getattr(templates, opt)))
+        patcher = mock.patch.object(compiled_templates, '__path__', [target])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_compiled_template_of_other_source_ignored(self):
+        self._compile_templates('ADD_FIREWALL_ADDRESS')
+        env = client.create_template_env()
+        self.assertIsNone(compiled_templates.load(
+            env, 'ADD_FIREWALL_ADDRESS', templates.ADD_FIREWALL_ADDRESS + ' '))
+        self.assertIsNone(compiled_templates.load(
+            env, 'ADD_FIREWALL_ADDRGRP', templates.ADD_FIREWALL_ADDRGRP))
+
+    def test_load_compiled_template(self):
+        self._compile_templates('ADD_FIREWALL_ADDRESS')
+        env = client.create_template_env()
+        tmpl = env.get_template('ADD_FIREWALL_ADDRESS')
+        self.assertTrue(tmpl.filename.endswith(
+            'tmpl_add_firewall_address.py'))
+        message = {'name': 'addr', 'subnet': '10.0.0.0 255.255.255.0',
+                   'vdom': 'root'}
+        self.assertEqual(
+            jinja2.Template(templates.ADD_FIREWALL_ADDRESS).render(**message),
+            tmpl.render(**message))
+
+    def test_other_jinja_version_logged_once(self):
+        self._compile_templates('ADD_FIREWALL_ADDRESS')
+        env = client.create_template_env()
+        source = templates.ADD_FIREWALL_ADDRESS
+        with mock.patch.object(compiled_templates.jinja2, '__version__',
+                               '0.0'), \
+                mock.patch.object(compiled_templates, '_version_logged',
+                                  False), \
+                mock.patch.object(compiled_templates.LOG, 'info') as info:
+            for opt in ('ADD_FIREWALL_ADDRESS', 'ADD_FIREWALL_ADDRESS'):
+                self.assertIsNone(compiled_templates.load(env, opt, source))
+        self.assertEqual(1, info.call_count)
+
+    def test_send_request_native_builder(self):
+        api_client = client.FortiosApiClient(
+            self.api, self.user, self.password,
+            native_builders=['ADD_VLAN_INTERFACE'])
+        with mock.patch(__name__ + '.request.' + E_R_CLS) as MockClass:
+            instance = MockClass.return_value
+            instance.join.return_value.status = 200
+            instance.join.return_value.body = '{}'
+            with mock.patch.object(client.FortiosApiClient,
+                                   '_render') as render:
+                api_client.request('ADD_VLAN_INTERFACE', **self.message)
+                self.assertFalse(render.called)
+            expected = client.FortiosApiClient._render('ADD_VLAN_INTERFACE',
+                                                       **self.message)
+            args = MockClass.call_args[0]
+            self.assertEqual((expected['method'], expected['path'],
+                              expected['body']), args[1:4])
+
+    def test_cmdb_request(self):
+        with mock.patch(__name__ + '.request.' + E_R_CLS) as MockClass:
+            instance = MockClass.return_value
+            instance.join.return_value.status = 200
+            instance.join.return_value.body = '{"results": []}'
+            body = self.client.cmdb('firewall/addrgrp', mkey='grp 1/2',
+                                    child='member', vdom='osvdm1',
+                                    params={'with_meta': True})
+            self.assertEqual({'results': []}, body)
+            self.assertEqual(
+                ('GET', '/api/v2/cmdb/firewall/addrgrp/grp%201%2F2/member'
+                        '?vdom=osvdm1&with_meta=1', None),
+                MockClass.call_args[0][1:4])
+            payload = {'name': 'addr1'}
+            self.client.cmdb('firewall/addrgrp', 'POST', mkey='grp1',
+                             child='member', body=payload)
+            self.assertEqual(
+                ('POST', '/api/v2/cmdb/firewall/addrgrp/grp1/member',
+                 payload), MockClass.call_args[0][1:4])
+
+    def test_missing_params_checked_when_debugging(self):
+        with mock.patch.object(client.operations, 'missing_params',
+                               return_value=set()) as missing:
+            with mock.patch.object(client.LOG, 'isEnabledFor',
+                                   return_value=False):
+                self.client._prepare('GET_VDOM', {'name': 'osvdm1'})
+            self.assertFalse(missing.called)
+            with mock.patch.object(client.LOG, 'isEnabledFor',
+                                   return_value=True):
+                self.client._prepare('GET_VDOM', {'name': 'osvdm1'})
+            missing.assert_called_once_with('GET_VDOM', {'name': 'osvdm1'})
+
+    def test_cmdb_child_requires_mkey(self):
+        with self.assertRaises(ValueError):
+            self.client.cmdb('firewall/addrgrp', child='member')
+
+    def test_monitor_request(self):
+        with mock.patch(__name__ + '.request.' + E_R_CLS) as MockClass:
+            instance = MockClass.return_value
+            instance.join.return_value.status = 404
+            instance.join.return_value.body = '{}'
+            with self.assertRaises(exception.ResourceNotFound):
+                self.client.monitor('firewall/policy', vdom='root',
+                                    params={'policyid': [1, 2]})
+            self.assertEqual(
+                ('GET', '/api/v2/monitor/firewall/policy'
+                        '?vdom=root&policyid=1&policyid=2', None),
+                MockClass.call_args[0][1:4])
+
+    def test_get_fields_skip_meta(self):
+        with mock.patch(__name__ + '.request.' + E_R_CLS) as MockClass:
+            instance = MockClass.return_value
+            instance.join.return_value.status = 200
+            instance.join.return_value.body = '{"results": []}'
+            self.client.request('GET_FIREWALL_ADDRESS', vdom='osvdm1',
+                                fields=['name', 'subnet'], skip_meta=True)
+            self.assertEqual('/api/v2/cmdb/firewall/address/?vdom=osvdm1'
+                             '&format=name%7Csubnet&skip=1',
+                             MockClass.call_args[0][2])
+            self.client.request('GET_VDOM', name='osvdm1', fields=['name'])
+            self.assertEqual('/api/v2/cmdb/system/vdom/osvdm1'
+                             '?format=name', MockClass.call_args[0][2])
+            self.client.cmdb('firewall/address', vdom='root',
+                             fields=['name'], skip_meta=True)
+            self.assertEqual('/api/v2/cmdb/firewall/address?vdom=root'
+                             '&format=name&skip=1',
+                             MockClass.call_args[0][2])
+
+    def test_request_inline(self):
+        with self._fake_requests({'/api/v2/cmdb/system/vdom/osvdm1':
+                                  [200, 200]}) as MockClass:
+            self.client.request('GET_VDOM', name='osvdm1')
+            self.assertTrue(MockClass.call_args[1]['inline'])
+            self.client.request_async('GET_VDOM', name='osvdm1')
+            self.assertFalse(MockClass.call_args[1]['inline'])
+
+    def test_request_not_inline(self):
+        api_client = client.FortiosApiClient(
+            self.api, self.user, self.password, inline_requests=False)
+        with self._fake_requests({'/api/v2/cmdb/system/vdom/osvdm1':
+                                  [200]}) as MockClass:
+            api_client.request('GET_VDOM', name='osvdm1')
+            self.assertFalse(MockClass.call_args[1]['inline'])
+
+    def _fake_requests(self, statuses):
+        # a GenericRequestEventlet mock answering with the next status of
+        # the url in statuses
+        def create(client_obj, method, url, *args, **kwargs):
+            instance = mock.Mock()
+            status = statuses[url].pop(0)
+            instance.join.return_value.status = status
+            instance.join.return_value.body = '{"url": "%s"}' % url
+            return instance
+        return mock.patch(__name__ + '.request.' + E_R_CLS,
+                          side_effect=create)
+
+    def test_request_many(self):
+        requests = [('GET_VDOM', {'name': 'osvdm%d' % i}) for i in range(4)]
+        path = '/api/v2/cmdb/system/vdom/osvdm%d'
+        statuses = dict((path % i, [200]) for i in range(4))
+        statuses[path % 2] = [404]
+        with self._fake_requests(statuses) as MockClass:
+            results = self.client.request_many(requests, concurrency=2)
+        self.assertEqual(4, MockClass.call_count)
+        self.assertEqual([True, True, False, True], [r.ok for r in results])
+        self.assertEqual({'url': path % 3}, results[3].body)
+        self.assertIsNone(results[3].exception)
+        self.assertIsInstance(results[2].exception,
+                              exception.ResourceNotFound)
+
+    def test_request_many_retry_failed(self):
+        requests = [('GET_VDOM', {'name': 'osvdm%d' % i}) for i in range(3)]
+        path = '/api/v2/cmdb/system/vdom/osvdm%d'
+        statuses = {path % 0: [200], path % 1: [503, 503, 200],
+                    path % 2: [200]}
+        with self._fake_requests(statuses) as MockClass:
+            results = self.client.request_many(requests, retry_failed=2)
+        # only the failed request is issued again
+        self.assertEqual(5, MockClass.call_count)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual({'url': path % 1}, results[1].body)
+
+    def test_request_many_final_failures_not_retried(self):
+        requests = [('GET_VDOM', {'name': 'osvdm1'}),
+                    ('ADD_FIREWALL_ADDRESS', {'vdom': 'root', 'name': 'a1',
+                                              'subnet': '10.0.0.0 255.0.0.0'}),
+                    ('DELETE_VDOM', {'name': 'osvdm2'})]
+        statuses = {'/api/v2/cmdb/system/vdom/osvdm1': [404],
+                    '/api/v2/cmdb/firewall/address?vdom=root': [500],
+                    '/api/v2/cmdb/system/vdom/osvdm2': [503, 200]}
+        with self._fake_requests(statuses) as MockClass:
+            results = self.client.request_many(requests, retry_failed=2)
+        self.assertEqual(4, MockClass.call_count)
+        self.assertEqual([False, False, True], [r.ok for r in results])
+
+    def test_retryable(self):
+        timeout = exception.RequestTimeout()
+        self.assertTrue(client.retryable('GET_VDOM', timeout))
+        self.assertFalse(client.retryable('ADD_FIREWALL_ADDRESS', timeout))
+        self.assertTrue(client.retryable('ADD_FIREWALL_ADDRESS',
+                                         exception.ServiceUnavailable()))
+        self.assertFalse(client.retryable('GET_VDOM',
+                                          exception.BadRequest()))
@@ -0,0 +1,74 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import unittest2
+
+from fortiosclient import client
+from fortiosclient.tests.unit.api_client import fakes
+
+
+class FakeRequest(fakes.FakeRequest):
+    """A request answered after a while."""
+
+    def delay(self):
+        return 0.05 if self.method == 'GET' else 0
+
+
+class CoalescingTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(CoalescingTestCase, self).setUp()
+        FakeRequest.patch(self)
+        self.client = client.FortiosApiClient(
+            [("127.0.0.1", 80, False)], "admin", "")
+
+    def _concurrently(self, *calls):
+        pool = eventlet.GreenPool()
+        threads = [pool.spawn(func, *args) for func, args in calls]
+        return [t.wait() for t in threads]
+
+    def _get_vdom(self, name):
+        return self.client.request('GET_VDOM', name=name)
+
+    def test_identical_gets_share_a_request(self):
+        results = self._concurrently(*[(self._get_vdom, ('osvdm1',))] * 3)
+        self.assertEqual(1, len(FakeRequest.created))
+        self.assertEqual([{'url': '/api/v2/cmdb/system/vdom/osvdm1'}] * 3,
+                         results)
+        # every caller decodes its own response
+        self.assertIsNot(results[0], results[1])
+        self.assertEqual({}, self.client._gets_in_flight)
+
+    def test_different_gets(self):
+        self._concurrently((self._get_vdom, ('osvdm1',)),
+                           (self._get_vdom, ('osvdm2',)))
+        self.assertEqual(2, len(FakeRequest.created))
+
+    def test_no_sharing_after_a_write(self):
+        def write_then_get():
+            eventlet.sleep(0)
+            self.client.request('DELETE_VDOM', name='osvdm1')
+            return self._get_vdom('osvdm1')
+        # the first GET is still in flight when the write completes
+        self._concurrently((self._get_vdom, ('osvdm1',)),
+                           (write_then_get, ()))
+        self.assertEqual(['GET', 'DELETE', 'GET'],
+                         [r.method for r in FakeRequest.created])
+
+    def test_coalescing_disabled(self):
+        self.client._coalesce_gets = False
+        self._concurrently(*[(self._get_vdom, ('osvdm1',))] * 2)
+        self.assertEqual(2, len(FakeRequest.created))
@@ -0,0 +1,113 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import socket
+import time
+
+import mock
+import six.moves.http_client as httplib
+import unittest2
+
+from fortiosclient import client
+from fortiosclient.common import deadline as deadlines
+from fortiosclient.common import retry
+from fortiosclient import eventlet_client
+from fortiosclient import eventlet_request as request
+from fortiosclient import exception
+
+
+class DeadlineTestCase(unittest2.TestCase):
+
+    @mock.patch('time.time', return_value=100.0)
+    def test_deadline(self, now):
+        deadline = deadlines.Deadline.after(2)
+        self.assertIs(deadline, deadlines.Deadline.after(deadline))
+        self.assertIsNone(deadlines.Deadline.after(None))
+        now.return_value = 101.5
+        self.assertEqual(0.5, deadline.remaining())
+        self.assertEqual(0.5, deadlines.bounded(deadline, 300))
+        self.assertEqual(0.25, deadlines.bounded(deadline, 0.25))
+        self.assertEqual(300, deadlines.bounded(None, 300))
+        self.assertFalse(deadline.expired())
+        now.return_value = 103
+        self.assertTrue(deadline.expired())
+        self.assertEqual(0, deadline.remaining())
+
+
+class RequestDeadlineTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(RequestDeadlineTestCase, self).setUp()
+        self.client = eventlet_client.EventletApiClient(
+            [("127.0.0.1", 80, False)], "admin", "admin")
+
+    def test_socket_timeout_bounded(self):
+        conn = mock.Mock(spec=httplib.HTTPConnection, host='127.0.0.1',
+                         port=80, sock=None, timeout=35)
+        conn.getresponse.return_value = mock.Mock(
+            spec=httplib.HTTPResponse, status=200, headers=[])
+        req = request.EventletApiRequest(
+            self.client, "/abc", client_conn=conn, http_timeout=300,
+            deadline=deadlines.Deadline(2))
+
+        def connect():
+            self.assertTrue(0 < conn.timeout <= 2)
+            conn.sock = mock.Mock()
+        conn.connect.side_effect = connect
+        req._issue_request()
+        self.assertTrue(conn.connect.called)
+        # the connect timeout of the connection is restored
+        self.assertEqual(35, conn.timeout)
+        timeout = conn.sock.settimeout.call_args[0][0]
+        self.assertTrue(0 < timeout <= 2)
+
+    def test_acquire_connection_deadline(self):
+        conn = self.client.acquire_connection(auto_login=False)
+        start = time.time()
+        self.assertIsNone(self.client.acquire_connection(
+            auto_login=False, deadline=deadlines.Deadline(0.1)))
+        self.assertLess(time.time() - start, 1)
+        self.client.release_connection(conn)
+
+    def test_retries_stop_at_deadline(self):
+        req = request.EventletApiRequest(
+            self.client, "/abc", retries=5, deadline=deadlines.Deadline(1))
+        self.client._retry_policy = retry.RetryPolicy(base=60, cap=60)
+        response = mock.Mock(spec=httplib.HTTPResponse, status=503)
+        response.getheader.return_value = '5'
+        req._issue_request = mock.Mock(return_value=response)
+        self.assertIs(response, req._handle_request())
+        self.assertEqual(1, req._issue_request.call_count)
+
+
+class SingleThreadDeadlineTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(SingleThreadDeadlineTestCase, self).setUp()
+        # a FortiGate accepting the connections and never answering
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(5)
+        self.addCleanup(self.server.close)
+        port = self.server.getsockname()[1]
+        self.client = client.FortiosApiClient(
+            [("127.0.0.1", port, False)], "admin", "", token='0' * 30,
+            singlethread=True)
+
+    def test_request_deadline(self):
+        start = time.time()
+        with self.assertRaises(exception.RequestTimeout):
+            self.client.request('GET_VDOM', name='osvdm1', deadline=0.5)
+        self.assertLess(time.time() - start, 2)
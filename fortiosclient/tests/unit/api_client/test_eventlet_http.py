@@ -0,0 +1,88 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+from eventlet.green import ssl as green_ssl
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+import six.moves.http_client as httplib
+import unittest2
+
+from fortiosclient import client
+from fortiosclient import eventlet_http
+
+LATENCY = 0.2
+
+
+class SlowServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class SlowHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        body = b'{"status": "success", "results": []}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class GreenConnectionTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(GreenConnectionTestCase, self).setUp()
+        self.server = SlowServer(('127.0.0.1', 0), SlowHandler)
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  kwargs={'poll_interval': 0.01})
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.provider = ('127.0.0.1', self.server.server_address[1], False)
+
+    def test_connections(self):
+        conn = eventlet_http.create_connection('127.0.0.1', 443, True, 10)
+        self.assertIsInstance(conn, httplib.HTTPSConnection)
+        self.assertIsInstance(conn._context, green_ssl.GreenSSLContext)
+        api_client = client.FortiosApiClient([self.provider], 'admin', '',
+                                             token='0' * 30)
+        conn = api_client.acquire_connection()
+        self.assertIsInstance(conn, eventlet_http.HTTPConnection)
+        api_client.release_connection(conn)
+        api_client = client.FortiosApiClient([self.provider], 'admin', '',
+                                             token='0' * 30,
+                                             singlethread=True)
+        conn = api_client.acquire_connection()
+        self.assertNotIsInstance(conn, eventlet_http.HTTPConnection)
+
+    def test_concurrent_requests_overlap(self):
+        api_client = client.FortiosApiClient(
+            [self.provider], 'admin', '', token='0' * 30,
+            concurrent_connections=4)
+        requests = [('GET_VDOM', {'name': 'osvdm%d' % i}) for i in range(4)]
+        start = time.time()
+        results = api_client.request_many(requests)
+        elapsed = time.time() - start
+        self.assertTrue(all(r.ok for r in results))
+        self.assertLess(elapsed, 2 * LATENCY)
@@ -0,0 +1,86 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import unittest2
+
+from fortiosclient import client
+from fortiosclient import eventlet_request as request
+from fortiosclient.filters import F
+
+E_R_CLS = request.GenericRequestEventlet.__name__
+
+POLICIES = [
+    {'policyid': 1, 'name': 'os_pol_1', 'srcintf': [{'name': 'port1'}]},
+    {'policyid': 2, 'name': 'tenant_os_pol_2',
+     'srcintf': [{'name': 'port2'}, {'name': 'port1'}]},
+    {'policyid': 10, 'name': 'other', 'srcintf': [{'name': 'port3'}]},
+]
+
+
+class FiltersTestCase(unittest2.TestCase):
+
+    def test_params(self):
+        self.assertEqual(['subnet==10.0.0.0 255.255.255.0'],
+                         (F('subnet') == '10.0.0.0 255.255.255.0').params())
+        self.assertEqual(['name=@os_', 'policyid>=2'],
+                         (F('name').contains('os_') &
+                          (F('policyid') >= 2)).params())
+        self.assertEqual(['name==a,name==b,policyid<3'],
+                         (F('name').in_(['a', 'b']) |
+                          (F('policyid') < 3)).params())
+        self.assertEqual(['name==a,name==b', 'name==a,policyid!=1'],
+                         ((F('name') == 'a') |
+                          ((F('name') == 'b') & (F('policyid') != 1)))
+                         .params())
+
+    def test_params_escaped(self):
+        self.assertEqual(['comments==a\\,b,comments==c\\\\d'],
+                         F('comments').in_(['a,b', 'c\\d']).params())
+
+    def test_match(self):
+        def names(expression):
+            return [p['policyid'] for p in POLICIES if expression.match(p)]
+        self.assertEqual([1, 2], names(F('srcintf') == 'port1'))
+        self.assertEqual([1, 2], names(F('name').contains('OS_')))
+        self.assertEqual([1], names(F('name').startswith('os_')))
+        self.assertEqual([2, 10], names(F('policyid') > 1))
+        self.assertEqual([10], names(F('srcintf') != 'port1'))
+        self.assertTrue((F('name') == 'a').exact)
+        self.assertFalse(((F('name') == 'a') |
+                          F('name').startswith('b')).exact)
+
+    def test_request_filter(self):
+        api_client = client.FortiosApiClient([("foobar", 443, True)],
+                                             "admin", "")
+        with mock.patch(__name__ + '.request.' + E_R_CLS) as MockClass:
+            instance = MockClass.return_value
+            instance.join.return_value.status = 200
+            instance.join.return_value.body = client.jsonutils.dumps(
+                {'results': POLICIES[:2]})
+            response = api_client.request(
+                'GET_FIREWALL_POLICY', vdom='osvdm1', fields=['policyid'],
+                filter=F('name').startswith('os_'))
+            self.assertEqual('/api/v2/cmdb/firewall/policy/?vdom=osvdm1'
+                             '&format=policyid%7Cname&filter=name%3D%40os_',
+                             MockClass.call_args[0][2])
+            self.assertEqual([POLICIES[0]], response['results'])
+
+            response = api_client.cmdb('firewall/policy', vdom='osvdm1',
+                                       filter='srcintf==port1')
+            self.assertEqual('/api/v2/cmdb/firewall/policy?vdom=osvdm1'
+                             '&filter=srcintf%3D%3Dport1',
+                             MockClass.call_args[0][2])
+            self.assertEqual(2, len(response['results']))
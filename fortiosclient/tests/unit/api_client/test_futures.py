@@ -0,0 +1,93 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+import unittest2
+
+from fortiosclient import client
+from fortiosclient import eventlet_request as request
+from fortiosclient import exception
+
+
+class RequestFutureTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(RequestFutureTestCase, self).setUp()
+        self.client = client.FortiosApiClient(
+            [("127.0.0.1", 80, False)], "admin", "")
+        self.delay = 0
+        self.status = 200
+        patcher = mock.patch.object(request.GenericRequestEventlet,
+                                    '_handle_request',
+                                    side_effect=self._handle_request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _handle_request(self):
+        eventlet.sleep(self.delay)
+        response = mock.Mock()
+        response.status = self.status
+        response.body = '{"results": [{"name": "osvdm1"}]}'
+        return response
+
+    def test_result(self):
+        done = []
+        future = self.client.request_async('GET_VDOM', name='osvdm1')
+        future.add_done_callback(done.append)
+        self.assertFalse(future.done())
+        self.assertEqual({'results': [{'name': 'osvdm1'}]}, future.result())
+        self.assertTrue(future.done())
+        self.assertEqual([future], done)
+        self.assertFalse(future.cancel())
+        # the callbacks of a complete future are called right away
+        future.add_done_callback(done.append)
+        self.assertEqual([future, future], done)
+
+    def test_exception(self):
+        self.status = 404
+        future = self.client.request_async('GET_VDOM', name='osvdm1')
+        self.assertIsInstance(future.exception(), exception.ResourceNotFound)
+        with self.assertRaises(exception.ResourceNotFound):
+            future.result()
+
+    def test_result_timeout(self):
+        self.delay = 0.2
+        future = self.client.request_async('GET_VDOM', name='osvdm1')
+        with self.assertRaises(exception.RequestTimeout):
+            future.result(timeout=0.01)
+        self.assertFalse(future.done())
+        self.assertEqual({'results': [{'name': 'osvdm1'}]},
+                         future.result(timeout=5))
+
+    def test_cancel(self):
+        self.delay = 10
+        done = []
+        future = self.client.request_async('GET_VDOM', name='osvdm1')
+        future.add_done_callback(done.append)
+        eventlet.sleep(0)
+        self.assertTrue(future.cancel())
+        self.assertTrue(future.done())
+        self.assertTrue(future.cancelled())
+        self.assertEqual([future], done)
+        with self.assertRaises(exception.RequestCancelled):
+            future.result()
+
+    def test_singlethread(self):
+        api_client = client.FortiosApiClient(
+            [("127.0.0.1", 80, False)], "admin", "", singlethread=True)
+        future = api_client.request_async('GET_VDOM', name='osvdm1')
+        self.assertTrue(future.done())
+        self.assertEqual({'results': [{'name': 'osvdm1'}]}, future.result())
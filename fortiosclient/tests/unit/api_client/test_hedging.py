@@ -0,0 +1,102 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import unittest2
+
+from fortiosclient import client
+from fortiosclient.tests.unit.api_client import fakes
+
+SLOW = ("10.0.0.1", 443, True)
+FAST = ("10.0.0.2", 443, True)
+
+
+class FakeRequest(fakes.FakeRequest):
+    """A request answered after the latency of its API provider."""
+
+    def answer(self):
+        return fakes.response('{"host": "%s"}' % self.provider[0])
+
+
+class HedgingTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(HedgingTestCase, self).setUp()
+        FakeRequest.patch(self)
+        FakeRequest.latencies = {SLOW: 1, FAST: 0.01}
+        self.client = client.FortiosApiClient(
+            [SLOW, FAST], "admin", "", hedge_requests=True,
+            hedge_delay=0.05)
+
+    def test_hedged_get(self):
+        start = time.time()
+        self.assertEqual({'host': FAST[0]},
+                         self.client.request('GET_VDOM', name='osvdm1'))
+        self.assertLess(time.time() - start, 0.5)
+        first, second = FakeRequest.created
+        self.assertEqual(SLOW, second.exclude_provider)
+        # the slow request is not killed, it completes
+        self.assertFalse(first.killed)
+        self.assertEqual({'host': SLOW[0]},
+                         self.client._response('GET', first.url,
+                                               first.join()))
+
+    def test_answered_before_the_delay(self):
+        FakeRequest.latencies[SLOW] = 0.01
+        self.assertEqual({'host': SLOW[0]},
+                         self.client.request('GET_VDOM', name='osvdm1'))
+        self.assertEqual(1, len(FakeRequest.created))
+
+    def test_not_get_not_hedged(self):
+        FakeRequest.latencies[SLOW] = 0.1
+        self.client.request('DELETE_VDOM', name='osvdm1')
+        self.assertEqual(1, len(FakeRequest.created))
+
+    def test_not_hedged_without_delay(self):
+        FakeRequest.latencies[SLOW] = 0.1
+        api_client = client.FortiosApiClient(
+            [SLOW, FAST], "admin", "", hedge_requests=True)
+        self.assertEqual({'host': SLOW[0]},
+                         api_client.request('GET_VDOM', name='osvdm1',
+                                            deadline=0.04))
+        self.assertEqual(1, len(FakeRequest.created))
+        self.assertEqual(1, len(api_client._get_latency))
+
+    def test_not_hedged_at_deadline(self):
+        FakeRequest.latencies[SLOW] = 0.1
+        self.client.request('GET_VDOM', name='osvdm1', deadline=0.04)
+        self.assertEqual(1, len(FakeRequest.created))
+
+    def test_hedge_delay_from_latency(self):
+        api_client = client.FortiosApiClient(
+            [SLOW, FAST], "admin", "", hedge_requests=True)
+        self.assertIsNone(api_client.hedge_delay())
+        for i in range(client.HEDGE_MIN_SAMPLES):
+            api_client._get_latency.add(0.01 * (i + 1))
+        self.assertEqual(0.19, api_client.hedge_delay())
+
+
+class ExcludeProviderTestCase(unittest2.TestCase):
+
+    def test_acquire_connection_exclude(self):
+        api_client = client.FortiosApiClient(
+            [SLOW, FAST], "admin", "", token='0' * 30)
+        conn = api_client.acquire_connection(exclude=SLOW)
+        self.assertEqual(FAST, api_client._conn_params(conn))
+        # the only connection left is to the excluded provider
+        self.assertIsNone(api_client.acquire_connection(exclude=SLOW))
+        self.assertEqual(1, api_client._conn_pool.qsize())
+        api_client.release_connection(conn)
@@ -0,0 +1,172 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+import six.moves.http_client as httplib
+import unittest2
+
+from fortiosclient import client
+from fortiosclient.common import limits
+from fortiosclient import eventlet_client
+from fortiosclient import eventlet_request as request
+from fortiosclient import exception
+
+
+class ConcurrencyLimitTestCase(unittest2.TestCase):
+
+    def test_acquire_waits_for_release(self):
+        limit = limits.ConcurrencyLimit(1)
+        limit.acquire()
+        waiter = eventlet.spawn(limit.acquire)
+        eventlet.sleep(0)
+        self.assertFalse(waiter.dead)
+        limit.release()
+        waiter.wait()
+        self.assertEqual(1, limit.in_flight)
+
+    def test_killed_waiter_leaves_the_queue(self):
+        limit = limits.ConcurrencyLimit(1)
+        limit.acquire()
+        waiter = eventlet.spawn(limit.acquire)
+        eventlet.sleep(0)
+        waiter.kill()
+        limit.release()
+        self.assertEqual(0, limit.in_flight)
+
+
+class AdaptiveConcurrencyLimitTestCase(unittest2.TestCase):
+
+    def _requests(self, limit, count, latency, status=200, kind=None):
+        for _ in range(count):
+            limit.acquire()
+        for _ in range(count):
+            limit.release(latency, status, kind)
+
+    def test_increase_while_latency_is_flat(self):
+        limit = limits.AdaptiveConcurrencyLimit(4, max_limit=6)
+        for _ in range(20):
+            self._requests(limit, limit.limit, 0.01)
+        self.assertEqual(6, limit.limit)
+
+    def test_no_increase_when_not_used(self):
+        limit = limits.AdaptiveConcurrencyLimit(4)
+        for _ in range(20):
+            self._requests(limit, 1, 0.01)
+        self.assertEqual(4, limit.limit)
+
+    def test_decrease_on_503(self):
+        limit = limits.AdaptiveConcurrencyLimit(8)
+        self._requests(limit, 4, 0.01, 503)
+        # the requests in progress when the limit was lowered don't count
+        self.assertEqual(4, limit.limit)
+
+    @mock.patch('time.time')
+    def test_decrease_on_latency_spike(self, now):
+        now.return_value = 100.0
+        limit = limits.AdaptiveConcurrencyLimit(8, min_limit=3)
+        self._requests(limit, 1, 0.01)
+        self._requests(limit, 1, 0.05)
+        self.assertEqual(4, limit.limit)
+        now.return_value = 101.0
+        self._requests(limit, 1, 0.05)
+        self.assertEqual(3, limit.limit)
+        self.assertEqual(0.01, limit.idle_latency())
+
+    @mock.patch('time.time', return_value=100.0)
+    def test_latency_compared_by_kind(self, now):
+        limit = limits.AdaptiveConcurrencyLimit(8)
+        self._requests(limit, 1, 0.01, kind='GET')
+        self._requests(limit, 1, 0.5, kind='PUT')
+        self._requests(limit, 1, 0.6, kind='PUT')
+        self.assertEqual(8, limit.limit)
+        self.assertEqual(0.01, limit.idle_latency('GET'))
+        self.assertEqual(0.5, limit.idle_latency('PUT'))
+        self._requests(limit, 1, 1.5, kind='PUT')
+        self.assertEqual(4, limit.limit)
+
+    def test_decrease_on_failure(self):
+        limit = limits.AdaptiveConcurrencyLimit(8)
+        limit.acquire()
+        limit.release()
+        self.assertEqual(4, limit.limit)
+
+
+class ClientConcurrencyLimitsTestCase(unittest2.TestCase):
+
+    def test_adaptive_concurrency(self):
+        api_client = client.FortiosApiClient(
+            [("127.0.0.1", 80, False)], "admin", "",
+            concurrent_connections=4, adaptive_concurrency=True)
+        self.assertEqual({}, api_client.concurrency_limits())
+        limit = api_client.provider_limit(("127.0.0.1", 80, False))
+        self.assertIsInstance(limit, limits.AdaptiveConcurrencyLimit)
+        self.assertEqual({("127.0.0.1", 80, False): 4},
+                         api_client.concurrency_limits())
+
+    def test_no_limit(self):
+        api_client = client.FortiosApiClient(
+            [("127.0.0.1", 80, False)], "admin", "")
+        self.assertIsNone(
+            api_client.provider_limit(("127.0.0.1", 80, False)))
+
+
+class RequestConcurrencyLimitTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(RequestConcurrencyLimitTestCase, self).setUp()
+        self.client = eventlet_client.EventletApiClient(
+            [("127.0.0.1", 80, False)], "admin", "admin",
+            concurrent_connections=2, provider_concurrency=1)
+        self.client._wait_for_login = mock.Mock()
+        self.limit = self.client.provider_limit(("127.0.0.1", 80, False))
+
+    def test_waiting_request_holds_no_connection(self):
+        req = request.EventletApiRequest(self.client, "/abc")
+        self.limit.acquire()
+        waiter = eventlet.spawn(req._acquire)
+        eventlet.sleep(0)
+        self.assertFalse(waiter.dead)
+        self.assertEqual(2, self.client._conn_pool.qsize())
+        self.limit.release()
+        conn, limit = waiter.wait()
+        self.assertIs(self.limit, limit)
+        self.assertEqual(1, limit.in_flight)
+        self.assertEqual(1, self.client._conn_pool.qsize())
+
+    def test_deadline_keeps_the_connection_good(self):
+        conn = mock.Mock(spec=httplib.HTTPConnection, host='127.0.0.1',
+                         port=80, sock=None)
+        req = request.EventletApiRequest(self.client, "/abc")
+        self.limit.acquire()
+        req._acquire = mock.Mock(return_value=(conn, self.limit))
+        req._timeout = mock.Mock(side_effect=exception.RequestTimeout)
+        self.client.release_connection = mock.Mock()
+        with self.assertRaises(exception.RequestTimeout):
+            req._issue_request()
+        self.client.release_connection.assert_called_once_with(
+            conn, False, False, rid=req._rid())
+        self.assertEqual(0, self.limit.in_flight)
+
+    def test_kind(self):
+        req = request.EventletApiRequest(
+            self.client, "/api/v2/cmdb/firewall/address/osvdm1?vdom=root",
+            method="PUT")
+        self.assertEqual(('PUT', '/api/v2/cmdb/firewall/address', True),
+                         req._kind())
+        req = request.EventletApiRequest(
+            self.client, "/api/v2/cmdb/firewall/address/")
+        self.assertEqual(('GET', '/api/v2/cmdb/firewall/address', False),
+                         req._kind())
@@ -0,0 +1,92 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+try:
+    from oslo_serialization import jsonutils
+except Exception:
+    import json as jsonutils
+import unittest2
+
+from fortiosclient import operations
+from fortiosclient import templates
+
+
+class OperationsTestCase(unittest2.TestCase):
+
+    def test_login_logout_path(self):
+        self.assertEqual(jsonutils.loads(templates.LOGIN)['path'],
+                         operations.LOGIN_PATH)
+        self.assertEqual(jsonutils.loads(templates.LOGOUT)['path'],
+                         operations.LOGOUT_PATH)
+
+    def test_relogin_is_not_an_operation(self):
+        self.assertNotIn('RELOGIN', operations.OPERATIONS)
+        with self.assertRaises(AttributeError):
+            operations.get('RELOGIN')
+
+    def test_method_matches_prefix(self):
+        prefixes = {'ADD': 'POST', 'SET': 'PUT', 'PUT': 'PUT',
+                    'MODIFY': 'PUT', 'MOVE': 'PUT', 'DELETE': 'DELETE',
+                    'GET': 'GET'}
+        for name, operation in operations.OPERATIONS.items():
+            prefix = name.split('_')[0]
+            if prefix in prefixes:
+                self.assertEqual(prefixes[prefix], operation.method, name)
+
+    def test_firewall_address(self):
+        add = operations.get('ADD_FIREWALL_ADDRESS')
+        self.assertEqual('/api/v2/cmdb/firewall/address', add.path)
+        self.assertEqual(frozenset(['name', 'subnet']), add.required)
+        self.assertEqual(frozenset(['associated_interface', 'comment',
+                                    'vdom']), add.optional)
+        self.assertEqual(operations.VDOM_QUERY, add.vdom)
+        get = operations.get('GET_FIREWALL_ADDRESS')
+        self.assertEqual(('/api/v2/cmdb/firewall/address/{name}',
+                          '/api/v2/cmdb/firewall/address'), get.paths)
+        self.assertEqual(frozenset(), get.required)
+
+    def test_vdom_handling(self):
+        self.assertIsNone(operations.get('ADD_VDOM').vdom)
+        self.assertEqual(operations.VDOM_BODY,
+                         operations.get('ADD_VLAN_INTERFACE').vdom)
+        self.assertIn('vdom', operations.get('GET_USER_LOCAL').required)
+
+    def test_policy_profiles_are_optional(self):
+        operation = operations.get('ADD_FIREWALL_POLICY')
+        self.assertEqual(frozenset(), operation.required)
+        self.assertIn('av_profile', operation.optional)
+
+    def test_missing_params(self):
+        self.assertEqual(
+            set(['members']),
+            operations.missing_params('SET_FIREWALL_ADDRGRP',
+                                      {'name': 'grp', 'vdom': 'root'}))
+
+    def test_scan(self):
+        names, optional = operations._scan(
+            '{{ a }}{% if b | length > 0 %}{{ c }}{% elif d %}{{ c }}{{ e }}'
+            '{% else %}{{ c }}{% endif %}{% for x in xs %}{{ x.y }}{{ f }}'
+            '{% endfor %}{% set g = {"k": h} %}{{ g.k }}'
+            '{% if i is not defined %}{{ j }}{% else %}{{ i }}{% endif %}')
+        self.assertEqual(set('abcdefhij') | set(['xs']), names)
+        self.assertEqual(set('defhij'), optional)
+
+    def test_params_of_if_branches(self):
+        operation = operations.get('MOVE_FIREWALL_POLICY')
+        self.assertEqual(frozenset(['id']), operation.required)
+        self.assertEqual(frozenset(['before', 'after', 'vdom']),
+                         operation.optional)
+        self.assertEqual(set(), operations.missing_params(
+            'MOVE_FIREWALL_POLICY', {'id': 1, 'before': 2}))
@@ -0,0 +1,122 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import email.utils
+import time
+
+import mock
+import six.moves.http_client as httplib
+import unittest2
+
+from fortiosclient.common import retry
+from fortiosclient import eventlet_client as client
+from fortiosclient import eventlet_request as request
+
+
+def _response(status, headers=None):
+    response = mock.Mock(spec=httplib.HTTPResponse)
+    response.status = status
+    response.getheader.side_effect = (
+        lambda name, default=None: (headers or {}).get(name, default))
+    return response
+
+
+class RetryPolicyTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(RetryPolicyTestCase, self).setUp()
+        self.policy = retry.RetryPolicy(base=1, cap=5)
+
+    @mock.patch('random.uniform', side_effect=lambda low, high: high)
+    def test_exponential_backoff_with_cap(self, uniform):
+        self.assertEqual([1, 2, 4, 5, 5],
+                         [self.policy.delay(n) for n in range(1, 6)])
+        # full jitter, anything from 0
+        self.assertEqual(0, uniform.call_args[0][0])
+
+    def test_reauth_and_final_statuses(self):
+        self.assertEqual(0, self.policy.delay(1, _response(401)))
+        self.assertIsNone(self.policy.delay(1, _response(400)))
+        expired = _response(400)
+        expired.session_expired = True
+        self.assertEqual(0, self.policy.delay(1, expired))
+        self.assertIsNone(self.policy.delay(1, _response(404)))
+
+    def test_retry_after(self):
+        self.assertEqual(3, self.policy.delay(
+            1, _response(503, {'Retry-After': '3'})))
+        # longer than the cap, not retried
+        self.assertIsNone(self.policy.delay(
+            1, _response(503, {'Retry-After': '60'})))
+        date = email.utils.formatdate(time.time() + 2, usegmt=True)
+        delay = self.policy.delay(1, _response(503, {'Retry-After': date}))
+        self.assertTrue(0 < delay <= 2)
+        delay = self.policy.delay(1, _response(503, {'Retry-After': 'x'}))
+        self.assertTrue(0 <= delay <= 1)
+
+
+class RetryBudgetTestCase(unittest2.TestCase):
+
+    @mock.patch('time.time', return_value=100.0)
+    def test_budget(self, now):
+        budget = retry.RetryBudget(ratio=0.5, min_per_second=1, capacity=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        now.return_value = 101.0
+        self.assertTrue(budget.withdraw())
+
+
+class HandleRequestRetryTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(HandleRequestRetryTestCase, self).setUp()
+        self.policy = retry.RetryPolicy(base=0.01, budget_capacity=2,
+                                        budget_ratio=0)
+        self.client = client.EventletApiClient(
+            [("127.0.0.1", 80, False)], "admin", "admin",
+            retry_policy=self.policy)
+        self.req = request.EventletApiRequest(self.client, "/abc",
+                                              retries=5)
+        self.req._issue_request = mock.Mock(
+            return_value=_response(503, {'Retry-After': '0'}))
+
+    @mock.patch('eventlet.greenthread.sleep')
+    def test_retries_limited_by_budget(self, sleep):
+        self.assertEqual(503, self.req._handle_request().status)
+        # the first attempt and the two retries of the budget
+        self.assertEqual(3, self.req._issue_request.call_count)
+        self.assertEqual([0, 0, 0], [c[0][0] for c in sleep.call_args_list])
+
+    @mock.patch('eventlet.greenthread.sleep')
+    def test_reauth_not_limited_by_budget(self, sleep):
+        self.req._issue_request.return_value = _response(401)
+        for _ in range(5):
+            self.assertEqual(401, self.req._handle_request().status)
+        # every request is retried, more than the two retries of the budget
+        self.assertEqual(30, self.req._issue_request.call_count)
+        self.assertEqual(2, self.client.retry_budget.balance)
+
+    @mock.patch('eventlet.greenthread.sleep')
+    def test_backoff_on_errors(self, sleep):
+        self.req._issue_request.return_value = Exception('refused')
+        self.assertIsNone(self.req._handle_request())
+        self.assertEqual(3, self.req._issue_request.call_count)
+        self.assertTrue(all(0 <= c[0][0] <= 0.02
+                            for c in sleep.call_args_list))
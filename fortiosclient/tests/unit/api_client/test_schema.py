@@ -0,0 +1,165 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import shutil
+import tempfile
+
+import mock
+import unittest2
+
+from fortiosclient import client
+from fortiosclient import eventlet_request as request
+from fortiosclient import exception
+from fortiosclient import schema
+
+E_R_CLS = request.GenericRequestEventlet.__name__
+
+ADDRGRP_SCHEMA = {
+    'name': 'addrgrp',
+    'category': 'table',
+    'mkey': 'name',
+    'children': {
+        'name': {'name': 'name', 'type': 'string', 'size': 35},
+        'visibility': {'name': 'visibility', 'type': 'option',
+                       'options': [{'name': 'enable'},
+                                   {'name': 'disable'}]},
+        'allowaccess': {'name': 'allowaccess', 'type': 'option',
+                        'multiple_values': True,
+                        'options': [{'name': 'ping'}, {'name': 'https'},
+                                    {'name': 'ssh'}]},
+        'color': {'name': 'color', 'type': 'integer', 'min-value': 0,
+                  'max-value': 32},
+        'member': {'name': 'member', 'category': 'table',
+                   'children': {'name': {'name': 'name', 'type': 'string',
+                                         'size': 79}}},
+    },
+}
+
+
+class SchemaTestCase(unittest2.TestCase):
+
+    def test_validate(self):
+        schema.validate(ADDRGRP_SCHEMA, {
+            'name': 'grp1', 'visibility': 'enable', 'color': '3',
+            'allowaccess': 'ping  https',
+            'member': [{'name': 'addr1', 'q_origin_key': 'addr1'}]})
+
+    def test_validate_invalid(self):
+        for body, path in (({'nmae': 'grp1'}, 'nmae'),
+                           ({'name': 'g' * 36}, 'name'),
+                           ({'visibility': 'on'}, 'visibility'),
+                           ({'visibility': 'enable disable'},
+                            'visibility'),
+                           ({'allowaccess': 'ping telnet'}, 'allowaccess'),
+                           ({'color': 33}, 'color'),
+                           ({'color': 'red'}, 'color'),
+                           ({'member': {'name': 'a'}}, 'member'),
+                           ({'member': [{'name': 'a'}, {'id': 1}]},
+                            'member[1].id')):
+            with self.assertRaises(exception.InvalidRequest) as e:
+                schema.validate(ADDRGRP_SCHEMA, body)
+            self.assertIn(path, str(e.exception))
+
+    def test_table_of(self):
+        self.assertEqual(('firewall/addrgrp', []),
+                         schema.table_of('/api/v2/cmdb/firewall/addrgrp'))
+        self.assertEqual(('firewall/addrgrp', ['member']),
+                         schema.table_of('/api/v2/cmdb/firewall/addrgrp/'
+                                         'grp1/member/addr1?vdom=root'))
+        self.assertIsNone(schema.table_of('/api/v2/monitor/system/status'))
+
+    def test_firmware_version(self):
+        self.assertEqual('v6.0.2-163', schema.firmware_version(
+            {'version': 'v6.0.2', 'build': 163, 'results': []}))
+        self.assertIsNone(schema.firmware_version({'results': []}))
+
+    def test_cache_on_disk(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        schema.SchemaCache(cache_dir).set('v6.0.2-163', 'firewall/addrgrp',
+                                          ADDRGRP_SCHEMA)
+        cache = schema.SchemaCache(cache_dir)
+        self.assertEqual(ADDRGRP_SCHEMA,
+                         cache.get('v6.0.2-163', 'firewall/addrgrp'))
+        self.assertIsNone(cache.get('v6.2.0-866', 'firewall/addrgrp'))
+
+    def test_adopt_unknown_version(self):
+        cache = schema.SchemaCache()
+        cache.set(None, 'firewall/addrgrp', ADDRGRP_SCHEMA)
+        cache.adopt('v6.0.2-163')
+        self.assertEqual(ADDRGRP_SCHEMA,
+                         cache.get('v6.0.2-163', 'firewall/addrgrp'))
+        self.assertIsNone(cache.get(None, 'firewall/addrgrp'))
+
+
+class ClientValidationTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(ClientValidationTestCase, self).setUp()
+        self.client = client.FortiosApiClient(
+            [("foobar", 443, True)], "admin", "", validate_requests=True)
+
+    def _response(self, body):
+        response = mock.Mock()
+        response.status = 200
+        response.body = body
+        return response
+
+    def test_invalid_request_not_issued(self):
+        with mock.patch(__name__ + '.request.' + E_R_CLS) as MockClass:
+            MockClass.return_value.join.return_value = self._response(
+                '{"results": %s, "version": "v6.0.2", "build": 163}' %
+                schema.jsonutils.dumps(ADDRGRP_SCHEMA))
+            with self.assertRaises(exception.InvalidRequest):
+                self.client.request('ADD_FIREWALL_ADDRGRP', vdom='root',
+                                    name='grp1', members=['a' * 80])
+            # only the schema was fetched
+            self.assertEqual(1, MockClass.call_count)
+            self.assertEqual('/api/v2/cmdb/firewall/addrgrp?action=schema',
+                             MockClass.call_args[0][2])
+
+            self.client.request('ADD_FIREWALL_ADDRGRP', vdom='root',
+                                name='grp1', members=['addr1'])
+            self.assertEqual(2, MockClass.call_count)
+            self.assertEqual('POST', MockClass.call_args[0][1])
+            self.assertEqual('v6.0.2-163', self.client._version)
+
+    def test_schema_unavailable(self):
+        with mock.patch(__name__ + '.request.' + E_R_CLS) as MockClass:
+            MockClass.return_value.join.return_value.status = 403
+            MockClass.return_value.join.return_value.body = '{}'
+            with self.assertRaises(exception.Forbidden):
+                self.client.cmdb('firewall/addrgrp', 'POST',
+                                 body={'nmae': 'grp1'})
+            self.assertEqual(2, MockClass.call_count)
+
+    def test_schema_of_unknown_version_reused(self):
+        with mock.patch(__name__ + '.request.' + E_R_CLS) as MockClass:
+            join = MockClass.return_value.join
+            join.return_value = self._response(
+                '{"results": %s}' % schema.jsonutils.dumps(ADDRGRP_SCHEMA))
+            self.client.request('ADD_FIREWALL_ADDRGRP', vdom='root',
+                                name='grp1', members=['addr1'])
+            self.assertEqual(2, MockClass.call_count)
+            join.return_value = self._response(
+                '{"results": [], "version": "v6.0.2", "build": 163}')
+            self.client.request('ADD_FIREWALL_ADDRGRP', vdom='root',
+                                name='grp2', members=['addr1'])
+            # the schema was not fetched again
+            self.assertEqual(3, MockClass.call_count)
+            self.client.request('ADD_FIREWALL_ADDRGRP', vdom='root',
+                                name='grp3', members=['addr1'])
+            self.assertEqual(4, MockClass.call_count)
+            self.assertEqual('POST', MockClass.call_args[0][1])
@@ -0,0 +1,374 @@
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import json
+import os
+import shutil
+import tempfile
+
+import mock
+import unittest2
+
+from fortiosclient import client
+from fortiosclient.common import cache
+from fortiosclient import exception
+from fortiosclient import shadow
+from fortiosclient import snapshot
+from fortiosclient.tests.unit.api_client import fakes
+
+ADDRESSES = [
+    {'name': 'addr1', 'subnet': '10.0.0.0 255.255.255.0'},
+    {'name': 'addr2', 'subnet': '10.0.1.0 255.255.255.0'},
+    {'name': 'addr3', 'subnet': '10.0.0.0 255.255.255.0'},
+]
+GROUPS = [
+    {'name': 'grp1', 'member': [{'name': 'addr1'}, {'name': 'addr2'}]},
+]
+INTERFACES = [
+    {'name': 'os_vid_100', 'vdom': 'osvdm1', 'vlanid': 100},
+]
+
+
+class FakeClient(object):
+    """The tables of a FortiGate, by (table, vdom)."""
+
+    def __init__(self):
+        self.tables = {('firewall/address', 'osvdm1'): ADDRESSES,
+                       ('firewall/addrgrp', 'osvdm1'): GROUPS,
+                       ('system/interface', None): INTERFACES}
+        self.checksums = {'global': 'g1', 'osvdm1': 'v1', 'all': 'a1'}
+        self.listeners = []
+        self.loaded = []
+
+    def add_write_listener(self, listener):
+        self.listeners.append(listener)
+
+    def config_checksums(self, deadline=None):
+        return dict(self.checksums)
+
+    def cmdb(self, path, mkey=None, vdom=None, skip_meta=False, cache=True):
+        self.loaded.append((path, mkey, vdom))
+        entries = copy.deepcopy(self.tables[(path, vdom)])
+        if mkey is not None:
+            entries = [e for e in entries if e['name'] == mkey]
+            if not entries:
+                raise exception.ResourceNotFound()
+        return {'results': entries}
+
+    def write(self, method, url, body=None, response=None):
+        for listener in self.listeners:
+            listener(method, url, body, response or {})
+
+
+class FortiGateRequest(fakes.FakeRequest):
+    """A request to the tables of a FortiGate, by (table, vdom)."""
+
+    tables = {}
+    checksums = {}
+
+    def answer(self):
+        if self.url.split('?')[0].endswith('/ha-checksums'):
+            results = [{'is_root_master': 1, 'checksum': self.checksums}]
+        else:
+            table, vdom, mkey, children, query = shadow.parse_url(self.url)
+            results = [e for e in self.tables[(table, vdom)]
+                       if mkey is None or e['name'] == mkey]
+        return fakes.response(json.dumps({'results': results}))
+
+
+class TableShadowTestCase(unittest2.TestCase):
+
+    def test_indexes(self):
+        table = shadow.TableShadow(shadow.TABLES['firewall/addrgrp'])
+        table.load(copy.deepcopy(GROUPS))
+        self.assertEqual(['grp1'],
+                         [e['name'] for e in table.lookup('member',
+                                                          'addr2')])
+        table.put({'name': 'grp1', 'member': [{'name': 'addr3'}]})
+        self.assertEqual([], table.lookup('member', 'addr2'))
+        self.assertEqual(1, len(table.lookup('member', 'addr3')))
+        table.remove('grp1')
+        self.assertEqual({}, table.indexes['member'])
+
+    def test_not_indexed(self):
+        table = shadow.TableShadow(shadow.TABLES['firewall/address'])
+        self.assertRaises(ValueError, table.lookup, 'comment', 'x')
+
+    def test_integer_key(self):
+        table = shadow.TableShadow(shadow.TABLES['firewall/policy'])
+        table.put({'policyid': 3, 'srcintf': [{'name': 'port1'}]})
+        self.assertEqual(3, table.get('3')['policyid'])
+        self.assertEqual(3, table.get(3)['policyid'])
+
+    def test_parse_url(self):
+        self.assertEqual(
+            ('firewall/addrgrp', 'root', 'grp 1', ['member'], {}),
+            shadow.parse_url('/api/v2/cmdb/firewall/addrgrp/grp%201/member'
+                             '?vdom=root'))
+        self.assertIsNone(shadow.parse_url('/api/v2/monitor/system/status'))
+
+
+class ShadowStoreTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(ShadowStoreTestCase, self).setUp()
+        self.client = FakeClient()
+        self.store = shadow.ShadowStore(
+            self.client, ['firewall/address', 'firewall/addrgrp',
+                          'system/interface'])
+
+    def _names(self, entries):
+        return [e['name'] for e in entries]
+
+    def test_loaded_once(self):
+        for i in range(3):
+            self.assertEqual(
+                ['addr1', 'addr3'],
+                self._names(self.store.lookup('firewall/address', 'subnet',
+                                              '10.0.0.0 255.255.255.0',
+                                              vdom='osvdm1')))
+        self.assertEqual('addr2', self.store.get('firewall/address',
+                                                 'addr2', 'osvdm1')['name'])
+        self.assertEqual([('firewall/address', None, 'osvdm1')],
+                         self.client.loaded)
+
+    def test_global_table(self):
+        for vdom in ('root', 'osvdm1'):
+            self.assertEqual(['os_vid_100'], self._names(self.store.lookup(
+                'system/interface', 'vdom', 'osvdm1', vdom=vdom)))
+        self.assertEqual([('system/interface', None, None)],
+                         self.client.loaded)
+
+    def test_not_shadowed(self):
+        self.assertRaises(ValueError, self.store.get, 'firewall/vip', 'vip1')
+
+    def test_writes(self):
+        self.store.table('firewall/address', 'osvdm1')
+        url = '/api/v2/cmdb/firewall/address'
+        self.client.write('POST', url + '?vdom=osvdm1',
+                          {'json': {'name': 'addr4',
+                                    'subnet': '10.0.2.0 255.255.255.0'}})
+        self.client.write('PUT', url + '/addr1?vdom=osvdm1',
+                          {'json': {'subnet': '10.0.2.0 255.255.255.0'}})
+        self.client.write('DELETE', url + '/addr2?vdom=osvdm1')
+        # another vdom
+        self.client.write('DELETE', url + '/addr3?vdom=root')
+        self.assertEqual(
+            ['addr1', 'addr4'],
+            self._names(self.store.lookup('firewall/address', 'subnet',
+                                          '10.0.2.0 255.255.255.0',
+                                          'osvdm1')))
+        self.assertIsNone(self.store.get('firewall/address', 'addr2',
+                                         'osvdm1'))
+        self.assertIsNotNone(self.store.get('firewall/address', 'addr3',
+                                            'osvdm1'))
+        self.assertEqual(1, len(self.client.loaded))
+
+    def test_child_write_loads_entry(self):
+        self.store.table('firewall/addrgrp', 'osvdm1')
+        self.client.tables[('firewall/addrgrp', 'osvdm1')] = [
+            {'name': 'grp1', 'member': [{'name': 'addr3'}]}]
+        self.client.write('POST', '/api/v2/cmdb/firewall/addrgrp/grp1/'
+                                  'member?vdom=osvdm1',
+                          {'json': {'name': 'addr3'}})
+        self.assertEqual(['grp1'], self._names(self.store.lookup(
+            'firewall/addrgrp', 'member', 'addr3', 'osvdm1')))
+        self.assertEqual([], self.store.lookup(
+            'firewall/addrgrp', 'member', 'addr1', 'osvdm1'))
+        self.assertEqual(('firewall/addrgrp', 'grp1', 'osvdm1'),
+                         self.client.loaded[-1])
+
+    def test_refresh(self):
+        self.store.table('firewall/address', 'osvdm1')
+        self.store.table('system/interface')
+        self.assertEqual([], self.store.refresh())
+        self.client.checksums['osvdm1'] = 'v2'
+        self.assertEqual([('firewall/address', 'osvdm1')],
+                         self.store.refresh())
+        self.client.checksums['global'] = 'g2'
+        self.assertEqual([('system/interface', None)], self.store.refresh())
+        self.client.checksums = {}
+        self.assertEqual(2, len(self.store.refresh()))
+
+    def test_write_while_loading(self):
+        load = self.client.cmdb
+
+        def cmdb(*args, **kwargs):
+            response = load(*args, **kwargs)
+            if len(self.client.loaded) == 1:
+                self.client.write('DELETE', '/api/v2/cmdb/firewall/address/'
+                                            'addr1?vdom=osvdm1')
+                self.client.tables[('firewall/address', 'osvdm1')] = (
+                    ADDRESSES[1:])
+            return response
+        with mock.patch.object(self.client, 'cmdb', side_effect=cmdb):
+            self.assertIsNone(self.store.get('firewall/address', 'addr1',
+                                             'osvdm1'))
+        self.assertEqual([('firewall/address', None, 'osvdm1'),
+                          ('firewall/address', 'addr1', 'osvdm1')],
+                         self.client.loaded)
+
+    def test_writes_while_loading_loaded_once(self):
+        load = self.client.cmdb
+        url = '/api/v2/cmdb/firewall/address'
+
+        def cmdb(path, mkey=None, vdom=None, skip_meta=False, cache=True):
+            response = load(path, mkey, vdom, skip_meta, cache)
+            if mkey is None:
+                # another write during every load of the table
+                self.client.write('PUT', url + '/addr2?vdom=osvdm1',
+                                  {'json': {'comment': 'changed'}})
+                self.client.write('POST', url + '?vdom=osvdm1',
+                                  {'json': {'name': 'addr4'}},
+                                  {'mkey': 'addr4'})
+                self.client.tables[('firewall/address', 'osvdm1')] = (
+                    ADDRESSES + [{'name': 'addr4'}])
+            return response
+        with mock.patch.object(self.client, 'cmdb', side_effect=cmdb):
+            self.assertIsNotNone(self.store.get('firewall/address', 'addr4',
+                                                'osvdm1'))
+        self.assertEqual(
+            [('firewall/address', None, 'osvdm1'),
+             ('firewall/address', 'addr2', 'osvdm1'),
+             ('firewall/address', 'addr4', 'osvdm1')],
+            sorted(self.client.loaded, key=lambda loaded: loaded[1] or ''))
+
+
+class WarmStartTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(WarmStartTestCase, self).setUp()
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'fgt1.sqlite')
+        self.client = FakeClient()
+
+    def _store(self):
+        return shadow.ShadowStore(
+            self.client, ['firewall/address', 'firewall/addrgrp',
+                          'system/interface'], snapshot_file=self.path)
+
+    def _first_start(self):
+        store = self._store()
+        store.table('firewall/address', 'osvdm1')
+        store.table('firewall/addrgrp', 'osvdm1')
+        store.table('system/interface')
+        self.client.loaded = []
+
+    def test_unchanged(self):
+        self._first_start()
+        store = self._store()
+        with mock.patch.object(self.client, 'config_checksums',
+                               wraps=self.client.config_checksums) as check:
+            self.assertEqual([], store.warm_start())
+            self.assertEqual(1, check.call_count)
+        self.assertEqual(['addr1', 'addr3'], [e['name'] for e in store.lookup(
+            'firewall/address', 'subnet', '10.0.0.0 255.255.255.0',
+            'osvdm1')])
+        self.assertEqual(1, len(store.lookup('system/interface', 'vlanid',
+                                             100)))
+        self.assertEqual([], self.client.loaded)
+
+    def test_changed(self):
+        self._first_start()
+        self.client.checksums['osvdm1'] = 'v2'
+        self.client.tables[('firewall/address', 'osvdm1')] = ADDRESSES[:1]
+        store = self._store()
+        self.assertEqual(
+            [('firewall/address', 'osvdm1'), ('firewall/addrgrp', 'osvdm1')],
+            sorted(store.warm_start()))
+        self.assertIsNone(store.get('firewall/address', 'addr3', 'osvdm1'))
+        self.assertEqual(2, len(self.client.loaded))
+        # saved again with the new checksum
+        self.client.loaded = []
+        self.assertEqual([], self._store().warm_start())
+
+    def test_unreadable_file(self):
+        with open(self.path, 'w') as f:
+            f.write('not a database' * 100)
+        store = self._store()
+        self.assertEqual([], store.warm_start())
+        self.assertIsNotNone(store.get('firewall/address', 'addr1',
+                                       'osvdm1'))
+
+    def test_no_checksum_not_saved(self):
+        self.client.checksums = {}
+        self._store().table('firewall/address', 'osvdm1')
+        self.assertEqual({}, snapshot.SnapshotFile(self.path).load())
+
+
+class CachedResponsesTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(CachedResponsesTestCase, self).setUp()
+        FortiGateRequest.patch(self)
+        FortiGateRequest.tables = {('firewall/address', 'root'): ADDRESSES}
+        FortiGateRequest.checksums = {'global': 'g1', 'root': 'r1',
+                                      'all': 'a1'}
+        self.client = client.FortiosApiClient(
+            [("127.0.0.1", 80, False)], "admin", "",
+            response_cache=cache.ResponseCache(ttl=60), revalidate_cache=True)
+
+    def _add_address(self):
+        # the response of the table cached by another reader
+        self.client.cmdb('firewall/address', vdom='root', skip_meta=True)
+        FortiGateRequest.tables = {('firewall/address', 'root'): ADDRESSES +
+                                   [{'name': 'addr4'}]}
+        FortiGateRequest.checksums = {'global': 'g1', 'root': 'r2',
+                                      'all': 'a2'}
+
+    def test_refresh_not_served_from_cache(self):
+        store = shadow.ShadowStore(self.client, ['firewall/address'])
+        store.table('firewall/address', 'root')
+        self._add_address()
+        self.assertEqual([('firewall/address', 'root')], store.refresh())
+        self.assertIsNotNone(store.get('firewall/address', 'addr4', 'root'))
+        self.assertEqual('r2', store.table('firewall/address',
+                                           'root').revision)
+        self.assertEqual([], store.refresh())
+
+    def test_snapshot_not_saved_from_cache(self):
+        path = os.path.join(tempfile.mkdtemp(), 'fgt1.sqlite')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        store = shadow.ShadowStore(self.client, ['firewall/address'],
+                                   snapshot_file=path)
+        store.table('firewall/address', 'root')
+        self._add_address()
+        store.refresh()
+        FortiGateRequest.created = []
+        store = shadow.ShadowStore(self.client, ['firewall/address'],
+                                   snapshot_file=path)
+        self.assertEqual([], store.warm_start())
+        self.assertIsNotNone(store.get('firewall/address', 'addr4', 'root'))
+        self.assertEqual(['GET'], [r.method for r in FortiGateRequest.created])
+
+
+class ClientWriteListenerTestCase(unittest2.TestCase):
+
+    def test_listener(self):
+        api_client = client.FortiosApiClient(
+            [("127.0.0.1", 80, False)], "admin", "")
+        listener = mock.Mock(side_effect=Exception)
+        api_client.add_write_listener(listener)
+        responses = [mock.Mock(status=200, body='{"mkey": "addr1"}'),
+                     mock.Mock(status=200, body='{"results": []}')]
+        with mock.patch.object(api_client, '_fetch',
+                               side_effect=responses):
+            api_client.request('ADD_FIREWALL_ADDRESS', vdom='root',
+                               name='addr1', subnet='10.0.0.0 255.0.0.0')
+            api_client.request('GET_FIREWALL_ADDRESS', vdom='root')
+        listener.assert_called_once_with(
+            'POST', mock.ANY, mock.ANY, {'mkey': 'addr1'})
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare the per request render cost with and without template cache.
+
+The cold column is the cost of the first render of an operation in a new
+process, i.e. loading the ahead-of-time compiled template module, compared
+with compiling the template from source.
+"""
+
+import argparse
+import json
+import timeit
+
+import jinja2
+
+from fortiosclient import builders
+from fortiosclient import client
+from fortiosclient import templates
+
+MESSAGES = {
+    'ADD_VLAN_INTERFACE': {
+        'name': 'os_vid_4093', 'vlanid': 4093, 'vdom': 'osvdm1',
+        'interface': 'port1', 'ip': '192.168.30.254 255.255.255.0'},
+    'ADD_FIREWALL_ADDRESS': {
+        'vdom': 'osvdm1', 'name': 'os_addr_1',
+        'subnet': '10.0.0.0 255.255.255.0'},
+    'SET_FIREWALL_ADDRGRP': {
+        'vdom': 'osvdm1', 'name': 'addrgrp_os',
+        'members': ['os_addr_%d' % i for i in range(32)]},
+    'ADD_FIREWALL_POLICY': {
+        'vdom': 'osvdm1', 'srcintf': 'port1', 'dstintf': 'port2',
+        'srcaddr': 'all', 'dstaddr': 'all', 'poolname': '172.16.1.1',
+        'av_profile': 'default', 'webfilter_profile': 'default'},
+}
+
+
+def uncached(opt, message):
+    return json.loads(jinja2.Template(getattr(templates, opt)).render(
+        **message))
+
+
+def cached(opt, message):
+    return client.FortiosApiClient._render(opt, **message)
+
+
+def native(opt, message):
+    return builders.build(opt, **message)
+
+
+def cold(opt, message):
+    env = client.create_template_env()
+    return json.loads(env.get_template(opt).render(**message))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--number', type=int, default=1000,
+                        help='renders per measurement')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of measurements, the best one is used')
+    args = parser.parse_args()
+
+    print('%-24s %14s %14s %8s %14s %14s' % ('operation', 'uncached(us)',
+                                             'cached(us)', 'speedup',
+                                             'cold aot(us)', 'native(us)'))
+    for opt, message in sorted(MESSAGES.items()):
+        assert uncached(opt, message) == cached(opt, message)
+        assert uncached(opt, message) == cold(opt, message)
+        assert uncached(opt, message) == native(opt, message)
+        results = []
+        for func in (uncached, cached, cold, native):
+            best = min(timeit.repeat(lambda: func(opt, message),
+                                     number=args.number,
+                                     repeat=args.repeat))
+            results.append(best / args.number * 1e6)
+        print('%-24s %14.1f %14.1f %7.1fx %14.1f %14.1f' % (
+            opt, results[0], results[1], results[0] / results[1],
+            results[2], results[3]))
+
+
+if __name__ == '__main__':
+    main()
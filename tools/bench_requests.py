@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the request throughput of the API client.
+
+The connections are replaced by fake ones answering every request after
+--latency seconds without blocking the other green threads, so the numbers
+are the throughput of the client itself for a given FortiOS latency.
+
+scaling:   request_many() on one client for several concurrent_connections
+isolation: several clients, each connected to its own FortiGate, issuing
+           requests one after the other at the same time
+overhead:  microseconds per request() call of the client with
+           inline_requests on and off, FortiOS answering at once
+sockets:   N concurrent requests to a local HTTP server answering after
+           --server-latency seconds, on green and on standard sockets;
+           with green sockets they take about one server latency
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import timeit
+
+import eventlet
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+from fortiosclient import client
+
+LATENCY = 0.005
+TOKEN = '0' * 30
+
+
+class FakeSocket(object):
+    timeout = None
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def gettimeout(self):
+        return self.timeout
+
+
+class FakeResponse(httplib.HTTPResponse):
+    status = 200
+    headers = {}
+
+    def __init__(self):
+        pass
+
+    def read(self):
+        return b'{"results": [], "status": "success"}'
+
+    def getheader(self, name, default=None):
+        return default
+
+
+class FakeConnection(httplib.HTTPConnection):
+
+    def connect(self):
+        self.sock = FakeSocket()
+
+    def request(self, method, url, body=None, headers=None):
+        pass
+
+    def getresponse(self):
+        eventlet.sleep(LATENCY)
+        return FakeResponse()
+
+
+class BenchClient(client.FortiosApiClient):
+
+    def _create_connection(self, host, port, is_ssl):
+        return FakeConnection(host, port)
+
+
+def new_client(host='10.0.0.1', **kwargs):
+    return BenchClient([(host, 80, False)], 'admin', '', token=TOKEN,
+                       **kwargs)
+
+
+def requests(number):
+    return [('GET_FIREWALL_ADDRESS', {'vdom': 'root', 'name': 'addr%d' % i})
+            for i in range(number)]
+
+
+def scaling(args):
+    results = []
+    for connections in args.connections:
+        api_client = new_client(concurrent_connections=connections,
+                                **args.client_options)
+        start = timeit.default_timer()
+        done = api_client.request_many(requests(args.number))
+        elapsed = timeit.default_timer() - start
+        assert all(r.ok for r in done)
+        results.append({'connections': connections,
+                        'requests': args.number,
+                        'ops_per_sec': args.number / elapsed})
+    return results
+
+
+def isolation(args):
+    results = []
+    for count in args.clients:
+        clients = [new_client('10.0.0.%d' % (i + 1), **args.client_options)
+                   for i in range(count)]
+
+        def issue(api_client):
+            for opt, message in requests(args.number // count):
+                api_client.request(opt, **message)
+
+        start = timeit.default_timer()
+        pool = eventlet.GreenPool(count)
+        for api_client in clients:
+            pool.spawn(issue, api_client)
+        pool.waitall()
+        elapsed = timeit.default_timer() - start
+        number = args.number // count * count
+        results.append({'clients': count, 'requests': number,
+                        'ops_per_sec': number / elapsed})
+    return results
+
+
+def overhead(args):
+    global LATENCY
+    latency, LATENCY = LATENCY, 0
+    results = []
+    try:
+        for inline in (False, True):
+            api_client = new_client(inline_requests=inline,
+                                    **args.client_options)
+            calls = requests(args.number)
+            start = timeit.default_timer()
+            for opt, message in calls:
+                api_client.request(opt, **message)
+            elapsed = timeit.default_timer() - start
+            results.append({'inline': inline, 'requests': args.number,
+                            'usec_per_call': elapsed / args.number * 1e6})
+    finally:
+        LATENCY = latency
+    return results
+
+
+class SlowServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+    latency = 0.1
+
+
+class SlowHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        body = FakeResponse().read()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def sockets(args):
+    server = SlowServer(('127.0.0.1', 0), SlowHandler)
+    server.latency = args.server_latency
+    thread = threading.Thread(target=server.serve_forever,
+                              kwargs={'poll_interval': 0.01})
+    thread.daemon = True
+    thread.start()
+    provider = ('127.0.0.1', server.server_address[1], False)
+    results = []
+    try:
+        for green in (False, True):
+            for count in args.concurrent:
+                api_client = client.FortiosApiClient(
+                    [provider], 'admin', '', token=TOKEN,
+                    concurrent_connections=count, green_sockets=green)
+                start = timeit.default_timer()
+                done = api_client.request_many(requests(count))
+                elapsed = timeit.default_timer() - start
+                assert all(r.ok for r in done)
+                results.append({'green': green, 'requests': count,
+                                'latencies': elapsed / args.server_latency})
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def main():
+    global LATENCY
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-n', '--number', type=int, default=400,
+                        help='requests per measurement')
+    parser.add_argument('--latency', type=float, default=LATENCY,
+                        help='seconds FortiOS takes to answer a request')
+    parser.add_argument('--connections', type=int, nargs='+',
+                        default=[1, 2, 4, 8, 16],
+                        help='concurrent_connections of the scaling case')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 2, 4],
+                        help='number of clients of the isolation case')
+    parser.add_argument('--server-latency', type=float, default=0.1,
+                        help='seconds the server of the sockets case takes '
+                             'to answer')
+    parser.add_argument('--concurrent', type=int, nargs='+',
+                        default=[1, 4, 16],
+                        help='concurrent requests of the sockets case')
+    parser.add_argument('--format', choices=['json', 'table'],
+                        default='table', help='output format')
+    args = parser.parse_args()
+    LATENCY = args.latency
+    args.client_options = {}
+
+    report = {'latency': args.latency,
+              'scaling': scaling(args),
+              'isolation': isolation(args),
+              'overhead': overhead(args),
+              'sockets': sockets(args)}
+    if args.format == 'json':
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+        return
+    print('%-12s %10s %12s' % ('connections', 'requests', 'ops/sec'))
+    for r in report['scaling']:
+        print('%-12d %10d %12.0f' % (r['connections'], r['requests'],
+                                     r['ops_per_sec']))
+    print('')
+    print('%-12s %10s %12s' % ('clients', 'requests', 'ops/sec'))
+    for r in report['isolation']:
+        print('%-12d %10d %12.0f' % (r['clients'], r['requests'],
+                                     r['ops_per_sec']))
+    print('')
+    print('%-12s %10s %12s' % ('inline', 'requests', 'usec/call'))
+    for r in report['overhead']:
+        print('%-12s %10d %12.1f' % (r['inline'], r['requests'],
+                                     r['usec_per_call']))
+    print('')
+    print('%-12s %10s %12s' % ('green', 'requests', 'latencies'))
+    for r in report['sockets']:
+        print('%-12s %10d %12.1f' % (r['green'], r['requests'],
+                                     r['latencies']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the cost of building every API message in templates.py.
+
+Every operation of fortiosclient.operations is built with these cases:
+
+    full:    every param the template knows, e.g. all the UTM profiles of
+             ADD_FIREWALL_POLICY, with small member lists
+    minimal: only the params the template requires
+    large:   every param with large member lists, for the operations which
+             take lists
+
+For every case the ops/sec, the p50/p99 latency and the peak memory
+allocated by one build are reported. The report is written as JSON so it
+can be kept and compared with a later run with --compare, which exits with
+an error if the p50 latency of a case regressed by more than --threshold.
+"""
+
+import argparse
+import json
+import platform
+import re
+import sys
+import time
+import timeit
+
+import jinja2
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from fortiosclient import builders
+from fortiosclient import client
+from fortiosclient import operations
+
+SMALL = 4
+LARGE = 256
+
+# A realistic value of every param of the API messages, the list valued
+# params are functions of the size of the list.
+PARAMS = {
+    'action': 'accept',
+    'after': 2,
+    'alias': 'tenant_1_ext',
+    'application_list': 'default',
+    'associated_interface': 'port1',
+    'av_profile': 'default',
+    'before': 1,
+    'canonical_name': 'www.example.com',
+    'comment': 'created by fortiosclient',
+    'comments': 'created by fortiosclient',
+    'count': 10,
+    'device': 'port1',
+    'dns_nameservers': lambda n: ['10.0.%d.%d' % (i // 250, i % 250 + 1)
+                                  for i in range(n)],
+    'dst': '0.0.0.0 0.0.0.0',
+    'dstaddr': lambda n: ['os_addr_dst_%d' % i for i in range(n)],
+    'dstintf': 'port2',
+    'email': 'user1@example.com',
+    'end_ip': '10.0.0.254',
+    'endip': '172.16.1.9',
+    'extintf': 'port1',
+    'extip': '172.16.1.10',
+    'extport': 8080,
+    'fqdn': 'www.example.com',
+    'gateway': '10.0.0.1',
+    'hostname': 'www',
+    'id': 3,
+    'interface': 'port1',
+    'ip': '192.168.30.254 255.255.255.0',
+    'iprange': '10.0.0.1-10.0.0.9',
+    'ips_sensor': 'default',
+    'mappedip': '10.0.0.5',
+    'match_vip': 'enable',
+    'max_connections': 100,
+    'member': lambda n: ['user_%d' % i for i in range(n)],
+    'members': lambda n: ['os_addr_%d' % i for i in range(n)],
+    'mobile_number': '5551234',
+    'name': 'os_obj_1',
+    'nat': 'enable',
+    'netmask': '255.255.255.0',
+    'password': 'secret',
+    'poolname': '172.16.1.1',
+    'port': 80,
+    'protocol': 'TCP/UDP/SCTP',
+    'realservers': lambda n: json.dumps([
+        {'id': i + 1, 'ip': '10.0.%d.%d' % (i // 250, i % 250 + 1),
+         'port': 80} for i in range(n)]),
+    'reserved_address': lambda n: json.dumps([
+        {'id': i + 1, 'ip': '10.0.%d.%d' % (i // 250, i % 250 + 1),
+         'mac': '00:01:02:03:%02x:%02x' % (i // 256, i % 256)}
+        for i in range(n)]),
+    'sctp_portrange': '900',
+    'secondaryips': lambda n: ['10.%d.%d.1 255.255.255.0' % (i // 250,
+                                                             i % 250)
+                               for i in range(n)],
+    'secretkey': 'secret',
+    'service': lambda n: ['tcp_%d' % (1024 + i) for i in range(n)],
+    'srcaddr': lambda n: ['os_addr_src_%d' % i for i in range(n)],
+    'srcintf': 'port1',
+    'ssl_ssh_profile': 'deep-inspection',
+    'start_ip': '10.0.0.2',
+    'startip': '172.16.1.1',
+    'status': 'enable',
+    'subnet': '10.0.0.0 255.255.255.0',
+    'tcp_portrange': '100-200:300-400',
+    'ttl': 300,
+    'two_factor': 'email',
+    'type': 'A',
+    'udp_portrange': '53',
+    'username': 'admin',
+    'vdom': 'osvdm1',
+    'virt_server_name': 'os_vip_1',
+    'vlanid': 4093,
+    'webfilter_profile': 'default',
+}
+
+
+def _value(param, size):
+    value = PARAMS[param]
+    return value(size) if callable(value) else value
+
+
+def cases(operation):
+    """Yield the (case, message) pairs operation is benchmarked with."""
+    params = operation.required | operation.optional
+    yield 'full', dict((p, _value(p, SMALL)) for p in params)
+    if operation.optional:
+        yield 'minimal', dict((p, _value(p, SMALL))
+                              for p in operation.required)
+    if any(callable(PARAMS[p]) for p in params):
+        yield 'large', dict((p, _value(p, LARGE)) for p in params)
+
+
+def template(opt, message):
+    return client.FortiosApiClient._render(opt, **message)
+
+
+def native(opt, message):
+    return builders.build(opt, **message)
+
+
+RENDERERS = {'template': template, 'native': native}
+
+
+def percentile(samples, percent):
+    """Return the percentile of the sorted samples."""
+    index = int(round(percent / 100.0 * (len(samples) - 1)))
+    return samples[index]
+
+
+def measure(func, opt, message, number):
+    samples = []
+    timer = timeit.default_timer
+    for _ in range(number):
+        start = timer()
+        func(opt, message)
+        samples.append(timer() - start)
+    samples.sort()
+    result = {
+        'ops_per_sec': number / sum(samples),
+        'p50_us': percentile(samples, 50) * 1e6,
+        'p99_us': percentile(samples, 99) * 1e6,
+        'peak_bytes': None,
+    }
+    if tracemalloc is not None and hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.start()
+        try:
+            peaks = []
+            for _ in range(min(number, 20)):
+                current = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                func(opt, message)
+                peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        finally:
+            tracemalloc.stop()
+        result['peak_bytes'] = min(peaks)
+    return result
+
+
+def run(args):
+    func = RENDERERS[args.renderer]
+    pattern = re.compile(args.filter) if args.filter else None
+    results = []
+    for opt in sorted(operations.OPERATIONS):
+        if pattern and not pattern.search(opt):
+            continue
+        for case, message in cases(operations.get(opt)):
+            try:
+                func(opt, message)
+            except (ValueError, jinja2.UndefinedError):
+                # the template does not support leaving out optional params
+                continue
+            result = {'operation': opt, 'case': case}
+            result.update(measure(func, opt, message, args.number))
+            results.append(result)
+    return {
+        'renderer': args.renderer,
+        'number': args.number,
+        'python': platform.python_version(),
+        'jinja2': jinja2.__version__,
+        'time': int(time.time()),
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print the cases whose p50 regressed, return the number of them."""
+    previous = dict(((r['operation'], r['case']), r)
+                    for r in baseline['results'])
+    regressions = 0
+    for result in report['results']:
+        old = previous.get((result['operation'], result['case']))
+        if old is None:
+            continue
+        ratio = result['p50_us'] / old['p50_us']
+        if ratio > 1 + threshold:
+            regressions += 1
+            sys.stderr.write('%s %s: p50 %.1fus -> %.1fus (%+.0f%%)\n' % (
+                result['operation'], result['case'], old['p50_us'],
+                result['p50_us'], (ratio - 1) * 100))
+    return regressions
+
+
+def print_table(report):
+    print('%-28s %-8s %12s %10s %10s %12s' % (
+        'operation', 'case', 'ops/sec', 'p50(us)', 'p99(us)', 'peak(B)'))
+    for r in report['results']:
+        print('%-28s %-8s %12.0f %10.1f %10.1f %12s' % (
+            r['operation'], r['case'], r['ops_per_sec'], r['p50_us'],
+            r['p99_us'], r['peak_bytes']))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-n', '--number', type=int, default=1000,
+                        help='builds per case')
+    parser.add_argument('--renderer', choices=sorted(RENDERERS),
+                        default='template',
+                        help='build the messages from the templates or with '
+                             'the native builders')
+    parser.add_argument('--filter',
+                        help='only benchmark the operations matching this '
+                             'regular expression')
+    parser.add_argument('--format', choices=['json', 'table'],
+                        default='json', help='output format')
+    parser.add_argument('-o', '--output',
+                        help='write the JSON report to this file')
+    parser.add_argument('--compare',
+                        help='JSON report of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative p50 increase reported as a '
+                             'regression by --compare')
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.format == 'table':
+        print_table(report)
+    elif not args.output:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
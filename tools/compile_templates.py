@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# Copyright 2015 Fortinet, Inc.
+# All Rights Reserved
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compile the API message templates into fortiosclient.compiled_templates.
+
+Run it before the package is built or installed, and whenever
+fortiosclient/templates.py or the jinja2 version in use is changed, the
+templates without an up to date compiled module are compiled from source at
+runtime. The modules are not kept in git.
+"""
+
+import argparse
+import glob
+import os
+
+from fortiosclient import client
+from fortiosclient import compiled_templates
+from fortiosclient import operations
+from fortiosclient import templates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--target',
+                        default=os.path.dirname(compiled_templates.__file__),
+                        help='directory to write the compiled modules to')
+    args = parser.parse_args()
+
+    pattern = os.path.join(args.target,
+                           compiled_templates.MODULE_PREFIX + '*.py')
+    for path in glob.glob(pattern):
+        os.remove(path)
+
+    env = client.create_template_env()
+    for opt in sorted(operations.OPERATIONS):
+        source = getattr(templates, opt)
+        path = os.path.join(args.target,
+                            compiled_templates.module_name(opt) + '.py')
+        with open(path, 'w') as f:
+            f.write(compiled_templates.compile_module(env, opt, source))
+        print('Compiled %s as %s' % (opt, path))
+
+
+if __name__ == '__main__':
+    main()